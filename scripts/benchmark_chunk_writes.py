@@ -0,0 +1,103 @@
+"""Chunk write throughput: ORM bulk_save_objects vs binary COPY.
+
+Writes synthetic chunks for a scratch document with each path inside a
+transaction that is rolled back, so the database is left unchanged.
+
+    python -m scripts.benchmark_chunk_writes --chunks 10000
+"""
+
+import argparse
+import time
+import numpy as np
+from uuid import uuid4
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from src.core.config import settings
+from src.core.database import get_engine
+from src.models.database import DocumentChunk
+from src.services.chunk_writer import ChunkWriter
+
+
+def make_chunks(count: int, dimension: int):
+    rng = np.random.default_rng(0)
+    chunks = [f"Synthetic chunk {i} " + "lorem ipsum " * 55 for i in range(count)]
+    embeddings = rng.normal(size=(count, dimension)).astype(np.float32)
+    return chunks, embeddings
+
+
+def scratch_document(session: Session) -> tuple[int, int, str]:
+    user_id = session.execute(
+        text(
+            """
+            INSERT INTO users (username, email, hashed_password)
+            VALUES (:name, :name, 'x') RETURNING id
+            """
+        ),
+        {"name": f"benchmark-{uuid4().hex[:12]}"},
+    ).scalar_one()
+    doc_id = str(uuid4())
+    document_id = session.execute(
+        text(
+            """
+            INSERT INTO documents (doc_id, user_id, title, content_type)
+            VALUES (:doc_id, :user_id, 'benchmark', 'text/plain') RETURNING id
+            """
+        ),
+        {"doc_id": doc_id, "user_id": user_id},
+    ).scalar_one()
+    return document_id, user_id, doc_id
+
+
+def orm_write(session: Session, document, chunks, embeddings) -> None:
+    document_id, user_id, doc_id = document
+    session.bulk_save_objects(
+        [
+            DocumentChunk(
+                document_id=document_id,
+                user_id=user_id,
+                doc_id=doc_id,
+                chunk_index=i,
+                content=content,
+                chunk_metadata={"index": i},
+                embedding=embedding,
+            )
+            for i, (content, embedding) in enumerate(zip(chunks, embeddings))
+        ]
+    )
+    session.flush()
+
+
+def copy_write(session: Session, document, chunks, embeddings) -> None:
+    document_id, user_id, doc_id = document
+    ChunkWriter().write(
+        session.connection(), document_id, user_id, doc_id, chunks, embeddings
+    )
+
+
+def timed(path, chunks, embeddings) -> float:
+    with Session(get_engine()) as session:
+        document = scratch_document(session)
+        started = time.perf_counter()
+        path(session, document, chunks, embeddings)
+        elapsed = time.perf_counter() - started
+        session.rollback()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=10000)
+    parser.add_argument("--dimension", type=int, default=settings.EMBEDDING_DIMENSION)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    chunks, embeddings = make_chunks(args.chunks, args.dimension)
+    print(f"{'path':>10} {'best s':>10} {'rows/s':>12}")
+    for name, path in (("orm", orm_write), ("copy", copy_write)):
+        best = min(timed(path, chunks, embeddings) for _ in range(args.repeat))
+        print(f"{name:>10} {best:>10.3f} {args.chunks / best:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
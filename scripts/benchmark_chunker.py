@@ -0,0 +1,101 @@
+"""Chunking throughput and chunk size distribution: TextChunker vs langchain.
+
+Runs both splitters over the given text files (or a synthetic corpus), once
+as-is and once whitespace-collapsed the way DocumentService feeds them, and
+reports MB/s plus chunk length percentiles in characters and estimated tokens.
+
+    python -m scripts.benchmark_chunker --synthetic-mb 8
+    python -m scripts.benchmark_chunker docs/*.md --chunk-size 400
+"""
+
+import argparse
+import random
+import time
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from src.core.config import settings
+from src.services.text_chunker import TextChunker
+from src.utils.utils import clean_whitespaes, estimate_tokens
+
+WORDS = (
+    "the of and to in is that for it as with was on be by this are from at or "
+    "retrieval embedding vector graph document chunk tenant knowledge index "
+    "query latency throughput Gemini pgvector Neo4j naïve café déjà"
+).split()
+
+
+def synthetic_corpus(megabytes: float, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    paragraphs, size = [], 0
+    while size < megabytes * 1_000_000:
+        lines = [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 40)))
+            for _ in range(rng.randint(1, 6))
+        ]
+        paragraph = "\n".join(lines)
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(paragraphs)
+
+
+def percentiles(values) -> str:
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return f"{min(values):>6} {p50:>6.0f} {p95:>6.0f} {p99:>6.0f} {max(values):>6}"
+
+
+def run(name: str, splitter, text: str, repeat: int) -> None:
+    best, chunks = float("inf"), []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        chunks = splitter.split_text(text)
+        best = min(best, time.perf_counter() - started)
+
+    chars = [len(chunk) for chunk in chunks]
+    tokens = [estimate_tokens(chunk) for chunk in chunks]
+    megabytes = len(text.encode()) / 1_000_000
+    print(
+        f"{name:>10} {megabytes / best:>8.1f} {len(chunks):>7} "
+        f"| {percentiles(chars)} | {percentiles(tokens)}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="*", help="Text files to use as the corpus")
+    parser.add_argument("--synthetic-mb", type=float, default=8.0)
+    parser.add_argument("--chunk-size", type=int, default=settings.CHUNK_SIZE)
+    parser.add_argument("--chunk-overlap", type=int, default=settings.CHUNK_OVERLAP)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.files:
+        corpus = "\n\n".join(open(path, encoding="utf-8").read() for path in args.files)
+    else:
+        corpus = synthetic_corpus(args.synthetic_mb)
+
+    splitters = {
+        "langchain": RecursiveCharacterTextSplitter(
+            chunk_size=args.chunk_size,
+            chunk_overlap=args.chunk_overlap,
+            separators=["\n\n", "\n", " ", ""],
+            keep_separator=True,
+            is_separator_regex=False,
+            length_function=len,
+        ),
+        "knowflow": TextChunker(args.chunk_size, args.chunk_overlap, "chars"),
+    }
+
+    for label, text in (("raw", corpus), ("collapsed", clean_whitespaes(corpus))):
+        print(f"\n{label}: {len(text.encode()) / 1_000_000:.1f} MB")
+        print(
+            f"{'splitter':>10} {'MB/s':>8} {'chunks':>7} "
+            f"| {'chars':>6} {'p50':>6} {'p95':>6} {'p99':>6} {'max':>6} "
+            f"| {'tokens':>6} {'p50':>6} {'p95':>6} {'p99':>6} {'max':>6}"
+        )
+        for name, splitter in splitters.items():
+            run(name, splitter, text, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Per-request middleware overhead: BaseHTTPMiddleware layers vs AppMiddleware.
+
+Calls a bare FastAPI app in-process through three stacks and reports the
+mean time per request for a small JSON endpoint and a streaming endpoint:
+no middleware, the previous four BaseHTTPMiddleware layers (request context,
+logging, rate limit, security headers) and the single AppMiddleware. Logging
+is muted unless --log is given, so the numbers are the middleware's own.
+
+    python -m scripts.benchmark_middleware
+    python -m scripts.benchmark_middleware --requests 5000 --chunks 100 --log
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+import uuid
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from src.core.logging import logger
+from src.core.middleware import SECURITY_HEADERS, AppMiddleware, rate_limit_key
+from src.core.rate_limit import MemoryRateLimitStore
+
+CALLS = 10**9
+
+
+def build_app(chunks: int) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/json")
+    async def json_endpoint():
+        return {"status": "ok"}
+
+    @app.get("/stream")
+    async def stream_endpoint():
+        async def body():
+            for _ in range(chunks):
+                yield b"x" * 1024
+
+        return StreamingResponse(body(), media_type="application/octet-stream")
+
+    return app
+
+
+class LegacyRequestContext(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        request.state.request_id = str(uuid.uuid4())
+        request.state.start_time = time.time()
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request.state.request_id
+        response.headers["X-Process-Time"] = str(time.time() - request.state.start_time)
+        return response
+
+
+class LegacyLogging(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        start_time = time.time()
+        logger.info("Request started", extra={"url": str(request.url)})
+        response = await call_next(request)
+        logger.info(
+            "Request completed",
+            extra={
+                "status_code": response.status_code,
+                "time": time.time() - start_time,
+            },
+        )
+        return response
+
+
+class LegacyRateLimit(BaseHTTPMiddleware):
+    def __init__(self, app):
+        super().__init__(app)
+        self.store = MemoryRateLimitStore()
+
+    async def dispatch(self, request, call_next):
+        await self.store.hit(rate_limit_key(request), CALLS, 60)
+        return await call_next(request)
+
+
+class LegacySecurityHeaders(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        response.headers.update(SECURITY_HEADERS)
+        return response
+
+
+def stacks(chunks: int):
+    bare = build_app(chunks)
+
+    legacy = build_app(chunks)
+    for middleware in (
+        LegacyRequestContext,
+        LegacyLogging,
+        LegacyRateLimit,
+        LegacySecurityHeaders,
+    ):
+        legacy.add_middleware(middleware)
+
+    composed = build_app(chunks)
+    composed.add_middleware(
+        AppMiddleware, rate_limit=True, calls=CALLS, store=MemoryRateLimitStore()
+    )
+    return {"none": bare, "BaseHTTPMiddleware x4": legacy, "AppMiddleware": composed}
+
+
+async def request(app, path: str) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench"), (b"user-agent", b"bench")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    received = False
+    body_bytes = 0
+
+    async def receive():
+        nonlocal received
+        if received:
+            await asyncio.sleep(3600)
+        received = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal body_bytes
+        if message["type"] == "http.response.body":
+            body_bytes += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return body_bytes
+
+
+async def measure(app, path: str, requests: int) -> float:
+    for _ in range(min(requests, 200)):
+        await request(app, path)
+    started = time.perf_counter()
+    for _ in range(requests):
+        await request(app, path)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+async def run(args) -> None:
+    apps = stacks(args.chunks)
+    for path, requests in (
+        ("/json", args.requests),
+        ("/stream", max(args.requests // 10, 1)),
+    ):
+        print(f"\nGET {path} ({requests} requests)")
+        print(f"{'stack':>22} {'us/request':>11} {'overhead':>9}")
+        baseline = None
+        for name, app in apps.items():
+            micros = await measure(app, path, requests)
+            baseline = micros if baseline is None else baseline
+            print(f"{name:>22} {micros:>11.1f} {micros - baseline:>9.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--chunks", type=int, default=50, help="Chunks per stream")
+    parser.add_argument("--log", action="store_true", help="Keep request logging")
+    args = parser.parse_args()
+
+    if not args.log:
+        logger.setLevel(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
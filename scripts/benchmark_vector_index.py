@@ -0,0 +1,208 @@
+"""Recall vs latency of the ANN index on document chunk embeddings.
+
+Samples stored embeddings as queries, computes exact top-k over each
+tenant's rows, then sweeps ef_search (HNSW) or probes (IVFFlat) and reports
+recall@k alongside p50/p95 latency. With several quantization levels an
+index is built for each and its size is reported.
+
+Indexes are built on a scratch copy of the embedded chunks, dropped when the
+run ends, so the live table and its indexes are never touched.
+
+    python -m scripts.benchmark_vector_index --queries 100 --k 8
+"""
+
+import argparse
+import statistics
+import time
+from typing import Dict, List, Tuple
+from sqlalchemy import text
+
+from src.core.config import settings
+from src.core.database import get_engine
+from src.core.logging import logger
+from src.services.vector_index import VectorIndexManager
+from src.services.vector_search import VectorSearchService, to_vector_literal
+
+SCRATCH_TABLE = "benchmark_document_chunks"
+
+
+def create_scratch_table() -> None:
+    with get_engine().begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {SCRATCH_TABLE}"))
+        connection.execute(
+            text(
+                f"""
+                CREATE TABLE {SCRATCH_TABLE} AS
+                SELECT id, user_id, document_id, doc_id, chunk_index, content,
+                    embedding
+                FROM document_chunks
+                WHERE embedding IS NOT NULL
+                """
+            )
+        )
+        connection.execute(text(f"CREATE INDEX ON {SCRATCH_TABLE} (user_id, doc_id)"))
+        connection.execute(text(f"ANALYZE {SCRATCH_TABLE}"))
+
+
+def drop_scratch_table() -> None:
+    with get_engine().begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {SCRATCH_TABLE}"))
+
+
+def scratch_search_service(manager: VectorIndexManager) -> VectorSearchService:
+    """A search service reading the scratch table, without the local backend"""
+    service = VectorSearchService(index_manager=manager)
+    service.local_search = None
+    service.ann_search_sql = service.ann_search_sql.replace(
+        "FROM document_chunks dc", f"FROM {SCRATCH_TABLE} dc"
+    )
+    service.EXACT_MULTI_QUERY_SEARCH_SQL = service.EXACT_MULTI_QUERY_SEARCH_SQL.replace(
+        "FROM document_chunks dc", f"FROM {SCRATCH_TABLE} dc"
+    )
+    return service
+
+
+def sample_queries(count: int) -> List[Tuple[List[float], int]]:
+    with get_engine().connect() as connection:
+        rows = connection.execute(
+            text(
+                """
+                SELECT CAST(embedding AS text) AS embedding, user_id
+                FROM document_chunks
+                WHERE embedding IS NOT NULL
+                ORDER BY random()
+                LIMIT :count
+                """
+            ),
+            {"count": count},
+        ).fetchall()
+    return [
+        ([float(v) for v in row.embedding.strip("[]").split(",")], row.user_id)
+        for row in rows
+    ]
+
+
+def exact_ids(
+    service: VectorSearchService, embedding: List[float], user_id: int, k: int
+) -> List[str]:
+    params = {
+        "query_vectors": [to_vector_literal(embedding)],
+        "user_id": user_id,
+        "document_ids": None,
+        "k": k,
+    }
+    with get_engine().connect() as connection:
+        rows = connection.execute(
+            text(service.EXACT_MULTI_QUERY_SEARCH_SQL), params
+        ).fetchall()
+    return [str(row.id) for row in rows]
+
+
+def run_sweep(
+    service: VectorSearchService,
+    queries: List[Tuple[List[float], int]],
+    truth: List[List[str]],
+    k: int,
+    knob: str,
+    value: int,
+) -> Dict[str, float]:
+    recalls, latencies = [], []
+    for (embedding, user_id), expected in zip(queries, truth):
+        started = time.perf_counter()
+        hits = service.search_ranked([embedding], user_id, k=k, **{knob: value})
+        latencies.append((time.perf_counter() - started) * 1000)
+        if expected:
+            found = {hit["id"] for hit in hits}
+            recalls.append(len(found & set(expected)) / len(expected))
+
+    latencies.sort()
+    return {
+        "recall": statistics.mean(recalls) if recalls else 0.0,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=settings.TOP_K_RESULTS)
+    parser.add_argument(
+        "--index-type", choices=["hnsw", "ivfflat"], default=settings.VECTOR_INDEX_TYPE
+    )
+    parser.add_argument(
+        "--values",
+        type=lambda s: [int(v) for v in s.split(",")],
+        default=None,
+        help="Comma separated ef_search or probes values to sweep",
+    )
+    parser.add_argument(
+        "--tenant-min-rows",
+        type=int,
+        default=0,
+        help="Build per-tenant partial indexes for users with at least this many rows",
+    )
+    parser.add_argument(
+        "--quantization",
+        type=lambda s: s.split(","),
+        default=[settings.VECTOR_QUANTIZATION],
+        help="Comma separated quantization levels to compare (none, half, binary)",
+    )
+    args = parser.parse_args()
+
+    # Routing in this process only: 0 sends every tenant through the shared
+    # index being measured
+    settings.TENANT_VECTOR_INDEX_MIN_ROWS = args.tenant_min_rows
+
+    knob = "ef_search" if args.index_type == "hnsw" else "probes"
+    values = args.values or (
+        [10, 20, 40, 80, 160] if knob == "ef_search" else [1, 5, 10, 20, 40]
+    )
+
+    queries = sample_queries(args.queries)
+    if not queries:
+        print("No embeddings found, ingest some documents first")
+        return
+
+    logger.info(f"Copying embedded chunks to {SCRATCH_TABLE}")
+    create_scratch_table()
+    try:
+        truth = None
+        for quantization in args.quantization:
+            manager = VectorIndexManager(
+                table=SCRATCH_TABLE,
+                index_type=args.index_type,
+                quantization=quantization,
+            )
+            manager.ensure_index()
+            if args.tenant_min_rows:
+                manager.ensure_tenant_indexes(min_rows=args.tenant_min_rows)
+            status = manager.index_status()
+            print(
+                f"\nquantization={quantization} index={manager.index_name()} "
+                f"rows={status['rows']} "
+                f"size={status.get('size_bytes', 0) / 2**20:.1f} MiB"
+            )
+
+            service = scratch_search_service(manager)
+            if truth is None:
+                truth = [
+                    exact_ids(service, e, user_id, args.k) for e, user_id in queries
+                ]
+
+            print(
+                f"{knob:>10} {'recall@' + str(args.k):>10} "
+                f"{'p50 ms':>10} {'p95 ms':>10}"
+            )
+            for value in values:
+                result = run_sweep(service, queries, truth, args.k, knob, value)
+                print(
+                    f"{value:>10} {result['recall']:>10.3f} "
+                    f"{result['p50_ms']:>10.2f} {result['p95_ms']:>10.2f}"
+                )
+    finally:
+        drop_scratch_table()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Import-time budget for the API: fails when `import src.main` gets slow.
+
+Imports the app in fresh interpreters with `-X importtime`, takes the fastest
+run and exits non-zero if any client library that should only load on first
+use (AWS, Neo4j, Gemini, document loaders) was imported, or if the import
+got slow. Slow is measured against the same interpreter importing the
+frameworks the app can't start without, so the check holds on slower
+machines; --budget-ms adds an absolute limit. Importing must not touch the
+network, so this also runs offline. tests/test_import_time.py runs the same
+check under pytest.
+
+    python -m scripts.check_import_time
+    python -m scripts.check_import_time --max-ratio 2.5 --repeat 5 --top 15
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+MODULE = "src.main"
+DEFERRED = (
+    "boto3",
+    "neo4j",
+    "langchain_google_genai",
+    "langchain_community.document_loaders",
+    "tokenizers",
+)
+# Imported by the app no matter how lazily it loads everything else
+BASELINE = (
+    "fastapi",
+    "sqlalchemy.ext.asyncio",
+    "sqlalchemy.orm",
+    "pydantic_settings",
+    "langchain_core.messages",
+    "numpy",
+)
+# The app took about 1.7x the baseline when this was set
+MAX_RATIO = 3.0
+PROBE = (
+    "import sys, json; import {module}; "
+    "print(json.dumps([m for m in {deferred!r} if m in sys.modules]))"
+)
+
+
+def run_importtime(code: str) -> Tuple[List[str], str]:
+    """`-X importtime` lines and stdout of running code in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+    )
+    if result.returncode:
+        sys.exit(f"{code} failed:\n{result.stderr}")
+    lines = [
+        line
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:") and line.split("|")[1].strip().isdigit()
+    ]
+    return lines, result.stdout
+
+
+def import_once(module: str) -> Tuple[float, Dict[str, float], List[str]]:
+    """Cumulative milliseconds for the module and each of its direct imports,
+    and the deferred modules that were loaded anyway"""
+    lines, stdout = run_importtime(PROBE.format(module=module, deferred=DEFERRED))
+
+    # Nested imports are indented by two spaces per level and printed before
+    # the module that imported them
+    total, children, pending = 0.0, {}, {}
+    for line in lines:
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            pending[name.strip()] = int(cumulative) / 1000
+        elif depth == 0:
+            if name.strip() == module:
+                total, children = int(cumulative) / 1000, pending
+            pending = {}
+    return total, children, json.loads(stdout.strip().splitlines()[-1])
+
+
+def baseline_once() -> float:
+    """Milliseconds to import the BASELINE modules, with what they import"""
+    lines, _ = run_importtime(f"import {', '.join(BASELINE)}")
+    return sum(
+        int(line.split("|")[1]) / 1000
+        for line in lines
+        if not line.split("|")[2].startswith("  ")
+    )
+
+
+def measure(
+    module: str = MODULE, repeat: int = 3
+) -> Tuple[float, float, Dict[str, float], List[str]]:
+    """Fastest of `repeat` runs: (module ms, baseline ms, direct imports ms,
+    deferred modules loaded)"""
+    total_ms, children, loaded = min(
+        (import_once(module) for _ in range(repeat)), key=lambda run: run[0]
+    )
+    baseline_ms = min(baseline_once() for _ in range(repeat))
+    return total_ms, baseline_ms, children, loaded
+
+
+def failures(
+    total_ms: float,
+    baseline_ms: float,
+    loaded: List[str],
+    max_ratio: float = MAX_RATIO,
+    budget_ms: Optional[float] = None,
+) -> List[str]:
+    found = []
+    if total_ms > baseline_ms * max_ratio:
+        found.append(
+            f"import took {total_ms / baseline_ms:.2f}x the baseline, "
+            f"over {max_ratio:.2f}x"
+        )
+    if budget_ms and total_ms > budget_ms:
+        found.append(f"import took {total_ms:.0f} ms, over {budget_ms:.0f} ms")
+    if loaded:
+        found.append(f"imported at startup instead of first use: {loaded}")
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default=MODULE)
+    parser.add_argument("--max-ratio", type=float, default=MAX_RATIO)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    total_ms, baseline_ms, children, loaded = measure(args.module, args.repeat)
+
+    print(
+        f"import {args.module}: {total_ms:.0f} ms, {total_ms / baseline_ms:.2f}x "
+        f"the {baseline_ms:.0f} ms baseline (max {args.max_ratio:.2f}x)"
+    )
+    print(f"\n{'ms':>8}  imported by {args.module}")
+    for name, millis in sorted(children.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"{millis:>8.1f}  {name}")
+
+    found = failures(total_ms, baseline_ms, loaded, args.max_ratio, args.budget_ms)
+    if found:
+        sys.exit("\n" + "\n".join(found))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Move chunk embeddings onto a native pgvector column in document_chunks.
+
+Adds user_id, doc_id, embedding, parent_index and the near-duplicate
+signature columns to existing document_chunks tables, backfills embeddings
+from the langchain PGVector tables (or the legacy JSON embedding_vector
+column), then drops the legacy JSON column. Chunks indexed before parent
+windows or deduplication existed keep NULLs there until their document is
+re-indexed. The langchain tables are only dropped with --drop-langchain,
+and only once every chunk that needs an embedding has one.
+
+    python -m scripts.migrate_chunk_embeddings --collection knowflow_vector_db
+"""
+
+import argparse
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from src.core.config import settings
+from src.core.database import get_engine
+from src.models.database import DocumentChunk
+from src.services.vector_index import VectorIndexManager
+
+
+def column_exists(connection: Connection, table: str, name: str) -> bool:
+    return (
+        connection.execute(
+            text(
+                """
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = :table AND column_name = :name
+                """
+            ),
+            {"table": table, "name": name},
+        ).first()
+        is not None
+    )
+
+
+def add_columns(connection: Connection) -> None:
+    connection.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+    connection.execute(
+        text(
+            f"""
+            ALTER TABLE document_chunks
+                ADD COLUMN IF NOT EXISTS user_id integer REFERENCES users (id),
+                ADD COLUMN IF NOT EXISTS doc_id varchar(36),
+                ADD COLUMN IF NOT EXISTS embedding vector({settings.EMBEDDING_DIMENSION}),
+                ADD COLUMN IF NOT EXISTS parent_index integer,
+                ADD COLUMN IF NOT EXISTS minhash integer[],
+                ADD COLUMN IF NOT EXISTS lsh_bands bigint[]
+            """
+        )
+    )
+    connection.execute(
+        text(
+            """
+            UPDATE document_chunks dc
+            SET user_id = d.user_id, doc_id = d.doc_id
+            FROM documents d
+            WHERE d.id = dc.document_id AND dc.user_id IS NULL
+            """
+        )
+    )
+
+
+def backfill_embeddings(connection: Connection, collection: str) -> int:
+    migrated = 0
+    if connection.execute(
+        text("SELECT to_regclass('langchain_pg_embedding')")
+    ).scalar():
+        migrated += connection.execute(
+            text(
+                """
+                UPDATE document_chunks dc
+                SET embedding = e.embedding
+                FROM langchain_pg_embedding e
+                JOIN langchain_pg_collection c ON c.uuid = e.collection_id
+                WHERE c.name = :collection
+                  AND dc.embedding IS NULL
+                  AND CAST(e.cmetadata ->> 'document_id' AS integer) = dc.document_id
+                  AND CAST(e.cmetadata ->> 'chunk_index' AS integer) = dc.chunk_index
+                """
+            ),
+            {"collection": collection},
+        ).rowcount
+
+    if column_exists(connection, "document_chunks", "embedding_vector"):
+        migrated += connection.execute(
+            text(
+                """
+                UPDATE document_chunks
+                SET embedding = CAST(CAST(embedding_vector AS text) AS vector)
+                WHERE embedding IS NULL AND embedding_vector IS NOT NULL
+                """
+            )
+        ).rowcount
+    return migrated
+
+
+def drop_duplicates(connection: Connection, drop_langchain: bool) -> None:
+    connection.execute(
+        text(
+            """
+            ALTER TABLE document_chunks
+                DROP COLUMN IF EXISTS embedding_vector,
+                ALTER COLUMN user_id SET NOT NULL,
+                ALTER COLUMN doc_id SET NOT NULL
+            """
+        )
+    )
+    if drop_langchain:
+        connection.execute(text("DROP TABLE IF EXISTS langchain_pg_embedding"))
+        connection.execute(text("DROP TABLE IF EXISTS langchain_pg_collection"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--collection",
+        default="knowflow_vector_db",
+        help="langchain PGVector collection the embeddings were stored in",
+    )
+    parser.add_argument(
+        "--drop-langchain",
+        action="store_true",
+        help="Drop the langchain_pg_* tables once every chunk has an embedding",
+    )
+    args = parser.parse_args()
+
+    with get_engine().begin() as connection:
+        if not connection.execute(
+            text("SELECT to_regclass('document_chunks')")
+        ).scalar():
+            print("document_chunks does not exist, nothing to migrate")
+            return
+        add_columns(connection)
+        migrated = backfill_embeddings(connection, args.collection)
+        # Chunks collapsed onto a duplicate in the same document have no
+        # embedding by design
+        missing = connection.execute(
+            text(
+                """
+                SELECT count(*) FROM document_chunks
+                WHERE embedding IS NULL
+                  AND chunk_metadata ->> 'duplicate_of' IS NULL
+                """
+            )
+        ).scalar_one()
+        drop_langchain = args.drop_langchain and missing == 0
+        if args.drop_langchain and not drop_langchain:
+            print(f"{missing} chunks have no embedding, keeping the langchain tables")
+        drop_duplicates(connection, drop_langchain=drop_langchain)
+        for index in DocumentChunk.__table__.indexes:
+            index.create(connection, checkfirst=True)
+
+    VectorIndexManager().ensure_index()
+    print(f"Backfilled {migrated} chunk embeddings, {missing} chunks need reindexing")
+
+
+if __name__ == "__main__":
+    main()
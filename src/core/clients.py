@@ -0,0 +1,113 @@
+import threading
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from fastapi import Request
+
+from src.core.config import settings
+from src.core.logging import logger
+from src.services.embedding_service import QueryEmbeddings, get_query_embeddings
+
+if TYPE_CHECKING:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    from src.core.graph_driver import GraphDriver
+
+
+class ClientRegistry:
+    """Long-lived external clients shared by every service in the process.
+
+    Each client is created once, on first use or by `connect` at startup, and
+    is safe to share across requests and threads: the Gemini model and
+    embeddings are stateless HTTP clients, the Neo4j driver owns its own
+    connection pool and boto3 clients (unlike boto3 sessions) are thread-safe.
+    Client libraries are imported with their client, so importing the app
+    stays fast and does not depend on them being reachable.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._llm: Optional["ChatGoogleGenerativeAI"] = None
+        self._neo4j_driver: Optional["GraphDriver"] = None
+        self._s3_client: Any = None
+
+    @property
+    def llm(self) -> "ChatGoogleGenerativeAI":
+        if self._llm is None:
+            with self._lock:
+                if self._llm is None:
+                    from langchain_google_genai import ChatGoogleGenerativeAI
+
+                    from src.core.metrics import LLMUsageCallback
+
+                    self._llm = ChatGoogleGenerativeAI(
+                        google_api_key=settings.GOOGLE_API_KEY,
+                        model=settings.GEMINI_MODEL_NAME,
+                        convert_system_message_to_human=True,
+                        callbacks=[LLMUsageCallback(settings.GEMINI_MODEL_NAME)],
+                    )
+        return self._llm
+
+    @property
+    def embeddings(self) -> QueryEmbeddings:
+        return get_query_embeddings()
+
+    @property
+    def neo4j_driver(self) -> "GraphDriver":
+        if self._neo4j_driver is None:
+            with self._lock:
+                if self._neo4j_driver is None:
+                    from src.core.graph_driver import GraphDriver
+
+                    self._neo4j_driver = GraphDriver.connect()
+        return self._neo4j_driver
+
+    @property
+    def s3_client(self) -> Any:
+        if self._s3_client is None:
+            with self._lock:
+                if self._s3_client is None:
+                    import boto3
+
+                    self._s3_client = boto3.client(
+                        "s3",
+                        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                        region_name=settings.AWS_REGION,
+                    )
+        return self._s3_client
+
+    def connect(self) -> None:
+        """Create every client up front so no request pays for it"""
+        self.llm
+        self.embeddings
+        self.neo4j_driver
+        self.s3_client
+        logger.info("Shared clients initialized")
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "neo4j_pool": self._neo4j_driver.metrics() if self._neo4j_driver else None
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._neo4j_driver is not None:
+                self._neo4j_driver.close()
+                self._neo4j_driver = None
+            if self._s3_client is not None:
+                self._s3_client.close()
+                self._s3_client = None
+            self._llm = None
+        logger.info("Shared clients closed")
+
+
+@lru_cache
+def get_clients() -> ClientRegistry:
+    """Process-wide registry, also used by services built outside a request"""
+    return ClientRegistry()
+
+
+def get_client_registry(request: Request) -> ClientRegistry:
+    """FastAPI dependency for the registry the lifespan attached to the app"""
+    return getattr(request.app.state, "clients", None) or get_clients()
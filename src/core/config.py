@@ -1,25 +1,30 @@
-import json
-import boto3
 from functools import lru_cache
 from pathlib import Path
-from typing import Optional, List
-from botocore.exceptions import ClientError
-from pydantic import Field
+from typing import Any, Dict, Optional, List
+from pydantic import Field, PrivateAttr
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
-load_dotenv()
+from src.core.secrets import SecretStore
 
+load_dotenv()
 
-def get_aws_secret(secret_name: str, region_name: str = "ap-south-1") -> dict:
-    session = boto3.session.Session()
-    client = session.client(service_name="secretsmanager", region_name=region_name)
-    try:
-        get_secret_value_response = client.get_secret_value(SecretId=secret_name)
-        secret = get_secret_value_response["SecretString"]
-        return dict(json.loads(secret))
-    except ClientError as e:
-        raise e
+# Settings that may come from the secret store instead of the environment
+SECRET_FIELDS = frozenset(
+    {
+        "SECRET_KEY",
+        "ACCESS_TOKEN_EXPIRE_MINUTES",
+        "DATABASE_URL",
+        "NEO4J_URI",
+        "NEO4J_USER",
+        "NEO4J_PASSWORD",
+        "AWS_ACCESS_KEY_ID",
+        "AWS_SECRET_ACCESS_KEY",
+        "S3_BUCKET_NAME",
+        "GOOGLE_API_KEY",
+        "GEMINI_EMBEDDING_MODEL",
+    }
+)
 
 
 class Settings(BaseSettings):
@@ -38,6 +43,26 @@ class Settings(BaseSettings):
     LOG_FILE: Optional[str] = Field(default="logs/knowflow.log", env="LOG_FILE")
     LOG_ROTATION: str = Field(default="midnight", env="LOG_ROTATION")
     LOG_RETENTION: int = Field(default=30, env="LOG_RETENTION")
+    # Records are handed to a background thread through a bounded queue and
+    # dropped when it is full. Messages and string extras are capped at
+    # LOG_MAX_FIELD_LENGTH chars. LOG_SAMPLE_RATES keeps a fraction of
+    # DEBUG/INFO records per logger, e.g. {"knowflow.http": 0.1}
+    LOG_JSON: bool = Field(default=True)
+    LOG_QUEUE_SIZE: int = Field(default=10000)
+    LOG_MAX_FIELD_LENGTH: int = Field(default=2000)
+    LOG_SAMPLE_RATES: Dict[str, float] = Field(default={})
+
+    # Tracing: "" is off, "console" logs finished spans and "file" appends
+    # them as JSON lines to TRACING_FILE
+    TRACING_EXPORTER: str = Field(default="")
+    TRACING_FILE: str = Field(default="logs/traces.jsonl")
+
+    # On-demand profiling: the users listed here can send "X-Profile: 1" (or
+    # ?profile=1) to have that request sampled with pyinstrument. Reports are
+    # written to PROFILING_DIR and served at /profiles/{request_id}
+    PROFILING_ADMIN_USER_IDS: List[int] = Field(default=[])
+    PROFILING_DIR: str = Field(default="logs/profiles")
+    PROFILING_INTERVAL: float = Field(default=0.001)
 
     # Server
     HOST: str = Field(default="0.0.0.0", env="HOST")
@@ -45,17 +70,43 @@ class Settings(BaseSettings):
     WORKERS: int = Field(default=1, env="WORKERS")
     RELOAD: bool = Field(default=False, env="RELOAD")
 
+    # Secrets
+    # Fields in SECRET_FIELDS are resolved on first use from SECRETS_FILE (a
+    # JSON object) when set, otherwise from the AWS secret SECRETS_NAME, and
+    # refreshed every SECRETS_TTL_SECONDS. A value set in the environment or
+    # .env takes precedence and never triggers a lookup
+    SECRETS_NAME: str = Field(default="knowflow/app-secrets")
+    SECRETS_REGION: str = Field(default="ap-south-1")
+    SECRETS_FILE: str = Field(default="")
+    SECRETS_TTL_SECONDS: float = Field(default=300.0)
+
     # Security
     SECRET_KEY: str = Field(default="")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(default=30)
 
     # Database
     DATABASE_URL: str = Field(default="")
+    # Pool settings apply to both the async (asyncpg) engine used by request
+    # handlers and the sync engine used for search and bulk writes. Set the
+    # statement cache size to 0 behind PgBouncer in transaction mode
+    DB_POOL_SIZE: int = Field(default=10)
+    DB_MAX_OVERFLOW: int = Field(default=20)
+    DB_POOL_TIMEOUT: float = Field(default=30.0)
+    DB_POOL_RECYCLE: int = Field(default=1800)
+    DB_POOL_PRE_PING: bool = Field(default=True)
+    DB_STATEMENT_CACHE_SIZE: int = Field(default=100)
 
     # Neo4j
     NEO4J_URI: str = Field(default="")
     NEO4J_USER: str = Field(default="")
     NEO4J_PASSWORD: str = Field(default="")
+    # One driver is shared per process; lifetime stays under typical load
+    # balancer idle timeouts and idle connections are checked before reuse
+    NEO4J_MAX_CONNECTION_POOL_SIZE: int = Field(default=50)
+    NEO4J_CONNECTION_ACQUISITION_TIMEOUT: float = Field(default=10.0)
+    NEO4J_MAX_CONNECTION_LIFETIME: float = Field(default=1800.0)
+    NEO4J_CONNECTION_TIMEOUT: float = Field(default=5.0)
+    NEO4J_LIVENESS_CHECK_TIMEOUT: Optional[float] = Field(default=60.0)
 
     # AWS S3
     AWS_ACCESS_KEY_ID: str = Field(default="")
@@ -71,12 +122,72 @@ class Settings(BaseSettings):
     GEMINI_MODEL_NAME: str = Field(default="gemini-2.0-flash", env="GEMINI_MODEL_NAME")
 
     # Vector Store
-    VECTOR_COLLECTION_NAME: str = Field(
-        default="knowflow_vector_db", env="VECTOR_COLLECTION_NAME"
-    )
-    CHUNK_SIZE: int = Field(default=700)
-    CHUNK_OVERLAP: int = Field(default=80)
+    # Chunks are what gets embedded and searched; each is split out of a
+    # larger parent window that is returned as context (0 disables parents)
+    CHUNK_SIZE: int = Field(default=400)
+    CHUNK_OVERLAP: int = Field(default=50)
+    PARENT_CHUNK_SIZE: int = Field(default=2000)
+    # Unit the chunk sizes above are measured in, "chars" or "tokens". Tokens
+    # are counted with CHUNK_TOKENIZER (a tokenizers hub name or tokenizer.json
+    # path) when set, otherwise estimated at ~4 characters each
+    CHUNK_LENGTH_UNIT: str = Field(default="chars")
+    CHUNK_TOKENIZER: str = Field(default="")
+    # Near-duplicate chunks (MinHash over word shingles) are "skip"ped, or
+    # "collapse"d into rows that keep their place for context expansion
+    # without being embedded again; "off" disables. Scope is "document", or
+    # "user" to also match the user's other documents
+    CHUNK_DEDUP_MODE: str = Field(default="collapse")
+    CHUNK_DEDUP_SCOPE: str = Field(default="document")
+    CHUNK_DEDUP_THRESHOLD: float = Field(default=0.85)
+    CHUNK_DEDUP_NUM_PERM: int = Field(default=128)
+    CHUNK_DEDUP_BANDS: int = Field(default=16)
+    CHUNK_DEDUP_SHINGLE_SIZE: int = Field(default=3)
     TOP_K_RESULTS: int = Field(default=8)
+    EMBEDDING_DIMENSION: int = Field(default=768)
+
+    # Vector Index ("hnsw", "ivfflat" or "none")
+    VECTOR_INDEX_TYPE: str = Field(default="hnsw")
+    HNSW_M: int = Field(default=16)
+    HNSW_EF_CONSTRUCTION: int = Field(default=64)
+    HNSW_EF_SEARCH: int = Field(default=40)
+    IVFFLAT_LISTS: int = Field(default=0)
+    IVFFLAT_PROBES: int = Field(default=10)
+    TENANT_VECTOR_INDEX_MIN_ROWS: int = Field(default=50000)
+    # How often tenants that grew past the minimum get their partial index
+    TENANT_VECTOR_INDEX_INTERVAL_SECONDS: float = Field(default=600.0)
+    # ANN index precision ("none", "half" or "binary"), candidates are
+    # re-scored against full-precision vectors
+    VECTOR_QUANTIZATION: str = Field(default="none")
+    VECTOR_RESCORE_FACTOR: int = Field(default=4)
+
+    # In-process vector search for small tenants
+    LOCAL_VECTOR_SEARCH_ENABLED: bool = Field(default=False)
+    LOCAL_VECTOR_CACHE_DIR: str = Field(default="/tmp/knowflow/vectors")
+    LOCAL_VECTOR_MAX_CHUNKS: int = Field(default=20000)
+    LOCAL_VECTOR_MAX_USERS: int = Field(default=64)
+    LOCAL_VECTOR_VERSION_TTL_SECONDS: float = Field(default=30.0)
+
+    # Hybrid Search
+    TEXT_SEARCH_CONFIG: str = Field(default="english")
+    HYBRID_VECTOR_WEIGHT: float = Field(default=1.0)
+    HYBRID_LEXICAL_WEIGHT: float = Field(default=1.0)
+    HYBRID_SEARCH_WORKERS: int = Field(default=8)
+    RRF_K: int = Field(default=60)
+
+    # Query Embeddings
+    QUERY_EMBEDDING_CACHE_SIZE: int = Field(default=2048)
+    QUERY_EMBEDDING_BATCH_WINDOW_MS: int = Field(default=5)
+    QUERY_EMBEDDING_MAX_BATCH_SIZE: int = Field(default=32)
+
+    # Prompt Context
+    CONTEXT_TOKEN_BUDGET: int = Field(default=2000)
+    CONTEXT_MMR_LAMBDA: float = Field(default=0.7)
+    CONTEXT_GRAPH_TOKEN_SHARE: float = Field(default=0.25)
+
+    # Retrieval Evaluation ("llm", "local" or "hybrid")
+    RETRIEVAL_EVALUATION_MODE: str = Field(default="hybrid")
+    RETRIEVAL_EVALUATION_ACCEPT_SCORE: float = Field(default=7.0)
+    RETRIEVAL_EVALUATION_REJECT_SCORE: float = Field(default=4.0)
 
     # Graph Store
     GRAPH_BATCH_SIZE: int = Field(default=100)
@@ -86,47 +197,43 @@ class Settings(BaseSettings):
     # Rate Limiting
     RATE_LIMIT_CALLS: int = Field(default=100, env="RATE_LIMIT_CALLS")
     RATE_LIMIT_PERIOD: int = Field(default=60, env="RATE_LIMIT_PERIOD")
-    RATE_LIMIT_EXCLUDED_PATHS: set[str] = Field(default={"/health", "/health/detailed"})
+    RATE_LIMIT_EXCLUDED_PATHS: set[str] = Field(
+        default={"/health", "/health/detailed", "/metrics"}
+    )
+    # Sliding window counters keyed by user for authenticated requests and by
+    # client IP otherwise. "memory" is per process and keeps at most
+    # RATE_LIMIT_MAX_CLIENTS clients, "redis" is shared across workers/tasks
+    RATE_LIMIT_BACKEND: str = Field(default="memory")
+    RATE_LIMIT_REDIS_URL: str = Field(default="redis://localhost:6379/0")
+    RATE_LIMIT_MAX_CLIENTS: int = Field(default=10000)
 
     CORS_ORIGINS: List[str] = Field(
         default=["*"],
         description="List of allowed CORS origins. Use ['*'] to allow all origins.",
     )
 
+    _secrets: SecretStore = PrivateAttr()
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self._load_secrets()
-
-    def _load_secrets(self):
-        secrets = get_aws_secret("knowflow/app-secrets")
-
-        if secrets:
-            self.SECRET_KEY = secrets.get("SECRET_KEY", self.SECRET_KEY)
-            self.ACCESS_TOKEN_EXPIRE_MINUTES = int(
-                secrets.get(
-                    "ACCESS_TOKEN_EXPIRE_MINUTES", self.ACCESS_TOKEN_EXPIRE_MINUTES
-                )
-            )
-            self.DATABASE_URL = secrets.get("DATABASE_URL", self.DATABASE_URL)
-            self.NEO4J_URI = secrets.get("NEO4J_URI", self.NEO4J_URI)
-            self.NEO4J_USER = secrets.get("NEO4J_USER", self.NEO4J_USER)
-            self.NEO4J_PASSWORD = secrets.get("NEO4J_PASSWORD", self.NEO4J_PASSWORD)
-            self.AWS_ACCESS_KEY_ID = secrets.get(
-                "AWS_ACCESS_KEY_ID", self.AWS_ACCESS_KEY_ID
-            )
-            self.AWS_SECRET_ACCESS_KEY = secrets.get(
-                "AWS_SECRET_ACCESS_KEY", self.AWS_SECRET_ACCESS_KEY
-            )
-            self.S3_BUCKET_NAME = secrets.get("S3_BUCKET_NAME", self.S3_BUCKET_NAME)
-            self.GOOGLE_API_KEY = secrets.get("GOOGLE_API_KEY", self.GOOGLE_API_KEY)
-            self.GEMINI_EMBEDDING_MODEL = secrets.get(
-                "GEMINI_EMBEDDING_MODEL", self.GEMINI_EMBEDDING_MODEL
-            )
+        self._secrets = SecretStore(
+            self.SECRETS_NAME,
+            self.SECRETS_REGION,
+            ttl_seconds=self.SECRETS_TTL_SECONDS,
+            secrets_file=self.SECRETS_FILE,
+        )
 
     class Config:
         env_file = ".env"
         case_sensitive = True
 
+    def model_dump(self, **kwargs) -> Dict[str, Any]:
+        """Same as BaseModel.model_dump, with secrets resolved from the store"""
+        data = super().model_dump(**kwargs)
+        for name in SECRET_FIELDS & data.keys():
+            data[name] = getattr(self, name)
+        return data
+
     @property
     def base_dir(self) -> Path:
         return Path(__file__).parent.parent.parent
@@ -136,6 +243,36 @@ class Settings(BaseSettings):
         return self.base_dir / self.LOG_FILE
 
 
+class SecretSetting:
+    """Serves a field in SECRET_FIELDS from the secret store, unless it was
+    set explicitly. A data descriptor, so it takes precedence over the value
+    pydantic keeps in the instance and other fields are read as usual.
+
+    pydantic's serializer reads the instance directly, so
+    Settings.model_dump resolves secrets itself; model_dump_json does not
+    and returns the environment values."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __get__(self, instance: Optional[Settings], owner: type) -> Any:
+        if instance is None:
+            return self
+        value = instance.__dict__[self.name]
+        if self.name in instance.model_fields_set:
+            return value
+        secret = instance.__pydantic_private__["_secrets"].get(self.name)
+        return value if secret is None else type(value)(secret)
+
+    def __set__(self, instance: Settings, value: Any) -> None:
+        instance.__dict__[self.name] = value
+        instance.model_fields_set.add(self.name)
+
+
+for name in SECRET_FIELDS:
+    setattr(Settings, name, SecretSetting(name))
+
+
 @lru_cache
 def get_settings() -> Settings:
     return Settings()
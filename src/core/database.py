@@ -1,21 +1,93 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from functools import lru_cache
+from typing import AsyncIterator
+
+from sqlalchemy import create_engine, make_url, text
+from sqlalchemy.engine import URL, Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, declarative_base
 
 from src.core.config import settings
 
 Base = declarative_base()
 
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+POOL_OPTIONS = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+}
+
+
+def sync_database_url(database_url: str) -> URL:
+    """The DATABASE_URL with its driver swapped for psycopg 3, which the
+    binary COPY chunk writes need"""
+    return make_url(database_url).set(drivername="postgresql+psycopg")
+
+
+def async_database_url(database_url: str) -> URL:
+    """The DATABASE_URL with its driver swapped for asyncpg"""
+    url = make_url(database_url).set(drivername="postgresql+asyncpg")
+    # asyncpg takes ssl= where libpq takes sslmode=
+    if "sslmode" in url.query:
+        url = url.update_query_dict(
+            {"ssl": url.query["sslmode"]}
+        ).difference_update_query(["sslmode"])
+    return url
+
+
+@lru_cache
+def get_engine() -> Engine:
+    """The sync engine, created on first use so importing never connects"""
+    return create_engine(sync_database_url(settings.DATABASE_URL), **POOL_OPTIONS)
+
+
+@lru_cache
+def get_async_engine() -> AsyncEngine:
+    return create_async_engine(
+        async_database_url(settings.DATABASE_URL),
+        connect_args={
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        },
+        **POOL_OPTIONS,
+    )
+
+
+def async_session() -> AsyncSession:
+    # Objects stay usable after commit, since lazy loads can't run implicitly
+    return AsyncSession(get_async_engine(), autoflush=False, expire_on_commit=False)
+
+
+async def dispose_engines() -> None:
+    if get_engine.cache_info().currsize:
+        get_engine().dispose()
+    if get_async_engine.cache_info().currsize:
+        await get_async_engine().dispose()
 
 
 def get_db():
-    db = SessionLocal()
+    db = Session(get_engine(), autoflush=False)
     try:
         yield db
     finally:
         db.close()
 
 
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with async_session() as db:
+        yield db
+
+
 def init_db():
+    engine = get_engine()
+    with engine.begin() as connection:
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+
     Base.metadata.create_all(bind=engine)
+
+    # create_all skips indexes declared after a table already exists
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
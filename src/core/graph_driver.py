@@ -0,0 +1,106 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+from neo4j import Driver, GraphDatabase, Session, exceptions
+
+from src.core.config import settings
+from src.core.logging import logger
+
+
+def is_acquisition_timeout(error: Exception) -> bool:
+    # neo4j 5.x raises a plain ClientError, 6.x a dedicated subclass
+    timeout_error = getattr(exceptions, "ConnectionAcquisitionTimeoutError", ())
+    return isinstance(error, timeout_error) or (
+        "failed to obtain a connection from the pool" in str(error)
+    )
+
+
+class GraphDriver:
+    """The process-wide Neo4j driver with pool usage accounting.
+
+    Sessions hold at most one pooled connection at a time, so sessions open
+    through `session` are an upper bound on connections in use. The driver's
+    own connection counts are read best-effort, as the pool is not public.
+    """
+
+    def __init__(self, driver: Driver, max_pool_size: int):
+        self._driver = driver
+        self.max_pool_size = max_pool_size
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._peak_in_use = 0
+        self._sessions = 0
+        self._acquisition_timeouts = 0
+        self._session_seconds = 0.0
+
+    @classmethod
+    def connect(cls) -> "GraphDriver":
+        driver = GraphDatabase.driver(
+            settings.NEO4J_URI,
+            auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD),
+            max_connection_pool_size=settings.NEO4J_MAX_CONNECTION_POOL_SIZE,
+            connection_acquisition_timeout=settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+            max_connection_lifetime=settings.NEO4J_MAX_CONNECTION_LIFETIME,
+            connection_timeout=settings.NEO4J_CONNECTION_TIMEOUT,
+            liveness_check_timeout=settings.NEO4J_LIVENESS_CHECK_TIMEOUT,
+        )
+        logger.info(
+            f"Neo4j driver created (pool size {settings.NEO4J_MAX_CONNECTION_POOL_SIZE})"
+        )
+        return cls(driver, settings.NEO4J_MAX_CONNECTION_POOL_SIZE)
+
+    @contextmanager
+    def session(self, **kwargs: Any) -> Iterator[Session]:
+        with self._lock:
+            self._in_use += 1
+            self._sessions += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+        started = time.perf_counter()
+        try:
+            with self._driver.session(**kwargs) as session:
+                yield session
+        except Exception as e:
+            if is_acquisition_timeout(e):
+                with self._lock:
+                    self._acquisition_timeouts += 1
+                logger.warning(f"Neo4j pool exhausted: {self.metrics()}")
+            raise
+        finally:
+            with self._lock:
+                self._in_use -= 1
+                self._session_seconds += time.perf_counter() - started
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = {
+                "max_pool_size": self.max_pool_size,
+                "sessions_in_use": self._in_use,
+                "peak_sessions_in_use": self._peak_in_use,
+                "utilization": round(self._in_use / self.max_pool_size, 4),
+                "sessions_opened": self._sessions,
+                "session_seconds_total": round(self._session_seconds, 3),
+                "acquisition_timeouts": self._acquisition_timeouts,
+            }
+        metrics.update(self._pool_connections())
+        return metrics
+
+    def close(self) -> None:
+        self._driver.close()
+
+    def __getattr__(self, name: str) -> Any:
+        # verify_connectivity, execute_query, ... go straight to the driver
+        return getattr(self._driver, name)
+
+    def _pool_connections(self) -> Dict[str, int]:
+        try:
+            pool = self._driver._pool
+            with pool.lock:
+                connections = [c for queue in pool.connections.values() for c in queue]
+            return {
+                "connections_open": len(connections),
+                "connections_in_use": sum(1 for c in connections if c.in_use),
+            }
+        except Exception:
+            return {}
@@ -1,11 +1,28 @@
 import sys
+import copy
+import json
+import atexit
+import queue
+import random
 import logging
 import logging.handlers
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 
 from src.core.config import settings
 
+# Attributes every LogRecord has; anything else came in through `extra`
+RECORD_ATTRIBUTES = frozenset(
+    logging.LogRecord("", 0, "", 0, "", (), None).__dict__
+) | {"message", "asctime", "color"}
+
+
+def truncate(value: str, max_length: int) -> str:
+    if max_length <= 0 or len(value) <= max_length:
+        return value
+    return f"{value[:max_length]}... [{len(value) - max_length} more chars]"
+
 
 class CustomFormatter(logging.Formatter):
     COLORS = {
@@ -25,6 +42,85 @@ class CustomFormatter(logging.Formatter):
         return super().format(record)
 
 
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with `extra` fields at the top level"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(
+                record.created, timezone.utc
+            ).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of DEBUG and INFO records per logger, e.g.
+    {"knowflow.http": 0.1}. Rates apply to child loggers too, and warnings
+    and errors are never sampled."""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not self.rates or record.levelno > logging.INFO:
+            return True
+        name = record.name
+        while name:
+            if name in self.rates:
+                return random.random() < self.rates[name]
+            name = name.rpartition(".")[0]
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread without ever waiting on it.
+
+    Messages, string extras and tracebacks are capped at `max_length`
+    characters here, in the caller, so a large payload doesn't sit in the
+    queue. When the queue is full the record is dropped and counted.
+    """
+
+    def __init__(self, log_queue: queue.Queue, max_length: int):
+        super().__init__(log_queue)
+        self.setFormatter(logging.Formatter())
+        self.max_length = max_length
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Unlike the base class, leave formatting to the listener's handlers
+        # and keep the traceback apart from the message
+        record = copy.copy(record)
+        record.msg = record.message = truncate(record.getMessage(), self.max_length)
+        record.args = None
+        if record.exc_info:
+            record.exc_text = truncate(
+                self.formatter.formatException(record.exc_info), self.max_length * 4
+            )
+            record.exc_info = None
+        for key, value in record.__dict__.items():
+            if key not in RECORD_ATTRIBUTES and isinstance(value, str):
+                record.__dict__[key] = truncate(value, self.max_length)
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
 def setup_logger(
     name: str = settings.PROJECT_NAME,
     log_file: Optional[str] = settings.LOG_FILE,
@@ -33,6 +129,8 @@ def setup_logger(
     retention: int = settings.LOG_RETENTION,
     format_string: str = settings.LOG_FORMAT,
 ) -> logging.Logger:
+    """Log through a queue: callers only enqueue the record and a listener
+    thread formats it and does the console and file I/O."""
     logger = logging.getLogger(name)
     logger.setLevel(level)
 
@@ -41,10 +139,12 @@ def setup_logger(
 
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(level)
-    colored_format_string = "%(color)s" + format_string + "%(color)s"
-    console_formatter = CustomFormatter(colored_format_string)
-    console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
+    if settings.LOG_JSON:
+        console_handler.setFormatter(JsonFormatter())
+    else:
+        colored_format_string = "%(color)s" + format_string + "%(color)s"
+        console_handler.setFormatter(CustomFormatter(colored_format_string))
+    handlers = [console_handler]
 
     if log_file:
         log_path = Path(log_file)
@@ -62,13 +162,32 @@ def setup_logger(
             )
 
         file_handler.setLevel(level)
-        file_formatter = logging.Formatter(format_string)
-        file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
+        if settings.LOG_JSON:
+            file_handler.setFormatter(JsonFormatter())
+        else:
+            file_handler.setFormatter(logging.Formatter(format_string))
+        handlers.append(file_handler)
+
+    log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    queue_handler = NonBlockingQueueHandler(log_queue, settings.LOG_MAX_FIELD_LENGTH)
+    queue_handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATES))
+    logger.addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    listener.start()
+    # Flushes whatever is still queued on shutdown
+    atexit.register(listener.stop)
 
     logger.propagate = False
 
     return logger
 
 
+def get_logger(name: str) -> logging.Logger:
+    """A child of the app logger, so it can be sampled on its own"""
+    return logger.getChild(name)
+
+
 logger = setup_logger()
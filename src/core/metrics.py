@@ -0,0 +1,237 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from src.core.logging import NonBlockingQueueHandler, logger
+from src.core.tracing import get_current_span, span
+
+# ASGI scope of the request being handled. The router adds the matched route
+# to it, so per-route counters read it when they fire rather than up front
+request_scope: ContextVar[Optional[dict]] = ContextVar("request_scope", default=None)
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    escaped = (
+        str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        for value in values
+    )
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = STAGE_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # labels -> [count per bucket (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def collect(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            values = sorted((key, (list(c), s)) for key, (c, s) in self._values.items())
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                labels = _format_labels(self.labelnames + ("le",), key + (le,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], List[str]]) -> None:
+        """Adds a callable returning exposition lines computed at scrape time"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUEST_SECONDS = registry.register(
+    Histogram(
+        "knowflow_http_request_duration_seconds",
+        "HTTP request latency by route template",
+        ["method", "route", "status"],
+    )
+)
+STAGE_SECONDS = registry.register(
+    Histogram(
+        "knowflow_stage_duration_seconds",
+        "Latency of each RAG pipeline and ingestion stage",
+        ["stage"],
+    )
+)
+STAGE_ERRORS = registry.register(
+    Counter("knowflow_stage_errors_total", "Stages that raised an exception", ["stage"])
+)
+LLM_CALLS = registry.register(
+    Counter(
+        "knowflow_llm_calls_total", "LLM calls by route and model", ["route", "model"]
+    )
+)
+LLM_TOKENS = registry.register(
+    Counter(
+        "knowflow_llm_tokens_total",
+        "LLM tokens by route, model and direction (input/output)",
+        ["route", "model", "direction"],
+    )
+)
+
+
+def collect_dropped_log_records() -> List[str]:
+    """Records the app logger dropped because its queue was full"""
+    name = "knowflow_log_records_dropped_total"
+    dropped = sum(
+        handler.dropped
+        for handler in logger.handlers
+        if isinstance(handler, NonBlockingQueueHandler)
+    )
+    return [
+        f"# HELP {name} Log records dropped because the log queue was full",
+        f"# TYPE {name} counter",
+        f"{name} {dropped}",
+    ]
+
+
+registry.register_collector(collect_dropped_log_records)
+
+
+def route_name(scope: dict) -> str:
+    """The route template, e.g. /api/v1/documents/{doc_id}, keeping label
+    cardinality bounded"""
+    return getattr(scope.get("route"), "path", None) or "unmatched"
+
+
+def current_route() -> str:
+    scope = request_scope.get()
+    return "background" if scope is None else route_name(scope)
+
+
+@contextmanager
+def stage(name: str, **attributes: Any) -> Iterator[Any]:
+    """Times a pipeline stage and traces it as a span, e.g.
+    `with stage("vector_search") as span: span.set_attribute("k", len(hits))`"""
+    started = time.perf_counter()
+    try:
+        with span(name, **attributes) as current:
+            yield current
+    except BaseException:
+        STAGE_ERRORS.inc(stage=name)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=name)
+
+
+class LLMUsageCallback(BaseCallbackHandler):
+    """Counts chat model calls and tokens against the current route, and
+    adds the tokens to the current span"""
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        route = current_route()
+        LLM_CALLS.inc(route=route, model=self.model)
+        input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage: Optional[dict] = getattr(
+                    getattr(generation, "message", None), "usage_metadata", None
+                )
+                if usage:
+                    input_tokens += usage.get("input_tokens", 0)
+                    output_tokens += usage.get("output_tokens", 0)
+        current = get_current_span()
+        current.add_to_attribute("llm.calls", 1)
+        current.add_to_attribute("llm.input_tokens", input_tokens)
+        current.add_to_attribute("llm.output_tokens", output_tokens)
+        if input_tokens:
+            LLM_TOKENS.inc(
+                input_tokens, route=route, model=self.model, direction="input"
+            )
+        if output_tokens:
+            LLM_TOKENS.inc(
+                output_tokens, route=route, model=self.model, direction="output"
+            )
@@ -1,62 +1,96 @@
 import time
 import uuid
-from datetime import datetime, timezone
+from typing import Any, Optional
 from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from jose import JWTError, jwt
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from src.core.config import settings
-from src.core.logging import logger
+from src.core.logging import get_logger
 from src.core.exceptions import AppException, RateLimitException
+from src.core.metrics import REQUEST_SECONDS, request_scope, route_name
+from src.core.profiling import RequestProfiler, get_request_profiler
+from src.core.rate_limit import get_rate_limit_store
+from src.core.tracing import span
 
+logger = get_logger("http")
 
-class RequestContextMiddleware(BaseHTTPMiddleware):
-    async def dispatch(
-        self, request: Request, call_next: RequestResponseEndpoint
-    ) -> Response:
-        request_id = str(uuid.uuid4())
-        request.state.request_id = request_id
-        request.state.start_time = time.time()
 
+SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+    "Content-Security-Policy": "default-src 'self'",
+}
+
+
+def token_subject(request: Request) -> Optional[str]:
+    """The user id of a validly signed bearer token. Only the signature is
+    checked here, routes still authenticate."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
         try:
-            response = await call_next(request)
-            return self.add_response_headers(request, response)
-        except AppException as e:
-            logger.error(
-                f"Application error: {str(e)}",
-                extra={
-                    "request_id": request_id,
-                    "error_type": e.__class__.__name__,
-                    "status_code": e.status_code,
-                    **e.extra,
-                },
-            )
-            return JSONResponse(
-                status_code=e.status_code,
-                content={"detail": e.message, "request_id": request_id, **e.extra},
-            )
-        except Exception as e:
-            logger.exception(
-                f"Unhandled error: {str(e)}", extra={"request_id": request_id}
-            )
-            return JSONResponse(
-                status_code=500,
-                content={"detail": "Internal server error", "request_id": request_id},
-            )
-
-    def add_response_headers(self, request: Request, response: Response) -> Response:
-        response.headers["X-Request-ID"] = request.state.request_id
-        response.headers["X-Process-Time"] = str(time.time() - request.state.start_time)
-        return response
-
-
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(
-        self, request: Request, call_next: RequestResponseEndpoint
-    ) -> Response:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+            return payload.get("sub")
+        except JWTError:
+            pass
+    return None
+
+
+def rate_limit_key(request: Request) -> str:
+    """The token's user for authenticated requests, else the client IP"""
+    subject = token_subject(request)
+    if subject:
+        return f"user:{subject}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+class AppMiddleware:
+    """Request context, logging, rate limiting and security headers as one
+    pure ASGI middleware.
+
+    BaseHTTPMiddleware runs the rest of the stack in a separate task and
+    re-streams every response body through a queue, once per layer. Here the
+    endpoint runs in the server's task and response messages are passed
+    straight through with headers added to `http.response.start`, so
+    streaming responses are not buffered.
+
+    Rate limiting only runs when `rate_limit` is set (production).
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        rate_limit: bool = False,
+        calls: int = 100,
+        period: int = 60,
+        excluded_paths: set[str] = {"/health", "/health/detailed", "/metrics"},
+        store: Optional[Any] = None,
+        profiler: Optional[RequestProfiler] = None,
+    ):
+        self.app = app
+        self.rate_limit = rate_limit
+        self.calls = calls
+        self.period = period
+        self.excluded_paths = excluded_paths
+        self.store = store or (get_rate_limit_store() if rate_limit else None)
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        request_id = str(uuid.uuid4())
         start_time = time.time()
-        request_id = getattr(request.state, "request_id", str(uuid.uuid4()))
+        scope_token = request_scope.set(scope)
+        request.state.request_id = request_id
+        request.state.start_time = start_time
 
         logger.info(
             "Request started",
@@ -64,102 +98,127 @@ class LoggingMiddleware(BaseHTTPMiddleware):
                 "request_id": request_id,
                 "method": request.method,
                 "url": str(request.url),
-                "client_ip": request.client.host,
+                "client_ip": request.client.host if request.client else None,
                 "user_agent": request.headers.get("user-agent"),
             },
         )
 
-        response = await call_next(request)
-        process_time = time.time() - start_time
-
+        headers = dict(SECURITY_HEADERS)
+        response_started = False
+        status_code = 500
+
+        async def send_with_headers(message: Message) -> None:
+            nonlocal response_started, status_code
+            if message["type"] == "http.response.start":
+                response_started = True
+                status_code = message["status"]
+                response_headers = MutableHeaders(scope=message)
+                response_headers["X-Request-ID"] = request_id
+                response_headers["X-Process-Time"] = str(time.time() - start_time)
+                for name, value in headers.items():
+                    response_headers[name] = value
+            await send(message)
+
+        profiler = None
+        if self.profiler is not None and self.profiler.requested(request):
+            profiler = self.profiler.start(token_subject(request))
+            if profiler is not None:
+                headers["X-Profile-Report"] = f"/profiles/{request_id}"
+
+        with span(
+            "http.request",
+            request_id=request_id,
+            traceparent=request.headers.get("traceparent"),
+            **{"http.method": request.method, "http.target": request.url.path},
+        ) as request_span:
+            try:
+                response = await self._check_rate_limit(request, headers)
+                if response is not None:
+                    await response(scope, receive, send_with_headers)
+                else:
+                    await self.app(scope, receive, send_with_headers)
+            except AppException as e:
+                logger.error(
+                    f"Application error: {str(e)}",
+                    extra={
+                        "request_id": request_id,
+                        "error_type": e.__class__.__name__,
+                        "status_code": e.status_code,
+                        **e.extra,
+                    },
+                )
+                if response_started:
+                    raise
+                await JSONResponse(
+                    status_code=e.status_code,
+                    content={"detail": e.message, "request_id": request_id, **e.extra},
+                )(scope, receive, send_with_headers)
+            except Exception as e:
+                logger.exception(
+                    f"Unhandled error: {str(e)}", extra={"request_id": request_id}
+                )
+                if response_started:
+                    raise
+                await JSONResponse(
+                    status_code=500,
+                    content={
+                        "detail": "Internal server error",
+                        "request_id": request_id,
+                    },
+                )(scope, receive, send_with_headers)
+            finally:
+                request_scope.reset(scope_token)
+                if profiler is not None:
+                    await self.profiler.save(profiler, request_id)
+            request_span.set_attribute("http.route", route_name(scope))
+            request_span.set_attribute("http.status_code", status_code)
+
+        REQUEST_SECONDS.observe(
+            time.time() - start_time,
+            method=request.method,
+            route=route_name(scope),
+            status=str(status_code),
+        )
         logger.info(
             "Request completed",
             extra={
                 "request_id": request_id,
                 "method": request.method,
                 "url": str(request.url),
-                "status_code": response.status_code,
-                "process_time": process_time,
+                "status_code": status_code,
+                "process_time": time.time() - start_time,
             },
         )
 
-        return response
-
-
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(
-        self,
-        app: FastAPI,
-        calls: int = 100,
-        period: int = 60,
-        excluded_paths: set[str] = {"/health", "/health/detailed"},
-    ):
-        super().__init__(app)
-        self.calls = calls
-        self.period = period
-        self.clients = {}
-        self.excluded_paths = excluded_paths
-
-    async def dispatch(
-        self, request: Request, call_next: RequestResponseEndpoint
-    ) -> Response:
-        if request.url.path in self.excluded_paths:
-            return await call_next(request)
-
-        client_ip = request.client.host
-
-        if not self._is_allowed(client_ip):
-            raise RateLimitException(
-                message="Too many requests",
-                extra={
-                    "client_ip": client_ip,
-                    "limit": self.calls,
-                    "period": f"{self.period} seconds",
-                },
-            )
-
-        return await call_next(request)
-
-    def _is_allowed(self, client_ip: str) -> bool:
-        now = datetime.now(timezone.utc).timestamp()
-        if client_ip not in self.clients:
-            self.clients[client_ip] = [(now, 1)]
-            return True
-
-        requests = self.clients[client_ip]
-        while requests and now - requests[0][0] > self.period:
-            requests.pop(0)
-
-        total_requests = sum(count for _, count in requests)
-        if total_requests >= self.calls:
-            return False
-
-        requests.append((now, 1))
-        return True
-
-
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(
-        self, request: Request, call_next: RequestResponseEndpoint
-    ) -> Response:
-        response = await call_next(request)
-
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = (
-            "max-age=31536000; includeSubDomains"
+    async def _check_rate_limit(
+        self, request: Request, headers: dict
+    ) -> Optional[Response]:
+        """Adds the rate limit headers, and returns the 429 response when
+        the client is over its limit"""
+        if not self.rate_limit or request.url.path in self.excluded_paths:
+            return None
+
+        client_key = rate_limit_key(request)
+        result = await self.store.hit(client_key, self.calls, self.period)
+        headers.update(result.headers())
+        if result.allowed:
+            return None
+
+        error = RateLimitException(
+            message="Too many requests",
+            extra={
+                "client": client_key,
+                "limit": self.calls,
+                "period": f"{self.period} seconds",
+            },
+        )
+        return JSONResponse(
+            status_code=error.status_code,
+            content={"detail": error.message, **error.extra},
         )
-        response.headers["Content-Security-Policy"] = "default-src 'self'"
-
-        return response
 
 
 def setup_middleware(app: FastAPI) -> None:
-    app.add_middleware(RequestContextMiddleware)
-
-    app.add_middleware(LoggingMiddleware)
-
     app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.CORS_ORIGINS,
@@ -168,12 +227,13 @@ def setup_middleware(app: FastAPI) -> None:
         allow_headers=["*"],
     )
 
-    if settings.ENV == "production":
-        app.add_middleware(
-            RateLimitMiddleware,
-            calls=settings.RATE_LIMIT_CALLS,
-            period=settings.RATE_LIMIT_PERIOD,
-            excluded_paths=settings.RATE_LIMIT_EXCLUDED_PATHS,
-        )
-
-    app.add_middleware(SecurityHeadersMiddleware)
+    # Outermost, so CORS preflight responses are still rate limited and get
+    # the security headers
+    app.add_middleware(
+        AppMiddleware,
+        rate_limit=settings.ENV == "production",
+        calls=settings.RATE_LIMIT_CALLS,
+        period=settings.RATE_LIMIT_PERIOD,
+        excluded_paths=settings.RATE_LIMIT_EXCLUDED_PATHS,
+        profiler=get_request_profiler(),
+    )
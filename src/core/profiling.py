@@ -0,0 +1,92 @@
+import asyncio
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Optional
+
+from fastapi import Request
+
+from src.core.config import settings
+from src.core.logging import get_logger
+
+if TYPE_CHECKING:
+    from pyinstrument import Profiler
+
+logger = get_logger("profiling")
+
+TRUTHY = {"1", "true", "yes"}
+
+
+class RequestProfiler:
+    """Samples single requests on demand with pyinstrument.
+
+    A request is profiled when it carries `X-Profile: 1` or `?profile=1` and
+    its token belongs to one of `admin_user_ids`. The profiler runs in async
+    mode, so time spent awaiting the database, LLM or other I/O is shown
+    apart from CPU time; work handed to worker threads shows up as awaits.
+    Requests without the flag only pay for a header lookup.
+    """
+
+    def __init__(
+        self,
+        admin_user_ids: Iterable[int],
+        output_dir: str,
+        interval: float,
+    ):
+        self.admin_user_ids = {str(user_id) for user_id in admin_user_ids}
+        self.output_dir = Path(output_dir)
+        self.interval = interval
+
+    def requested(self, request: Request) -> bool:
+        flag = request.headers.get("x-profile")
+        if flag is None and b"profile=" in request.scope.get("query_string", b""):
+            flag = request.query_params.get("profile")
+        return flag is not None and flag.lower() in TRUTHY
+
+    def start(self, user_id: Optional[str]) -> Optional["Profiler"]:
+        if user_id not in self.admin_user_ids:
+            return None
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning(
+                "Profiling was requested but pyinstrument is not installed, "
+                "install the profiling extra"
+            )
+            return None
+
+        profiler = Profiler(interval=self.interval, async_mode="enabled")
+        profiler.start()
+        return profiler
+
+    async def save(self, profiler: "Profiler", report_id: str) -> None:
+        profiler.stop()
+        try:
+            path = self.report_path(report_id)
+            html = await asyncio.to_thread(profiler.output_html)
+            await asyncio.to_thread(self._write, path, html)
+            logger.info(
+                "Request profile saved",
+                extra={"request_id": report_id, "path": str(path)},
+            )
+        except Exception as e:
+            logger.error(f"Failed to save request profile: {str(e)}", exc_info=True)
+
+    def report_path(self, report_id: str) -> Path:
+        # Reports are named after the request id, which also keeps arbitrary
+        # paths out of the /profiles route
+        return self.output_dir / f"{uuid.UUID(report_id)}.html"
+
+    def _write(self, path: Path, html: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(html, encoding="utf-8")
+
+
+def get_request_profiler() -> Optional[RequestProfiler]:
+    """None unless some admin is allowed to profile"""
+    if not settings.PROFILING_ADMIN_USER_IDS:
+        return None
+    return RequestProfiler(
+        settings.PROFILING_ADMIN_USER_IDS,
+        settings.PROFILING_DIR,
+        settings.PROFILING_INTERVAL,
+    )
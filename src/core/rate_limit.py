@@ -0,0 +1,166 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+from src.core.config import settings
+from src.core.logging import logger
+
+
+class RateLimitResult:
+    def __init__(self, allowed: bool, limit: int, remaining: int, retry_after: float):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.retry_after = retry_after
+
+    def headers(self) -> dict:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(math.ceil(self.retry_after))
+        return headers
+
+
+def sliding_window_result(
+    allowed: bool,
+    previous: int,
+    current: int,
+    limit: int,
+    period: int,
+    elapsed: float,
+) -> RateLimitResult:
+    """Build the result for a sliding window counter.
+
+    The rate over the last `period` seconds is estimated as the current
+    window's count plus the previous window's, weighted by how much of it
+    still overlaps the sliding window. That needs two counters per client
+    instead of a timestamp per request.
+    """
+    if limit <= 0:
+        return RateLimitResult(False, limit, 0, float(period))
+
+    estimated = previous * (1 - elapsed / period) + current
+    remaining = max(int(limit - estimated), 0)
+    if allowed:
+        return RateLimitResult(True, limit, remaining, 0.0)
+
+    room = limit - 1
+    if current <= room and previous:
+        # Wait for enough of the previous window to slide out
+        retry_after = period * (1 - (room - current) / previous) - elapsed
+    else:
+        # Wait for this window to become the previous one and decay
+        retry_after = period - elapsed + period * (1 - room / current)
+    return RateLimitResult(False, limit, 0, max(retry_after, 0.0))
+
+
+class MemoryRateLimitStore:
+    """Per-process sliding window counters.
+
+    Memory is bounded by `max_clients`: the least recently seen client is
+    evicted first, which only ever forgets clients that have gone quiet.
+    Each worker process keeps its own counters, so the effective limit is
+    multiplied by the number of workers.
+    """
+
+    def __init__(self, max_clients: int = settings.RATE_LIMIT_MAX_CLIENTS):
+        self.max_clients = max_clients
+        # key -> [window, previous window count, current window count]
+        self._counters: "OrderedDict[str, List[int]]" = OrderedDict()
+
+    async def hit(self, key: str, limit: int, period: int) -> RateLimitResult:
+        now = time.time()
+        window = int(now // period)
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters[key] = [window, 0, 0]
+            if len(self._counters) > self.max_clients:
+                self._counters.popitem(last=False)
+        else:
+            self._counters.move_to_end(key)
+            if counter[0] != window:
+                counter[1] = counter[2] if counter[0] == window - 1 else 0
+                counter[2] = 0
+                counter[0] = window
+
+        elapsed = now - window * period
+        allowed = counter[1] * (1 - elapsed / period) + counter[2] + 1 <= limit
+        if allowed:
+            counter[2] += 1
+        return sliding_window_result(
+            allowed, counter[1], counter[2], limit, period, elapsed
+        )
+
+
+class RedisRateLimitStore:
+    """Sliding window counters shared by every worker and task through Redis.
+
+    Each client has one key per window, expiring after two periods, and the
+    check-and-increment runs as a single script so concurrent requests can't
+    overshoot the limit. If Redis is unreachable requests are let through
+    rather than failing the API. Any client with an async `eval`, such as
+    fakeredis, can stand in for Redis locally.
+    """
+
+    SCRIPT = """
+        local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+        local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+        if previous * tonumber(ARGV[2]) + current + 1 > tonumber(ARGV[1]) then
+            return {0, previous, current}
+        end
+        current = redis.call('INCR', KEYS[1])
+        redis.call('EXPIRE', KEYS[1], ARGV[3])
+        return {1, previous, current}
+    """
+
+    def __init__(self, client: Any, prefix: str = "ratelimit"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisRateLimitStore":
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise ImportError(
+                "RATE_LIMIT_BACKEND=redis requires the redis package"
+            ) from e
+        return cls(redis.from_url(url))
+
+    async def hit(self, key: str, limit: int, period: int) -> RateLimitResult:
+        now = time.time()
+        window = int(now // period)
+        elapsed = now - window * period
+        # The hash tag keeps both windows of a client in one cluster slot
+        current_key = f"{self.prefix}:{{{key}}}:{window}"
+        previous_key = f"{self.prefix}:{{{key}}}:{window - 1}"
+        try:
+            allowed, previous, current = await self.client.eval(
+                self.SCRIPT,
+                2,
+                current_key,
+                previous_key,
+                limit,
+                1 - elapsed / period,
+                period * 2,
+            )
+        except Exception as e:
+            logger.error(f"Rate limit store unavailable: {str(e)}", exc_info=True)
+            return RateLimitResult(True, limit, limit, 0.0)
+        return sliding_window_result(
+            bool(allowed), int(previous), int(current), limit, period, elapsed
+        )
+
+
+def get_rate_limit_store(
+    backend: str = settings.RATE_LIMIT_BACKEND,
+    redis_url: Optional[str] = None,
+):
+    if backend == "memory":
+        return MemoryRateLimitStore()
+    if backend == "redis":
+        return RedisRateLimitStore.from_url(redis_url or settings.RATE_LIMIT_REDIS_URL)
+    raise ValueError(f"Unsupported rate limit backend: {backend}")
@@ -0,0 +1,75 @@
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# src.core.logging imports settings, so log through the stdlib logger it sets up
+logger = logging.getLogger("knowflow")
+
+
+def get_aws_secret(secret_name: str, region_name: str = "ap-south-1") -> dict:
+    # boto3 takes a few hundred ms to import, only pay for it when needed
+    import boto3
+
+    session = boto3.session.Session()
+    client = session.client(service_name="secretsmanager", region_name=region_name)
+    get_secret_value_response = client.get_secret_value(SecretId=secret_name)
+    secret = get_secret_value_response["SecretString"]
+    return dict(json.loads(secret))
+
+
+class SecretStore:
+    """Application secrets, resolved on first use rather than at import.
+
+    Values come from a local JSON file when `secrets_file` is set, otherwise
+    from AWS Secrets Manager, and are cached for `ttl_seconds` so rotated
+    secrets are picked up without a restart. A failed refresh keeps serving
+    the last values it got and is retried after `retry_seconds`.
+    """
+
+    def __init__(
+        self,
+        secret_name: str,
+        region_name: str,
+        ttl_seconds: float = 300.0,
+        secrets_file: str = "",
+        retry_seconds: float = 30.0,
+    ):
+        self.secret_name = secret_name
+        self.region_name = region_name
+        self.ttl_seconds = ttl_seconds
+        self.secrets_file = secrets_file
+        self.retry_seconds = retry_seconds
+        self._lock = threading.Lock()
+        self._values: Optional[Dict[str, Any]] = None
+        self._expires_at = 0.0
+
+    def get(self, name: str) -> Any:
+        if self._values is None or time.monotonic() >= self._expires_at:
+            with self._lock:
+                if self._values is None or time.monotonic() >= self._expires_at:
+                    self._refresh()
+        return self._values.get(name)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._expires_at = 0.0
+
+    def _refresh(self) -> None:
+        try:
+            self._values = self._load()
+            self._expires_at = time.monotonic() + self.ttl_seconds
+        except Exception as e:
+            logger.error(f"Failed to load secrets: {str(e)}", exc_info=True)
+            if self._values is None:
+                self._values = {}
+            self._expires_at = time.monotonic() + self.retry_seconds
+
+    def _load(self) -> Dict[str, Any]:
+        if self.secrets_file:
+            return dict(json.loads(Path(self.secrets_file).read_text()))
+        if not self.secret_name:
+            return {}
+        return get_aws_secret(self.secret_name, self.region_name)
@@ -0,0 +1,208 @@
+import json
+import time
+import inspect
+import atexit
+import random
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache, wraps
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from src.core.config import settings
+from src.core.logging import get_logger
+
+logger = get_logger("tracing")
+
+
+class Span:
+    """One timed operation in a trace, shaped like an OpenTelemetry span"""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_span_id",
+        "request_id",
+        "attributes",
+        "start_time",
+        "end_time",
+        "status",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_span_id: Optional[str] = None,
+        request_id: Optional[str] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_span_id = parent_span_id
+        self.request_id = request_id
+        self.attributes = attributes or {}
+        self.start_time = time.time()
+        self.end_time: Optional[float] = None
+        self.status = "OK"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def add_to_attribute(self, key: str, amount: float) -> None:
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def record_exception(self, error: BaseException) -> None:
+        self.status = "ERROR"
+        self.attributes["exception.type"] = type(error).__name__
+        self.attributes["exception.message"] = str(error)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "request_id": self.request_id,
+            "start_time": self.start_time,
+            "duration_ms": round((self.end_time - self.start_time) * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class NoopSpan:
+    """Handed out when tracing is off, so instrumented code needs no checks"""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def add_to_attribute(self, key: str, amount: float) -> None:
+        pass
+
+    def record_exception(self, error: BaseException) -> None:
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class ConsoleSpanExporter:
+    """Logs finished spans through the app logger's queue"""
+
+    def export(self, span: Span) -> None:
+        logger.info(f"Span {span.name}", extra={"span": span.to_dict()})
+
+
+class FileSpanExporter:
+    """Appends finished spans to a JSON lines file"""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+@lru_cache
+def get_span_exporter():
+    if settings.TRACING_EXPORTER == "console":
+        return ConsoleSpanExporter()
+    if settings.TRACING_EXPORTER == "file":
+        return FileSpanExporter(settings.TRACING_FILE)
+    if settings.TRACING_EXPORTER:
+        raise ValueError(f"Unknown tracing exporter: {settings.TRACING_EXPORTER}")
+    return None
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[tuple[str, str]]:
+    """(trace_id, parent span_id) from a W3C traceparent header"""
+    parts = (header or "").split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+@contextmanager
+def span(
+    name: str,
+    request_id: Optional[str] = None,
+    traceparent: Optional[str] = None,
+    **attributes: Any,
+) -> Iterator[Any]:
+    """Runs the block in a child of the current span, or in a new trace.
+
+    `request_id` and `traceparent` only matter for root spans: children
+    inherit the trace and request id of their parent.
+    """
+    exporter = get_span_exporter()
+    if exporter is None:
+        yield NOOP_SPAN
+        return
+
+    parent = current_span.get()
+    if parent is not None:
+        new_span = Span(
+            name, parent.trace_id, parent.span_id, parent.request_id, attributes
+        )
+    else:
+        trace_id, parent_span_id = parse_traceparent(traceparent) or (
+            f"{random.getrandbits(128):032x}",
+            None,
+        )
+        new_span = Span(name, trace_id, parent_span_id, request_id, attributes)
+
+    token = current_span.set(new_span)
+    try:
+        yield new_span
+    except BaseException as e:
+        new_span.record_exception(e)
+        raise
+    finally:
+        current_span.reset(token)
+        new_span.end_time = time.time()
+        try:
+            exporter.export(new_span)
+        except Exception as e:
+            logger.error(f"Failed to export span: {str(e)}")
+
+
+def get_current_span():
+    return current_span.get() or NOOP_SPAN
+
+
+def traced(name: str) -> Callable:
+    """Decorator running a function, sync or async, in a span"""
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,10 +1,19 @@
+import asyncio
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
+from fastapi.responses import FileResponse, PlainTextResponse
 
+from src.core.auth import get_current_user
+from src.core.clients import get_clients
 from src.core.config import settings
 from src.core.middleware import setup_middleware
-from src.core.database import init_db
+from src.core.database import dispose_engines, init_db
+from src.core.exceptions import AuthorizationException, NotFoundException
 from src.core.logging import logger
+from src.core.metrics import registry
+from src.core.profiling import get_request_profiler
+from src.models.database import User
+from src.services.vector_index import VectorIndexManager
 from src.routes import (
     auth_routes,
     chat_routes,
@@ -18,7 +27,41 @@ async def lifespan(app: FastAPI):
     logger.info("Initializing database...")
     init_db()
     logger.info("Database initialized successfully")
+    # Index builds can take a while on a large table, so they run in the
+    # background rather than holding up startup
+    app.state.vector_index_task = asyncio.create_task(maintain_vector_indexes())
+
+    clients = get_clients()
+    try:
+        clients.connect()
+    except Exception as e:
+        logger.error(f"Failed to initialize shared clients: {str(e)}", exc_info=True)
+    app.state.clients = clients
     yield
+    app.state.vector_index_task.cancel()
+    clients.close()
+    await dispose_engines()
+
+
+async def maintain_vector_indexes() -> None:
+    """Sync indexes with the settings, then keep giving tenants that grow
+    past TENANT_VECTOR_INDEX_MIN_ROWS their partial index"""
+    index_manager = VectorIndexManager()
+    try:
+        await asyncio.to_thread(index_manager.maintain)
+    except Exception as e:
+        logger.error(f"Failed to ensure vector index: {str(e)}", exc_info=True)
+
+    if settings.TENANT_VECTOR_INDEX_MIN_ROWS <= 0:
+        return
+    while True:
+        await asyncio.sleep(settings.TENANT_VECTOR_INDEX_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(index_manager.ensure_tenant_indexes)
+        except Exception as e:
+            logger.error(
+                f"Failed to ensure tenant vector indexes: {str(e)}", exc_info=True
+            )
 
 
 app = FastAPI(
@@ -47,9 +90,35 @@ async def detailed_health_check():
         "environment": settings.ENV,
         "database": "connected",
         "api_version": "v1",
+        **get_clients().metrics(),
     }
 
 
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of request, stage and LLM usage metrics"""
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/profiles/{report_id}", tags=["Health"], response_class=FileResponse)
+async def profile_report(
+    report_id: str, current_user: User = Depends(get_current_user)
+):
+    """Profile of a request that was sent with `X-Profile: 1`"""
+    profiler = get_request_profiler()
+    if profiler is None or str(current_user.id) not in profiler.admin_user_ids:
+        raise AuthorizationException("Profiling is limited to admins")
+    try:
+        path = profiler.report_path(report_id)
+    except ValueError:
+        raise NotFoundException("Profile not found")
+    if not path.exists():
+        raise NotFoundException("Profile not found")
+    return FileResponse(path, media_type="text/html")
+
+
 app.include_router(
     auth_routes.router, prefix=f"{settings.API_V1_PREFIX}/auth", tags=["Authentication"]
 )
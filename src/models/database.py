@@ -1,13 +1,34 @@
 import enum
 import sqlalchemy
 from datetime import datetime, timezone
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Text, Enum
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import (
+    ARRAY,
+    BigInteger,
+    Column,
+    Integer,
+    String,
+    DateTime,
+    ForeignKey,
+    Index,
+    JSON,
+    Text,
+    Enum,
+    literal_column,
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
+from src.core.config import settings
 from src.core.database import Base
 
 
+def utcnow() -> datetime:
+    # Naive UTC for the TIMESTAMP WITHOUT TIME ZONE columns; asyncpg rejects
+    # aware values there instead of silently dropping the offset
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class DocumentStatus(enum.Enum):
     PENDING = "pending"
     PROCESSING = "processing"
@@ -22,11 +43,11 @@ class User(Base):
     username = Column(String(50), unique=True, nullable=False)
     email = Column(String(100), unique=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=utcnow)
     updated_at = Column(
         DateTime,
-        default=datetime.now(timezone.utc),
-        onupdate=datetime.now(timezone.utc),
+        default=utcnow,
+        onupdate=utcnow,
     )
 
     chat_sessions = relationship("ChatSession", back_populates="user")
@@ -58,7 +79,7 @@ class Message(Base):
     sender = Column(String(50), nullable=False)
     content = Column(String, nullable=False)
     context_used = Column(JSON)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=utcnow)
 
     chat_session = relationship("ChatSession", back_populates="messages")
 
@@ -74,16 +95,17 @@ class Document(Base):
     status = Column(Enum(DocumentStatus), default=DocumentStatus.PENDING)
     error_message = Column(Text)
     doc_metadata = Column(JSON)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=utcnow)
     updated_at = Column(
         DateTime,
-        default=datetime.now(timezone.utc),
-        onupdate=datetime.now(timezone.utc),
+        default=utcnow,
+        onupdate=utcnow,
     )
     indexed_at = Column(DateTime)
 
     user = relationship("User", back_populates="documents")
     chunks = relationship("DocumentChunk", back_populates="document")
+    parents = relationship("DocumentParent", back_populates="document")
 
 
 class DocumentChunk(Base):
@@ -91,14 +113,56 @@ class DocumentChunk(Base):
 
     id = Column(Integer, primary_key=True)
     document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    # Denormalized tenant keys so vector search never joins documents
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    doc_id = Column(String(36), nullable=False)
     chunk_index = Column(Integer, nullable=False)
+    # Window in document_parents this chunk was split from, if any
+    parent_index = Column(Integer)
     content = Column(Text, nullable=False)
     chunk_metadata = Column(JSON)
-    embedding_vector = Column(JSON)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    embedding = Column(Vector(settings.EMBEDDING_DIMENSION))
+    # MinHash signature and LSH band keys for near-duplicate detection; band
+    # keys are left NULL on unembedded duplicates so only embedded rows match
+    minhash = Column(ARRAY(Integer))
+    lsh_bands = Column(ARRAY(BigInteger))
+    created_at = Column(DateTime, default=utcnow)
 
     document = relationship("Document", back_populates="chunks")
 
+    __table_args__ = (
+        Index("ix_document_chunks_user_doc", user_id, doc_id),
+        Index("ix_document_chunks_document_chunk", document_id, chunk_index),
+        Index("ix_document_chunks_lsh_bands", lsh_bands, postgresql_using="gin"),
+        Index(
+            "ix_document_chunks_content_fts",
+            func.to_tsvector(
+                literal_column(f"'{settings.TEXT_SEARCH_CONFIG}'"), content
+            ),
+            postgresql_using="gin",
+        ),
+    )
+
+
+class DocumentParent(Base):
+    """Larger window of a document that small search chunks expand to"""
+
+    __tablename__ = "document_parents"
+
+    id = Column(Integer, primary_key=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    parent_index = Column(Integer, nullable=False)
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=utcnow)
+
+    document = relationship("Document", back_populates="parents")
+
+    __table_args__ = (
+        sqlalchemy.UniqueConstraint(
+            "document_id", "parent_index", name="uix_document_parent_index"
+        ),
+    )
+
 
 class UserFile(Base):
     __tablename__ = "user_files"
@@ -110,11 +174,11 @@ class UserFile(Base):
     content_type = Column(String(100), nullable=False)
     size = Column(Integer, nullable=False)
     file_metadata = Column(JSON)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=utcnow)
     updated_at = Column(
         DateTime,
-        default=datetime.now(timezone.utc),
-        onupdate=datetime.now(timezone.utc),
+        default=utcnow,
+        onupdate=utcnow,
     )
 
     user = relationship("User", back_populates="files")
@@ -2,6 +2,8 @@ from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
+from src.core.config import settings
+
 
 # Auth Models
 class UserLogin(BaseModel):
@@ -16,6 +18,42 @@ class UserRegister(BaseModel):
 
 
 # Chat Models
+class RetrievalOptions(BaseModel):
+    vector_weight: float = Field(
+        default=settings.HYBRID_VECTOR_WEIGHT,
+        ge=0,
+        description="Reciprocal rank fusion weight of dense vector results",
+    )
+    lexical_weight: float = Field(
+        default=settings.HYBRID_LEXICAL_WEIGHT,
+        ge=0,
+        description="Reciprocal rank fusion weight of full-text results, 0 disables",
+    )
+    ef_search: int = Field(
+        default=settings.HNSW_EF_SEARCH,
+        ge=1,
+        le=1000,
+        description="HNSW candidate list size, higher trades latency for recall",
+    )
+    probes: int = Field(
+        default=settings.IVFFLAT_PROBES,
+        ge=1,
+        le=1000,
+        description="IVFFlat lists scanned per query, higher trades latency for recall",
+    )
+    expand_parents: bool = Field(
+        default=True,
+        description="Return the parent window of each matched chunk instead of the chunk",
+    )
+    neighbor_window: int = Field(
+        default=0,
+        ge=0,
+        le=10,
+        description="Add this many neighboring chunks on each side of a match, "
+        "takes precedence over expand_parents",
+    )
+
+
 class ChatRequest(BaseModel):
     query: str = Field(..., min_length=1)
     session_id: Optional[str] = None
@@ -29,6 +67,9 @@ class ChatRequest(BaseModel):
     use_retrieval_evaluation: bool = Field(
         default=True, description="Whether to use retrieval evaluation feature"
     )
+    retrieval: RetrievalOptions = Field(
+        default_factory=RetrievalOptions, description="Retrieval tuning options"
+    )
 
 
 # Session Models
@@ -96,7 +96,9 @@ class DocumentUploadResponse(BaseModel):
 class DocumentIndexResponse(BaseModel):
     doc_id: str
     status: DocumentStatus
-    chunks_processed: int
+    chunks_processed: int = 0
+    duplicate_chunks: int = 0
+    dedup_ratio: float = 0.0
     message: str
 
 
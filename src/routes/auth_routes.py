@@ -23,7 +23,7 @@ async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     auth_service: AuthService = Depends(get_auth_service),
 ):
-    user = auth_service.authenticate_user(form_data.username, form_data.password)
+    user = await auth_service.authenticate_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -47,7 +47,7 @@ async def login_for_access_token(
 async def login(
     user_data: UserLogin, auth_service: AuthService = Depends(get_auth_service)
 ):
-    user = auth_service.authenticate_user(user_data.email, user_data.password)
+    user = await auth_service.authenticate_user(user_data.email, user_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -69,7 +69,7 @@ async def login(
 async def register(
     user_data: UserRegister, auth_service: AuthService = Depends(get_auth_service)
 ):
-    user = auth_service.create_user(
+    user = await auth_service.create_user(
         username=user_data.username, email=user_data.email, password=user_data.password
     )
     return RegisterResponse(
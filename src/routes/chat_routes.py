@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.auth import get_current_user
-from src.core.database import get_db
+from src.core.clients import ClientRegistry, get_client_registry
+from src.core.database import get_async_db
 from src.core.exceptions import ExternalServiceException
-from src.core.logging import logger
+from src.core.logging import get_logger
 from src.models.request import ChatRequest, FollowUpChatRequest, RenameChatRequest
 from src.models.response import (
     ChatResponse,
@@ -16,21 +17,22 @@ from src.models.database import User
 from src.services.chat.chat_service import ChatService
 from src.services.session_service import SessionService
 
+logger = get_logger("chat")
 
 router = APIRouter()
-chat_service = ChatService()
 
 
 @router.post("", response_model=ChatResponse)
 async def chat(
     request: ChatRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    clients: ClientRegistry = Depends(get_client_registry),
 ) -> ChatResponse:
     try:
         logger.info(f"Processing chat query: {request.query[:50]}...")
 
-        chat_service = ChatService(db)
+        chat_service = ChatService(db, clients)
         session_service = SessionService(db)
 
         response = await chat_service.process_query(
@@ -40,6 +42,7 @@ async def chat(
             document_ids=request.document_ids,
             use_query_decomposition=request.use_query_decomposition,
             use_retrieval_evaluation=request.use_retrieval_evaluation,
+            retrieval_options=request.retrieval,
         )
 
         if request.session_id:
@@ -78,10 +81,11 @@ async def chat(
 async def follow_up_chat(
     session_id: str,
     request: FollowUpChatRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    clients: ClientRegistry = Depends(get_client_registry),
     current_user: User = Depends(get_current_user),
 ) -> FollowUpChatResponse:
-    chat_service = ChatService(db)
+    chat_service = ChatService(db, clients)
     session_service = SessionService(db)
 
     await session_service.add_message(
@@ -109,10 +113,11 @@ async def rename_chat(
     session_id: str,
     request: RenameChatRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    clients: ClientRegistry = Depends(get_client_registry),
 ) -> RenameChatResponse:
     try:
-        chat_service = ChatService(db)
+        chat_service = ChatService(db, clients)
         response = await chat_service.rename_chat_session(
             session_id=session_id,
             new_title=request.new_title,
@@ -135,10 +140,11 @@ async def rename_chat(
 async def delete_chat(
     session_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    clients: ClientRegistry = Depends(get_client_registry),
 ) -> DeleteChatResponse:
     try:
-        chat_service = ChatService(db)
+        chat_service = ChatService(db, clients)
         response = await chat_service.delete_chat_session(
             session_id=session_id,
             current_user_id=current_user.id,
@@ -1,7 +1,10 @@
 from typing import Annotated, List, Optional
 from fastapi import APIRouter, Depends, UploadFile, BackgroundTasks, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.auth import get_current_user
+from src.core.clients import ClientRegistry, get_client_registry
+from src.core.database import get_async_db
 from src.models.database import User
 from src.models.request import DocumentIndexRequest
 from src.models.response import (
@@ -13,8 +16,12 @@ from src.services.document_service import DocumentService
 router = APIRouter()
 
 
-def get_document_service(current_user: User = Depends(get_current_user)):
-    return DocumentService(current_user=current_user)
+def get_document_service(
+    current_user: User = Depends(get_current_user),
+    clients: ClientRegistry = Depends(get_client_registry),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return DocumentService(db=db, current_user=current_user, clients=clients)
 
 
 @router.get("/")
@@ -42,7 +49,7 @@ async def upload_documents(
 ):
     results = await document_service.upload_documents(files)
     for doc_id in [doc["doc_id"] for doc in results if "doc_id" in doc]:
-        background_tasks.add_task(document_service.index_document, doc_id)
+        background_tasks.add_task(document_service.index_in_background, doc_id)
     return MultiDocumentUploadResponse(
         documents=results,
         message=f"{len(results)} documents uploaded and queued for processing",
@@ -1,8 +1,8 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.core.database import get_db
+from src.core.database import get_async_db
 from src.core.auth import get_current_user
 from src.models.database import User
 from src.models.request import CreateSessionRequest, SendMessageRequest
@@ -21,7 +21,7 @@ router = APIRouter()
 async def create_session(
     request: CreateSessionRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     service = SessionService(db)
     session = await service.create_session(current_user.id, request.title)
@@ -31,7 +31,7 @@ async def create_session(
 @router.get("", response_model=List[ChatSessionListResponse])
 async def list_sessions(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     service = SessionService(db)
     sessions = await service.get_user_sessions(current_user.id)
@@ -42,7 +42,7 @@ async def list_sessions(
 async def get_session(
     session_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     service = SessionService(db)
     session = await service.get_session(session_id, current_user.id)
@@ -58,7 +58,7 @@ async def send_message(
     session_id: str,
     request: SendMessageRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     service = SessionService(db)
     session = await service.get_session(session_id, current_user.id)
@@ -82,7 +82,7 @@ async def send_message(
 async def delete_session(
     session_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     service = SessionService(db)
     session = await service.get_session(session_id, current_user.id)
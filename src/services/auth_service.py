@@ -1,8 +1,10 @@
+import asyncio
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from passlib.context import CryptContext
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
@@ -14,7 +16,7 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
 class AuthService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
@@ -23,43 +25,46 @@ class AuthService:
     def get_password_hash(self, password: str) -> str:
         return pwd_context.hash(password)
 
-    def get_user_by_username(self, username: str) -> Optional[User]:
-        return self.db.query(User).filter(User.username == username).first()
+    async def get_user_by_username(self, username: str) -> Optional[User]:
+        return await self.db.scalar(select(User).where(User.username == username))
 
-    def get_user_by_email(self, email: str) -> Optional[User]:
-        return self.db.query(User).filter(User.email == email).first()
+    async def get_user_by_email(self, email: str) -> Optional[User]:
+        return await self.db.scalar(select(User).where(User.email == email))
 
-    def get_user_by_id(self, user_id: int) -> Optional[User]:
-        return self.db.query(User).filter(User.id == user_id).first()
+    async def get_user_by_id(self, user_id: int) -> Optional[User]:
+        return await self.db.scalar(select(User).where(User.id == user_id))
 
-    def create_user(self, username: str, email: str, password: str) -> User:
-        if self.get_user_by_username(username):
+    async def create_user(self, username: str, email: str, password: str) -> User:
+        if await self.get_user_by_username(username):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Username already registered",
             )
-        if self.get_user_by_email(email):
+        if await self.get_user_by_email(email):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered",
             )
 
-        hashed_password = self.get_password_hash(password)
+        # bcrypt is deliberately slow, keep it off the event loop
+        hashed_password = await asyncio.to_thread(self.get_password_hash, password)
         user = User(
             username=username,
             email=email,
             hashed_password=hashed_password,
         )
         self.db.add(user)
-        self.db.commit()
-        self.db.refresh(user)
+        await self.db.commit()
+        await self.db.refresh(user)
         return user
 
-    def authenticate_user(self, email: str, password: str) -> Optional[User]:
-        user = self.get_user_by_email(email)
+    async def authenticate_user(self, email: str, password: str) -> Optional[User]:
+        user = await self.get_user_by_email(email)
         if not user:
             return None
-        if not self.verify_password(password, user.hashed_password):
+        if not await asyncio.to_thread(
+            self.verify_password, password, user.hashed_password
+        ):
             return None
         return user
 
@@ -78,7 +83,7 @@ class AuthService:
         encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
         return encoded_jwt
 
-    def get_current_user(self, token: str) -> User:
+    async def get_current_user(self, token: str) -> User:
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
@@ -87,20 +92,22 @@ class AuthService:
 
         try:
             payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-            user_id: int = payload.get("sub")
-            if user_id is None:
+            subject = payload.get("sub")
+            if subject is None:
                 raise credentials_exception
-        except JWTError:
+            # The subject is a string claim; asyncpg won't coerce it to int
+            user_id = int(subject)
+        except (JWTError, ValueError):
             raise credentials_exception
 
-        user = self.get_user_by_id(user_id)
+        user = await self.get_user_by_id(user_id)
         if user is None:
             raise credentials_exception
 
         return user
 
-    def create_admin_user(self, username: str, email: str, password: str) -> User:
-        return self.create_user(username, email, password)
+    async def create_admin_user(self, username: str, email: str, password: str) -> User:
+        return await self.create_user(username, email, password)
 
     def get_user_s3_prefix(self, user_id: int) -> str:
         return f"user_{user_id}/"
@@ -1,31 +1,17 @@
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
-from langchain_postgres import PGVector
+from typing import Optional
 
-from src.core.config import settings
+from src.core.clients import ClientRegistry, get_clients
 from src.core.exceptions import ExternalServiceException
 from src.core.logging import logger
 
 
 class BaseLLMClient:
-    def __init__(self, service_name: str):
+    def __init__(self, service_name: str, clients: Optional[ClientRegistry] = None):
         self.service_name = service_name
         try:
-            self.llm = ChatGoogleGenerativeAI(
-                google_api_key=settings.GOOGLE_API_KEY,
-                model=settings.GEMINI_MODEL_NAME,
-                convert_system_message_to_human=True,
-            )
-
-            self.embeddings = GoogleGenerativeAIEmbeddings(
-                model=settings.GEMINI_EMBEDDING_MODEL,
-                google_api_key=settings.GOOGLE_API_KEY,
-            )
-
-            self.vector_store = PGVector(
-                connection=settings.DATABASE_URL,
-                embeddings=self.embeddings,
-                collection_name=settings.VECTOR_COLLECTION_NAME,
-            )
+            self.clients = clients or get_clients()
+            self.llm = self.clients.llm
+            self.embeddings = self.clients.embeddings
 
             logger.info(f"{service_name} initialized successfully")
         except Exception as e:
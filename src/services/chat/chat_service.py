@@ -1,37 +1,47 @@
+import asyncio
 from typing import List, Dict, Any, Optional
 from fastapi import HTTPException, status
-from langchain.schema import HumanMessage, SystemMessage
-from sqlalchemy.orm import Session
+from langchain_core.messages import HumanMessage, SystemMessage
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timezone
-from neo4j import GraphDatabase
 
-from src.core.database import get_db
-from src.core.config import settings
+from src.core.clients import ClientRegistry
 from src.core.exceptions import ExternalServiceException
-from src.core.logging import logger
-from src.models.request import FollowUpChatRequest
+from src.core.logging import get_logger
+from src.core.metrics import stage
+from src.core.tracing import get_current_span, traced
+from src.models.request import FollowUpChatRequest, RetrievalOptions
 from src.models.response import FollowUpChatResponse
 from src.models.database import ChatSession
 from src.models.database import Message
 from src.services.graph_service import GraphService
-from src.services.auth_service import AuthService
 from src.services.base_client import BaseLLMClient
+from src.services.chat.context_builder import ContextBuilder
 from src.services.chat.query_decomposition import QueryDecompositionService
 from src.services.chat.retrieval_evaluation import RetrievalEvaluationService
+from src.services.context_expansion import ContextExpansionService
+from src.services.hybrid_search import HybridSearchService
+from src.services.vector_search import merge_hits
+
+logger = get_logger("chat")
 
 
 class ChatService(BaseLLMClient):
-    def __init__(self, db: Session = None):
-        super().__init__("ChatService")
+    def __init__(self, db: AsyncSession, clients: Optional[ClientRegistry] = None):
+        super().__init__("ChatService", clients)
         try:
-            self.db = db or next(get_db())
-            self.auth_service = AuthService(self.db)
+            self.db = db
 
-            self.driver = GraphDatabase.driver(
-                settings.NEO4J_URI, auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD)
-            )
+            self.driver = self.clients.neo4j_driver
 
-            self.graph_service = GraphService()
+            self.graph_service = GraphService(self.clients)
+            self.hybrid_search_service = HybridSearchService()
+            self.vector_search_service = (
+                self.hybrid_search_service.vector_search_service
+            )
+            self.context_expansion_service = ContextExpansionService()
+            self.context_builder = ContextBuilder()
 
             self._query_decomposition_service = None
             self._retrieval_evaluation_service = None
@@ -51,15 +61,20 @@ class ChatService(BaseLLMClient):
     @property
     def query_decomposition_service(self):
         if self._query_decomposition_service is None:
-            self._query_decomposition_service = QueryDecompositionService()
+            self._query_decomposition_service = QueryDecompositionService(
+                clients=self.clients
+            )
         return self._query_decomposition_service
 
     @property
     def retrieval_evaluation_service(self):
         if self._retrieval_evaluation_service is None:
-            self._retrieval_evaluation_service = RetrievalEvaluationService()
+            self._retrieval_evaluation_service = RetrievalEvaluationService(
+                clients=self.clients
+            )
         return self._retrieval_evaluation_service
 
+    @traced("chat.process_query")
     async def process_query(
         self,
         query: str,
@@ -68,21 +83,33 @@ class ChatService(BaseLLMClient):
         document_ids: Optional[List[str]] = None,
         use_query_decomposition: bool = True,
         use_retrieval_evaluation: bool = True,
+        retrieval_options: Optional[RetrievalOptions] = None,
     ) -> Dict[str, Any]:
+        retrieval_options = retrieval_options or RetrievalOptions()
         try:
             if use_query_decomposition:
-                sub_questions = self.query_decomposition_service.decompose_query(query)
+                sub_questions = await asyncio.to_thread(
+                    self.query_decomposition_service.decompose_query, query
+                )
+                get_current_span().set_attribute("sub_questions", len(sub_questions))
                 if len(sub_questions) > 1:
                     responses = await self._process_multiple_queries(
                         sub_questions,
                         current_user_id,
                         document_ids,
                         use_retrieval_evaluation,
+                        retrieval_options,
+                    )
+                    return await asyncio.to_thread(
+                        self._synthesize_responses, query, responses
                     )
-                    return self._synthesize_responses(query, responses)
 
             return await self._process_single_query(
-                query, current_user_id, document_ids, use_retrieval_evaluation
+                query,
+                current_user_id,
+                document_ids,
+                use_retrieval_evaluation,
+                retrieval_options,
             )
 
         except Exception as e:
@@ -93,40 +120,68 @@ class ChatService(BaseLLMClient):
                 extra={"error": str(e)},
             )
 
+    @traced("chat.process_multiple_queries")
     async def _process_multiple_queries(
         self,
         queries: List[str],
         current_user_id: int,
         document_ids: Optional[List[str]],
         use_retrieval_evaluation: bool,
+        retrieval_options: RetrievalOptions,
     ) -> List[Dict[str, Any]]:
-        responses = []
-        for query in queries:
-            response = await self._process_single_query(
-                query, current_user_id, document_ids, use_retrieval_evaluation
-            )
-            responses.append(response)
-        return responses
+        return await asyncio.gather(
+            *[
+                self._process_single_query(
+                    query,
+                    current_user_id,
+                    document_ids,
+                    use_retrieval_evaluation,
+                    retrieval_options,
+                )
+                for query in queries
+            ]
+        )
 
+    @traced("chat.process_single_query")
     async def _process_single_query(
         self,
         query: str,
         current_user_id: int,
         document_ids: Optional[List[str]],
         use_retrieval_evaluation: bool,
+        retrieval_options: RetrievalOptions,
     ) -> Dict[str, Any]:
         try:
-            vector_results = self._get_vector_results(
-                query, current_user_id, document_ids
+            # to_thread carries the request context, and so the current span,
+            # into the worker thread
+            vector_hits, graph_results = await asyncio.gather(
+                asyncio.to_thread(
+                    self._get_vector_results,
+                    query,
+                    current_user_id,
+                    document_ids,
+                    retrieval_options,
+                ),
+                asyncio.to_thread(self._get_graph_results, query),
             )
-            graph_results = self._get_graph_results(query)
 
             if use_retrieval_evaluation:
-                vector_results = await self._apply_retrieval_evaluation(
-                    query, vector_results, current_user_id, document_ids
+                vector_hits = await self._apply_retrieval_evaluation(
+                    query,
+                    vector_hits,
+                    current_user_id,
+                    document_ids,
+                    retrieval_options,
                 )
 
-            context = self._merge_results(vector_results, graph_results)
+            vector_results = [hit["content"] for hit in vector_hits]
+            context = await asyncio.to_thread(
+                self._merge_results,
+                query,
+                vector_hits,
+                graph_results,
+                current_user_id,
+            )
             response = await self._generate_llm_response(query, context)
 
             return {
@@ -148,28 +203,41 @@ class ChatService(BaseLLMClient):
     async def _apply_retrieval_evaluation(
         self,
         query: str,
-        initial_results: List[str],
+        initial_results: List[Dict[str, Any]],
         current_user_id: int,
         document_ids: Optional[List[str]],
-    ) -> List[str]:
+        retrieval_options: RetrievalOptions,
+    ) -> List[Dict[str, Any]]:
         results = initial_results.copy()
-        evaluation = self.retrieval_evaluation_service.evaluate_retrieval_quality(
-            query, results
+        evaluation = await asyncio.to_thread(
+            self.retrieval_evaluation_service.evaluate_retrieval_quality,
+            query,
+            results,
         )
 
         attempt = 0
         while evaluation.get("needs_improvement", False) and attempt < 2:
-            alternative_queries = self.retrieval_evaluation_service._improve_retrieval(
-                query, evaluation
+            alternative_queries = await asyncio.to_thread(
+                self.retrieval_evaluation_service._improve_retrieval,
+                query,
+                evaluation,
             )
-            for alt_query in alternative_queries:
-                additional_results = self._get_vector_results(
-                    alt_query, current_user_id, document_ids
-                )
-                results.extend(additional_results)
+            if not alternative_queries:
+                break
+
+            additional_results = await asyncio.to_thread(
+                self._get_multi_query_vector_results,
+                alternative_queries,
+                current_user_id,
+                document_ids,
+                retrieval_options,
+            )
+            results = merge_hits(results, additional_results)
 
-            evaluation = self.retrieval_evaluation_service.evaluate_retrieval_quality(
-                query, results
+            evaluation = await asyncio.to_thread(
+                self.retrieval_evaluation_service.evaluate_retrieval_quality,
+                query,
+                results,
             )
             attempt += 1
 
@@ -195,13 +263,14 @@ class ChatService(BaseLLMClient):
             HumanMessage(content=query),
         ]
 
-        response = self.llm.invoke(messages)
+        with stage("generation"):
+            response = await asyncio.to_thread(self.llm.invoke, messages)
         return response.content
 
     async def follow_up_chat(
         self, session_id: str, request: FollowUpChatRequest, current_user_id: int
     ) -> FollowUpChatResponse:
-        session = self._get_session(session_id)
+        session = await self._get_session(session_id)
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
 
@@ -216,7 +285,7 @@ class ChatService(BaseLLMClient):
             request.context_window,
         )
 
-        self._update_session(session, context_nodes)
+        await self._update_session(session, context_nodes)
 
         response = await self._generate_response_with_context(
             request.message, context_nodes, session.memory_context
@@ -233,7 +302,7 @@ class ChatService(BaseLLMClient):
         self, session_id: str, new_title: str, current_user_id: int
     ) -> Dict[str, Any]:
         try:
-            session = self._get_session(session_id)
+            session = await self._get_session(session_id)
 
             if not session:
                 raise HTTPException(status_code=404, detail="Chat session not found")
@@ -245,7 +314,7 @@ class ChatService(BaseLLMClient):
 
             session.title = new_title
             session.updated_at = datetime.now(timezone.utc)
-            self.db.commit()
+            await self.db.commit()
 
             return {"session_id": session_id, "title": new_title}
 
@@ -263,7 +332,7 @@ class ChatService(BaseLLMClient):
         self, session_id: str, current_user_id: int
     ) -> Dict[str, Any]:
         try:
-            session = self._get_session(session_id)
+            session = await self._get_session(session_id)
 
             if not session:
                 raise HTTPException(status_code=404, detail="Chat session not found")
@@ -273,15 +342,16 @@ class ChatService(BaseLLMClient):
                     status_code=403, detail="Access denied to this chat session"
                 )
 
-            self.db.query(Message).filter(
-                Message.chat_session_id == session_id
-            ).delete()
-
-            self.db.query(ChatSession).filter(
-                ChatSession.id == session_id, ChatSession.user_id == current_user_id
-            ).delete()
-
-            self.db.commit()
+            await self.db.execute(
+                delete(Message).where(Message.chat_session_id == session_id)
+            )
+            await self.db.execute(
+                delete(ChatSession).where(
+                    ChatSession.id == session_id,
+                    ChatSession.user_id == current_user_id,
+                )
+            )
+            await self.db.commit()
 
             return {"session_id": session_id, "status": "deleted"}
 
@@ -296,27 +366,48 @@ class ChatService(BaseLLMClient):
             )
 
     def _get_vector_results(
-        self, query: str, current_user_id: int, document_ids: Optional[List[str]] = None
-    ) -> List[str]:
-        try:
-            filter_dict = {
-                "user_id": current_user_id,
-            }
-            if document_ids:
-                filter_dict["doc_id"] = {"$in": document_ids}
-
-            query_embedding = self.embeddings.embed_query(query)
-
-            docs_and_scores = self.vector_store.similarity_search_with_score_by_vector(
-                embedding=query_embedding,
-                k=settings.TOP_K_RESULTS,
-                filter=filter_dict,
-            )
-
-            results = [doc.page_content for doc, score in docs_and_scores]
-
-            return results
+        self,
+        query: str,
+        current_user_id: int,
+        document_ids: Optional[List[str]] = None,
+        retrieval_options: Optional[RetrievalOptions] = None,
+    ) -> List[Dict[str, Any]]:
+        return self._get_multi_query_vector_results(
+            [query], current_user_id, document_ids, retrieval_options
+        )
 
+    def _get_multi_query_vector_results(
+        self,
+        queries: List[str],
+        current_user_id: int,
+        document_ids: Optional[List[str]] = None,
+        retrieval_options: Optional[RetrievalOptions] = None,
+    ) -> List[Dict[str, Any]]:
+        retrieval_options = retrieval_options or RetrievalOptions()
+        try:
+            with stage("query_embedding", queries=len(queries)):
+                query_embeddings = self.embeddings.embed_queries(queries)
+            with stage("vector_search", queries=len(queries)) as span:
+                hits = self.hybrid_search_service.search(
+                    queries,
+                    query_embeddings,
+                    current_user_id,
+                    document_ids,
+                    vector_weight=retrieval_options.vector_weight,
+                    lexical_weight=retrieval_options.lexical_weight,
+                    ef_search=retrieval_options.ef_search,
+                    probes=retrieval_options.probes,
+                )
+                span.set_attribute("k", len(hits))
+            if retrieval_options.neighbor_window:
+                hits = self.context_expansion_service.expand_to_neighbors(
+                    hits, retrieval_options.neighbor_window
+                )
+            elif retrieval_options.expand_parents:
+                hits = self.context_expansion_service.expand_to_parents(hits)
+            return hits
+        except ExternalServiceException:
+            raise
         except Exception as e:
             logger.error(f"Error searching vector store: {str(e)}", exc_info=True)
             raise ExternalServiceException(
@@ -340,7 +431,11 @@ class ChatService(BaseLLMClient):
             )
 
     def _merge_results(
-        self, vector_results: List[str], graph_results: List[Dict[str, Any]]
+        self,
+        query: str,
+        vector_hits: List[Dict[str, Any]],
+        graph_results: List[Dict[str, Any]],
+        user_id: Optional[int] = None,
     ) -> str:
         try:
             graph_texts = []
@@ -351,8 +446,14 @@ class ChatService(BaseLLMClient):
                     text += f"Relationships: {', '.join([r['type'] for r in result['relationships']])}"
                 graph_texts.append(text)
 
-            all_texts = vector_results[:3] + graph_texts[:3]
-            return "\n\n".join(all_texts)
+            return self.context_builder.build(
+                vector_hits,
+                graph_texts,
+                query_embedding=self.embeddings.embed_query(query),
+                chunk_embeddings=self.vector_search_service.fetch_embeddings(
+                    [hit["id"] for hit in vector_hits], user_id
+                ),
+            )
         except Exception as e:
             logger.error(f"Error merging results: {str(e)}", exc_info=True)
             raise ExternalServiceException(
@@ -386,7 +487,8 @@ class ChatService(BaseLLMClient):
                 ),
             ]
 
-            response = self.llm.invoke(messages)
+            with stage("synthesis"):
+                response = self.llm.invoke(messages)
 
             all_contexts = {
                 "sub_responses": sub_responses,
@@ -402,11 +504,20 @@ class ChatService(BaseLLMClient):
                 extra={"error": str(e)},
             )
 
-    def _get_session(self, session_id: str) -> ChatSession:
-        return self.db.query(ChatSession).filter(ChatSession.id == session_id).first()
+    async def _get_session(self, session_id: str) -> Optional[ChatSession]:
+        return await self.db.scalar(
+            select(ChatSession).where(ChatSession.id == session_id)
+        )
 
     async def _get_context_nodes(
         self, node_ids: List[str], context_window: int
+    ) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(
+            self._query_context_nodes, node_ids, context_window
+        )
+
+    def _query_context_nodes(
+        self, node_ids: List[str], context_window: int
     ) -> List[Dict[str, Any]]:
         with self.driver.session() as session:
             query = """
@@ -419,7 +530,7 @@ class ChatService(BaseLLMClient):
             )
             return [dict(record["related"]) for record in result]
 
-    def _update_session(
+    async def _update_session(
         self, session: ChatSession, context_nodes: List[Dict[str, Any]]
     ) -> None:
         new_node_ids = [node["id"] for node in context_nodes if "id" in node]
@@ -429,7 +540,7 @@ class ChatService(BaseLLMClient):
         )[:10]
         session.last_activity = datetime.now(timezone.utc)
 
-        self.db.commit()
+        await self.db.commit()
 
     async def _generate_response_with_context(
         self, message: str, context_nodes: List[Dict[str, Any]], memory: Dict[str, Any]
@@ -0,0 +1,124 @@
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.core.config import settings
+from src.services.vector_search import chunk_key
+from src.utils.utils import estimate_tokens
+
+
+class ContextBuilder:
+    """Packs retrieved chunks and graph facts into a token-budgeted prompt context.
+
+    Vector hits arrive in fused rank order. They are de-duplicated by chunk
+    identity, ordered by maximal marginal relevance (MMR) over their stored
+    embeddings, then greedily packed into the budget left over after graph
+    facts take their share. MMR relevance is the hit's `rrf_score` when it
+    has one, so the fusion ranking carries through.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = settings.CONTEXT_TOKEN_BUDGET,
+        mmr_lambda: float = settings.CONTEXT_MMR_LAMBDA,
+        graph_token_share: float = settings.CONTEXT_GRAPH_TOKEN_SHARE,
+    ):
+        self.token_budget = token_budget
+        self.mmr_lambda = mmr_lambda
+        self.graph_token_share = graph_token_share
+
+    def build(
+        self,
+        vector_hits: List[Dict[str, Any]],
+        graph_texts: List[str],
+        query_embedding: Optional[Sequence[float]] = None,
+        chunk_embeddings: Optional[Dict[str, Sequence[float]]] = None,
+    ) -> str:
+        graph_selected, graph_tokens = self._pack(
+            graph_texts, int(self.token_budget * self.graph_token_share)
+        )
+
+        candidates = self.deduplicate(vector_hits)
+        ordered = self.order_by_mmr(candidates, query_embedding, chunk_embeddings or {})
+        vector_selected, _ = self._pack(
+            [hit["content"] for hit in ordered], self.token_budget - graph_tokens
+        )
+
+        return "\n\n".join(vector_selected + graph_selected)
+
+    def deduplicate(self, hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Keeps the first, best ranked, hit of each chunk or text"""
+        seen_keys = set()
+        seen_contents = set()
+        unique = []
+        for hit in hits:
+            key = chunk_key(hit)
+            content = " ".join(hit["content"].split()).lower()
+            if key in seen_keys or content in seen_contents:
+                continue
+            seen_keys.add(key)
+            seen_contents.add(content)
+            unique.append(hit)
+        return unique
+
+    def order_by_mmr(
+        self,
+        hits: List[Dict[str, Any]],
+        query_embedding: Optional[Sequence[float]],
+        chunk_embeddings: Dict[str, Sequence[float]],
+    ) -> List[Dict[str, Any]]:
+        if (
+            len(hits) < 2
+            or query_embedding is None
+            or any(hit["id"] not in chunk_embeddings for hit in hits)
+        ):
+            return hits
+
+        matrix = self._normalize(
+            np.array([chunk_embeddings[hit["id"]] for hit in hits], dtype=np.float32)
+        )
+        relevance = self._relevance(hits, matrix, query_embedding)
+        pairwise = matrix @ matrix.T
+
+        selected = [int(np.argmax(relevance))]
+        remaining = set(range(len(hits))) - set(selected)
+        while remaining:
+            candidates = np.array(sorted(remaining))
+            redundancy = pairwise[np.ix_(candidates, selected)].max(axis=1)
+            scores = (
+                self.mmr_lambda * relevance[candidates]
+                - (1 - self.mmr_lambda) * redundancy
+            )
+            best = int(candidates[np.argmax(scores)])
+            selected.append(best)
+            remaining.remove(best)
+
+        return [hits[i] for i in selected]
+
+    def _relevance(
+        self,
+        hits: List[Dict[str, Any]],
+        matrix: np.ndarray,
+        query_embedding: Sequence[float],
+    ) -> np.ndarray:
+        """The fused score scaled to [0, 1], or cosine similarity to the query
+        for hits that did not go through rank fusion"""
+        if all("rrf_score" in hit for hit in hits):
+            scores = np.array([hit["rrf_score"] for hit in hits], dtype=np.float32)
+            return scores / max(float(scores.max()), 1e-12)
+        query = self._normalize(np.asarray(query_embedding, dtype=np.float32))
+        return matrix @ query
+
+    def _pack(self, texts: List[str], budget: int) -> tuple[List[str], int]:
+        packed, used = [], 0
+        for text in texts:
+            tokens = estimate_tokens(text)
+            if used + tokens > budget:
+                continue
+            packed.append(text)
+            used += tokens
+        return packed, used
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
@@ -1,13 +1,17 @@
-from typing import List
-from langchain.schema import HumanMessage, SystemMessage
+from typing import List, Optional
+from langchain_core.messages import HumanMessage, SystemMessage
 
-from src.core.logging import logger
+from src.core.clients import ClientRegistry
+from src.core.logging import get_logger
+from src.core.metrics import stage
 from src.services.base_client import BaseLLMClient
 
+logger = get_logger("chat")
+
 
 class QueryDecompositionService(BaseLLMClient):
-    def __init__(self):
-        super().__init__("QueryDecompositionService")
+    def __init__(self, clients: Optional[ClientRegistry] = None):
+        super().__init__("QueryDecompositionService", clients)
 
     def decompose_query(self, query: str) -> List[str]:
         try:
@@ -24,7 +28,8 @@ class QueryDecompositionService(BaseLLMClient):
                 HumanMessage(content=query),
             ]
 
-            response = self.llm.invoke(messages)
+            with stage("decomposition"):
+                response = self.llm.invoke(messages)
             sub_questions = [
                 q.strip() for q in response.content.split("\n") if q.strip()
             ]
@@ -1,33 +1,135 @@
+import re
 import json
-from typing import List, Dict, Any
-from langchain.schema import HumanMessage, SystemMessage
+import numpy as np
+from typing import List, Dict, Any, Optional
+from langchain_core.messages import HumanMessage, SystemMessage
 
-from src.core.logging import logger
+from src.core.clients import ClientRegistry
+from src.core.config import settings
+from src.core.logging import get_logger
+from src.core.metrics import stage
 from src.services.base_client import BaseLLMClient
 from src.utils.utils import clean_llm_response
 
+logger = get_logger("chat")
+
 
 class RetrievalEvaluationService(BaseLLMClient):
-    def __init__(self):
-        super().__init__("RetrievalEvaluationService")
+    STOPWORDS = set(
+        "about also and are can describe does explain for from give had has have "
+        "how into its list mean not show tell that the their them then there "
+        "these this was were what when where which who why will with would you "
+        "your".split()
+    )
+    # Cosine similarity range that maps to a 0-1 relevance signal
+    SIMILARITY_FLOOR = 0.5
+    SIMILARITY_CEILING = 0.85
+
+    def __init__(
+        self,
+        mode: str = settings.RETRIEVAL_EVALUATION_MODE,
+        clients: Optional[ClientRegistry] = None,
+    ):
+        super().__init__("RetrievalEvaluationService", clients)
+        self.mode = mode
 
     def evaluate_retrieval_quality(
         self,
         query: str,
-        retrieved_chunks: List[str],
+        retrieved_chunks: List[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        with stage("evaluation"):
+            if self.mode == "llm":
+                return self._evaluate_with_llm(query, retrieved_chunks)
+
+            evaluation = self._evaluate_locally(query, retrieved_chunks)
+            if self.mode == "local" or self._is_conclusive(evaluation):
+                logger.debug(
+                    f"Local retrieval score {evaluation['overall_quality_score']:.1f} is conclusive"
+                )
+                return evaluation
+
+            return self._evaluate_with_llm(query, retrieved_chunks)
+
+    def _is_conclusive(self, evaluation: Dict[str, Any]) -> bool:
+        score = evaluation["overall_quality_score"]
+        if score >= settings.RETRIEVAL_EVALUATION_ACCEPT_SCORE:
+            return True
+        return score <= settings.RETRIEVAL_EVALUATION_REJECT_SCORE and bool(
+            evaluation["missing_aspects"]
+        )
+
+    def _evaluate_locally(
+        self, query: str, retrieved_chunks: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Score retrieval from similarity, score spread and term coverage"""
+        terms = self._extract_terms(query)
+        if not retrieved_chunks:
+            return {
+                "overall_quality_score": 0.0,
+                "needs_improvement": True,
+                "missing_aspects": terms,
+                "evaluator": "local",
+                "quality_summary": "No chunks retrieved",
+            }
+
+        similarities = np.sort(
+            1.0 - np.array([c["distance"] for c in retrieved_chunks], dtype=np.float32)
+        )[::-1]
+        relevance = np.clip(
+            (similarities[:3].mean() - self.SIMILARITY_FLOOR)
+            / (self.SIMILARITY_CEILING - self.SIMILARITY_FLOOR),
+            0.0,
+            1.0,
+        )
+        # A clear winner over the rest of the candidates signals a focused match
+        separation = np.clip((similarities[0] - np.median(similarities)) / 0.1, 0, 1)
+
+        corpus = " ".join(c["content"] for c in retrieved_chunks).lower()
+        covered = np.array([term in corpus for term in terms], dtype=bool)
+        coverage = covered.mean() if terms else 1.0
+        missing_aspects = [term for term, hit in zip(terms, covered) if not hit]
+
+        score = float(10 * (0.5 * relevance + 0.3 * coverage + 0.2 * separation))
+        return {
+            "overall_quality_score": round(score, 2),
+            "needs_improvement": score < settings.RETRIEVAL_EVALUATION_ACCEPT_SCORE,
+            "missing_aspects": missing_aspects,
+            "evaluator": "local",
+            "quality_summary": (
+                f"top similarity {similarities[0]:.2f}, "
+                f"term coverage {coverage:.0%}, separation {separation:.2f}"
+            ),
+        }
+
+    def _extract_terms(self, query: str) -> List[str]:
+        words = re.findall(r"[\w\-\.]+", query.lower())
+        terms = [w.strip(".") for w in words]
+        return list(
+            dict.fromkeys(t for t in terms if len(t) > 2 and t not in self.STOPWORDS)
+        )
+
+    def _evaluate_with_llm(
+        self,
+        query: str,
+        retrieved_chunks: List[Dict[str, Any]],
     ) -> Dict[str, Any]:
         try:
+            formatted_chunks = "\n\n".join(
+                f"[{i + 1}] {chunk['content']}"
+                for i, chunk in enumerate(retrieved_chunks)
+            )
             evaluation_prompt = f"""Evaluate the quality of retrieved context for the given query.
             
             Query: {query}
             
             Retrieved Context Chunks:
-            {retrieved_chunks}
+            {formatted_chunks}
             
             Analyze the retrieval quality and return a JSON object with the following structure:
             {{
                 "chunk_scores": [
-                    {{"chunk": "chunk text", "relevance_score": 0-10, "reasoning": "why this score"}}
+                    {{"chunk": "chunk number", "relevance_score": 0-10, "reasoning": "why this score"}}
                 ],
                 "missing_aspects": ["list of query aspects not covered"],
                 "redundant_information": ["list of redundant content"],
@@ -56,6 +158,7 @@ class RetrievalEvaluationService(BaseLLMClient):
                 evaluation_data["needs_improvement"] = (
                     evaluation_data["overall_quality_score"] < 7
                 )
+                evaluation_data["evaluator"] = "llm"
                 return evaluation_data
             except json.JSONDecodeError as e:
                 logger.error(
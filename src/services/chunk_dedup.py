@@ -0,0 +1,240 @@
+import hashlib
+import re
+import zlib
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import Integer, column, text
+from sqlalchemy.engine import Connection
+
+from src.core.config import settings
+from src.core.logging import logger
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class MinHasher:
+    """MinHash signatures over word shingles, split into bands for LSH"""
+
+    def __init__(
+        self,
+        num_perm: int = settings.CHUNK_DEDUP_NUM_PERM,
+        bands: int = settings.CHUNK_DEDUP_BANDS,
+        shingle_size: int = settings.CHUNK_DEDUP_SHINGLE_SIZE,
+        seed: int = 1,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        # Fixed seed so signatures stored by other workers stay comparable
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, content: str) -> np.ndarray:
+        words = WORD_PATTERN.findall(content.lower())
+        size = min(self.shingle_size, len(words)) or 1
+        shingles = {
+            " ".join(words[i : i + size]) for i in range(max(len(words) - size + 1, 1))
+        }
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode()) for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        permuted = (np.outer(hashes, self._a) + self._b) % MERSENNE_PRIME & MAX_HASH
+        # Stored as int4[], so keep the 32-bit minimums in signed form
+        return permuted.min(axis=0).astype(np.uint32).view(np.int32)
+
+    def band_keys(self, signature: np.ndarray) -> List[int]:
+        """One signed 64-bit key per band, tagged with the band's position"""
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows : (band + 1) * self.rows]
+            digest = hashlib.blake2b(
+                band.to_bytes(2, "little") + rows.tobytes(), digest_size=8
+            ).digest()
+            keys.append(int.from_bytes(digest, "little", signed=True))
+        return keys
+
+    @staticmethod
+    def similarity(first: Sequence[int], second: Sequence[int]) -> float:
+        """Estimated Jaccard similarity of the two signatures' shingle sets"""
+        return float(np.mean(np.asarray(first) == np.asarray(second)))
+
+
+class DuplicateReport:
+    """Signatures of a document's chunks and which of them are near-duplicates"""
+
+    def __init__(
+        self,
+        signatures: List[List[int]],
+        band_keys: List[List[int]],
+        duplicate_of: List[Optional[Dict[str, int]]],
+        embeddings: Optional[Dict[int, np.ndarray]] = None,
+    ):
+        self.signatures = signatures
+        self.band_keys = band_keys
+        # {"chunk_index": i} within the document, {"chunk_id": id} across it
+        self.duplicate_of = duplicate_of
+        # Embeddings of the other documents' chunks, by chunk id
+        self.embeddings = embeddings or {}
+
+    @property
+    def duplicates(self) -> int:
+        return sum(1 for duplicate in self.duplicate_of if duplicate is not None)
+
+    @property
+    def ratio(self) -> float:
+        return self.duplicates / len(self.duplicate_of) if self.duplicate_of else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "chunks": len(self.duplicate_of),
+            "duplicate_chunks": self.duplicates,
+            "dedup_ratio": round(self.ratio, 4),
+        }
+
+
+class ChunkDeduplicator:
+    """Flags chunks that are near-identical to an earlier chunk of the same
+    document or, with the "user" scope, to a chunk the user already indexed.
+    Duplicates are then either dropped ("skip") or kept in place for neighbor
+    expansion ("collapse") without being embedded again. A collapsed repeat
+    within the document is stored without an embedding, one of another
+    document gets a copy of that chunk's embedding, so each document stays
+    searchable on its own and does not depend on the other's rows.
+
+    Candidates come from LSH band collisions and are confirmed against the
+    threshold. With the default 128 permutations in 16 bands of 8, a pair at
+    0.85 estimated Jaccard similarity shares a band over 99% of the time.
+    """
+
+    USER_CANDIDATES_SQL = """
+        SELECT id, minhash, lsh_bands
+        FROM document_chunks
+        WHERE user_id = :user_id
+          AND document_id <> :document_id
+          AND embedding IS NOT NULL
+          AND lsh_bands && CAST(:band_keys AS bigint[])
+    """
+
+    EMBEDDINGS_SQL = """
+        SELECT id, embedding
+        FROM document_chunks
+        WHERE id = ANY(:ids) AND embedding IS NOT NULL
+    """
+
+    def __init__(
+        self,
+        hasher: Optional[MinHasher] = None,
+        threshold: float = settings.CHUNK_DEDUP_THRESHOLD,
+        scope: str = settings.CHUNK_DEDUP_SCOPE,
+        mode: str = settings.CHUNK_DEDUP_MODE,
+    ):
+        if scope not in ("document", "user"):
+            raise ValueError(f"Unsupported dedup scope: {scope}")
+        if mode not in ("skip", "collapse"):
+            raise ValueError(f"Unsupported dedup mode: {mode}")
+        self.hasher = hasher or MinHasher()
+        self.threshold = threshold
+        self.scope = scope
+        self.mode = mode
+
+    def find_duplicates(
+        self,
+        connection: Connection,
+        user_id: int,
+        document_id: int,
+        chunks: Sequence[str],
+    ) -> DuplicateReport:
+        signatures = [self.hasher.signature(chunk) for chunk in chunks]
+        band_keys = [self.hasher.band_keys(signature) for signature in signatures]
+
+        buckets: Dict[int, List[Any]] = {}
+        if self.scope == "user" and chunks:
+            rows = connection.execute(
+                text(self.USER_CANDIDATES_SQL),
+                {
+                    "user_id": user_id,
+                    "document_id": document_id,
+                    "band_keys": sorted({key for keys in band_keys for key in keys}),
+                },
+            ).fetchall()
+            for row in rows:
+                for key in row.lsh_bands:
+                    buckets.setdefault(key, []).append(
+                        ({"chunk_id": row.id}, row.minhash)
+                    )
+
+        duplicate_of: List[Optional[Dict[str, int]]] = []
+        for index, (signature, keys) in enumerate(zip(signatures, band_keys)):
+            duplicate = self._match(signature, keys, buckets)
+            duplicate_of.append(duplicate)
+            if duplicate is None:
+                for key in keys:
+                    buckets.setdefault(key, []).append(
+                        ({"chunk_index": index}, signature)
+                    )
+
+        embeddings = self._fetch_embeddings(connection, duplicate_of)
+        # An original removed since it matched is embedded like any other chunk
+        duplicate_of = [
+            None
+            if duplicate is not None
+            and "chunk_id" in duplicate
+            and duplicate["chunk_id"] not in embeddings
+            else duplicate
+            for duplicate in duplicate_of
+        ]
+
+        report = DuplicateReport(
+            [signature.tolist() for signature in signatures],
+            band_keys,
+            duplicate_of,
+            embeddings,
+        )
+        logger.debug(
+            f"{report.duplicates} of {len(chunks)} chunks of document {document_id} "
+            f"are near-duplicates"
+        )
+        return report
+
+    def _fetch_embeddings(
+        self,
+        connection: Connection,
+        duplicate_of: List[Optional[Dict[str, int]]],
+    ) -> Dict[int, np.ndarray]:
+        ids = sorted(
+            {
+                duplicate["chunk_id"]
+                for duplicate in duplicate_of
+                if duplicate is not None and "chunk_id" in duplicate
+            }
+        )
+        if not ids:
+            return {}
+        statement = text(self.EMBEDDINGS_SQL).columns(
+            column("id", Integer), column("embedding", Vector())
+        )
+        rows = connection.execute(statement, {"ids": ids}).fetchall()
+        return {row.id: row.embedding for row in rows}
+
+    def _match(
+        self, signature: np.ndarray, keys: List[int], buckets: Dict[int, List[Any]]
+    ) -> Optional[Dict[str, int]]:
+        checked = set()
+        for key in keys:
+            for reference, candidate in buckets.get(key, ()):
+                marker = tuple(reference.items())
+                if marker in checked:
+                    continue
+                checked.add(marker)
+                if self.hasher.similarity(signature, candidate) >= self.threshold:
+                    return reference
+        return None
@@ -0,0 +1,135 @@
+import numpy as np
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Sequence
+from pgvector.psycopg import register_vector
+from psycopg.types.json import Json
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from src.core.logging import logger
+
+
+class ChunkWriter:
+    """Streams chunk rows and their embeddings into document_chunks with a
+    binary COPY instead of one INSERT per row."""
+
+    COLUMNS = (
+        "document_id",
+        "user_id",
+        "doc_id",
+        "chunk_index",
+        "parent_index",
+        "content",
+        "chunk_metadata",
+        "embedding",
+        "minhash",
+        "lsh_bands",
+        "created_at",
+    )
+    TYPES = (
+        "int4",
+        "int4",
+        "varchar",
+        "int4",
+        "int4",
+        "text",
+        "json",
+        "vector",
+        "int4[]",
+        "int8[]",
+        "timestamp",
+    )
+
+    REPOINT_DUPLICATES_SQL = """
+        UPDATE document_chunks duplicate
+        SET embedding = original.embedding, lsh_bands = original.lsh_bands
+        FROM document_chunks original
+        WHERE original.document_id = :document_id
+          AND original.embedding IS NOT NULL
+          AND duplicate.user_id = original.user_id
+          AND duplicate.document_id <> original.document_id
+          AND duplicate.embedding IS NULL
+          AND CAST(
+              duplicate.chunk_metadata -> 'duplicate_of' ->> 'chunk_id' AS integer
+          ) = original.id
+    """
+
+    def write(
+        self,
+        connection: Connection,
+        document_id: int,
+        user_id: int,
+        doc_id: str,
+        chunks: Sequence[str],
+        embeddings: Sequence[Optional[Sequence[float]]],
+        chunk_indexes: Optional[Sequence[int]] = None,
+        chunk_metadata: Optional[Sequence[Dict[str, Any]]] = None,
+        parents: Optional[Sequence[str]] = None,
+        parent_indexes: Optional[Sequence[int]] = None,
+        minhashes: Optional[Sequence[Sequence[int]]] = None,
+        lsh_bands: Optional[Sequence[Optional[Sequence[int]]]] = None,
+    ) -> int:
+        """Replace a document's chunks and parent windows within the caller's
+        transaction. Chunks with no embedding are stored unsearchable."""
+        if len(chunks) != len(embeddings):
+            raise ValueError("Every chunk needs exactly one embedding")
+        if parent_indexes is not None and len(parent_indexes) != len(chunks):
+            raise ValueError("Every chunk needs exactly one parent index")
+
+        # Rows collapsed onto these chunks by older versions have no
+        # embedding of their own, give them a copy before the chunks go
+        connection.execute(
+            text(self.REPOINT_DUPLICATES_SQL), {"document_id": document_id}
+        )
+        for table in ("document_chunks", "document_parents"):
+            connection.execute(
+                text(f"DELETE FROM {table} WHERE document_id = :document_id"),
+                {"document_id": document_id},
+            )
+        if not chunks:
+            return 0
+
+        driver_connection = connection.connection.driver_connection
+        register_vector(driver_connection)
+
+        created_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        if parents:
+            with driver_connection.cursor() as cursor:
+                with cursor.copy(
+                    "COPY document_parents "
+                    "(document_id, parent_index, content, created_at) "
+                    "FROM STDIN WITH (FORMAT BINARY)"
+                ) as copy:
+                    copy.set_types(("int4", "int4", "text", "timestamp"))
+                    for i, content in enumerate(parents):
+                        copy.write_row((document_id, i, content, created_at))
+
+        statement = (
+            f"COPY document_chunks ({', '.join(self.COLUMNS)}) "
+            "FROM STDIN WITH (FORMAT BINARY)"
+        )
+        with driver_connection.cursor() as cursor:
+            with cursor.copy(statement) as copy:
+                copy.set_types(self.TYPES)
+                for i, (content, embedding) in enumerate(zip(chunks, embeddings)):
+                    metadata = chunk_metadata[i] if chunk_metadata else {"index": i}
+                    copy.write_row(
+                        (
+                            document_id,
+                            user_id,
+                            doc_id,
+                            chunk_indexes[i] if chunk_indexes else i,
+                            parent_indexes[i] if parent_indexes else None,
+                            content,
+                            Json(metadata),
+                            None
+                            if embedding is None
+                            else np.asarray(embedding, dtype=np.float32),
+                            minhashes[i] if minhashes else None,
+                            lsh_bands[i] if lsh_bands else None,
+                            created_at,
+                        )
+                    )
+
+        logger.debug(f"Copied {len(chunks)} chunks for document {doc_id}")
+        return len(chunks)
@@ -0,0 +1,238 @@
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from src.core.config import settings
+from src.core.database import get_engine
+from src.core.exceptions import ExternalServiceException
+from src.core.logging import logger
+from src.services.text_chunker import CHARS_PER_TOKEN
+
+
+class ContextExpansionService:
+    """Widens matched search chunks into the surrounding document context"""
+
+    PARENT_WINDOWS_SQL = """
+        SELECT dc.id, dc.parent_index, p.content
+        FROM document_chunks dc
+        JOIN document_parents p
+            ON p.document_id = dc.document_id AND p.parent_index = dc.parent_index
+        WHERE dc.id = ANY(:ids)
+    """
+
+    NEIGHBOR_WINDOWS_SQL = """
+        SELECT dc.document_id, dc.chunk_index, dc.parent_index, dc.content,
+            dc.chunk_metadata -> 'span' AS span
+        FROM unnest(
+            CAST(:document_ids AS integer[]),
+            CAST(:first_indexes AS integer[]),
+            CAST(:last_indexes AS integer[])
+        ) AS w(document_id, first_index, last_index)
+        JOIN document_chunks dc
+            ON dc.document_id = w.document_id
+            AND dc.chunk_index BETWEEN w.first_index AND w.last_index
+        ORDER BY dc.document_id, dc.chunk_index
+    """
+
+    def __init__(self, engine: Optional[Engine] = None):
+        self.engine = engine or get_engine()
+
+    def expand_to_parents(self, hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Replace each hit's text with its parent window in one query.
+
+        Hits sharing a parent collapse into the first, best ranked, of them.
+        Chunks indexed without parents are returned unchanged.
+        """
+        if not hits:
+            return hits
+
+        try:
+            with self.engine.connect() as connection:
+                rows = connection.execute(
+                    text(self.PARENT_WINDOWS_SQL),
+                    {"ids": [int(hit["id"]) for hit in hits]},
+                ).fetchall()
+        except Exception as e:
+            logger.error(f"Error fetching parent windows: {str(e)}", exc_info=True)
+            raise ExternalServiceException(
+                message="Failed to expand retrieved chunks",
+                service_name="ContextExpansion",
+                extra={"error": str(e)},
+            )
+
+        parents = {str(row.id): row for row in rows}
+        expanded = []
+        seen = set()
+        for hit in hits:
+            parent = parents.get(hit["id"])
+            if parent is None:
+                expanded.append(hit)
+                continue
+
+            key = (hit["metadata"].get("document_id"), parent.parent_index)
+            if key in seen:
+                continue
+            seen.add(key)
+            expanded.append(
+                {
+                    **hit,
+                    "content": parent.content,
+                    "metadata": {
+                        **hit["metadata"],
+                        "parent_index": parent.parent_index,
+                    },
+                }
+            )
+
+        logger.debug(f"Expanded {len(hits)} hits into {len(expanded)} parent windows")
+        return expanded
+
+    def expand_to_neighbors(
+        self, hits: List[Dict[str, Any]], window: int
+    ) -> List[Dict[str, Any]]:
+        """Replace each hit's text with chunks chunk_index - window through
+        chunk_index + window of the same document, fetched in one query.
+
+        Overlapping or adjacent windows of a document are merged, and hits
+        falling into the same merged window collapse into the first of them.
+        """
+        if not hits or window <= 0:
+            return hits
+
+        ranges: Dict[int, List[Tuple[int, int]]] = {}
+        for hit in hits:
+            position = self._position(hit)
+            if position is not None:
+                document_id, chunk_index = position
+                ranges.setdefault(document_id, []).append(
+                    (max(chunk_index - window, 0), chunk_index + window)
+                )
+        if not ranges:
+            return hits
+
+        merged = {
+            document_id: self._merge_ranges(document_ranges)
+            for document_id, document_ranges in ranges.items()
+        }
+        windows = [
+            (document_id, first, last)
+            for document_id, document_ranges in merged.items()
+            for first, last in document_ranges
+        ]
+
+        try:
+            with self.engine.connect() as connection:
+                rows = connection.execute(
+                    text(self.NEIGHBOR_WINDOWS_SQL),
+                    {
+                        "document_ids": [w[0] for w in windows],
+                        "first_indexes": [w[1] for w in windows],
+                        "last_indexes": [w[2] for w in windows],
+                    },
+                ).fetchall()
+        except Exception as e:
+            logger.error(f"Error fetching neighbor chunks: {str(e)}", exc_info=True)
+            raise ExternalServiceException(
+                message="Failed to expand retrieved chunks",
+                service_name="ContextExpansion",
+                extra={"error": str(e)},
+            )
+
+        chunks: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        for row in rows:
+            chunks.setdefault(row.document_id, {})[row.chunk_index] = {
+                "chunk_index": row.chunk_index,
+                "parent_index": row.parent_index,
+                "content": row.content,
+                "span": row.span,
+            }
+
+        expanded = []
+        seen = set()
+        for hit in hits:
+            position = self._position(hit)
+            document_chunks = chunks.get(position[0]) if position else None
+            if not document_chunks:
+                expanded.append(hit)
+                continue
+
+            document_id, chunk_index = position
+            first, last = next(
+                (first, last)
+                for first, last in merged[document_id]
+                if first <= chunk_index <= last
+            )
+            if (document_id, first) in seen:
+                continue
+            seen.add((document_id, first))
+
+            indexes = [i for i in range(first, last + 1) if i in document_chunks]
+            expanded.append(
+                {
+                    **hit,
+                    "content": self._join_chunks([document_chunks[i] for i in indexes]),
+                    "metadata": {
+                        **hit["metadata"],
+                        "chunk_range": [indexes[0], indexes[-1]],
+                    },
+                }
+            )
+
+        logger.debug(f"Expanded {len(hits)} hits into {len(expanded)} neighbor windows")
+        return expanded
+
+    @staticmethod
+    def _position(hit: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+        metadata = hit.get("metadata") or {}
+        if metadata.get("document_id") is None or metadata.get("chunk_index") is None:
+            return None
+        return (int(metadata["document_id"]), int(metadata["chunk_index"]))
+
+    @staticmethod
+    def _merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        merged: List[Tuple[int, int]] = []
+        for first, last in sorted(ranges):
+            if merged and first <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+            else:
+                merged.append((first, last))
+        return merged
+
+    @classmethod
+    def _join_chunks(cls, chunks: List[Dict[str, Any]]) -> str:
+        """Concatenate chunks in order, dropping the text splitter's overlap.
+
+        Overlap only exists between chunks that are contiguous in the same
+        parent window. It is cut at the recorded character spans, or for
+        chunks indexed before spans were recorded, at the longest run of
+        whole words the previous text ends with.
+        """
+        joined = chunks[0]["content"]
+        for previous, chunk in zip(chunks, chunks[1:]):
+            content = chunk["content"]
+            size = 0
+            if chunk["chunk_index"] == previous["chunk_index"] + 1 and chunk.get(
+                "parent_index"
+            ) == previous.get("parent_index"):
+                if previous.get("span") and chunk.get("span"):
+                    size = max(previous["span"][1] - chunk["span"][0], 0)
+                else:
+                    size = cls._word_overlap(joined, content)
+            joined += content[size:] if size else "\n" + content
+        return joined
+
+    @staticmethod
+    def _word_overlap(joined: str, content: str) -> int:
+        """Length of the longest prefix of content, made of whole words, that
+        joined ends with"""
+        limit = settings.CHUNK_OVERLAP
+        if settings.CHUNK_LENGTH_UNIT == "tokens":
+            limit *= CHARS_PER_TOKEN
+        for size in range(min(len(joined), len(content), limit), 0, -1):
+            if (
+                (size == len(content) or content[size].isspace())
+                and (size == len(joined) or joined[-size - 1].isspace())
+                and joined.endswith(content[:size])
+            ):
+                return size
+        return 0
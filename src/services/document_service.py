@@ -1,30 +1,31 @@
 import tempfile
 import os
 import asyncio
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from fastapi import UploadFile, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import uuid4
-from datetime import datetime, timezone
-from langchain_community.document_loaders import (
-    PyMuPDFLoader,
-    UnstructuredFileLoader,
-    CSVLoader,
-    TextLoader,
-    Docx2txtLoader,
-)
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-
-from src.core.database import get_db
+
+from src.core.clients import ClientRegistry
+from src.core.database import async_session, get_engine
 from src.core.config import settings
 from src.core.exceptions import ExternalServiceException
-from src.core.logging import logger
-from src.models.database import Document, DocumentStatus, DocumentChunk, User
+from src.core.logging import get_logger
+from src.core.metrics import stage
+from src.core.tracing import get_current_span, traced
+from src.models.database import Document, DocumentStatus, User, utcnow
 from src.services.s3_service import S3Service
 from src.services.graph_service import GraphService
 from src.services.base_client import BaseLLMClient
+from src.services.chunk_dedup import ChunkDeduplicator, DuplicateReport
+from src.services.chunk_writer import ChunkWriter
+from src.services.local_vector_search import get_local_vector_search
+from src.services.text_chunker import TextChunker
 from src.utils.utils import clean_whitespaes
 
+logger = get_logger("documents")
+
 
 class DocumentService(BaseLLMClient):
     SUPPORTED_MIMETYPES = {
@@ -38,30 +39,32 @@ class DocumentService(BaseLLMClient):
     }
 
     def __init__(
-        self, db: Session = next(get_db()), current_user: Optional[User] = None
+        self,
+        db: AsyncSession,
+        current_user: Optional[User] = None,
+        clients: Optional[ClientRegistry] = None,
     ):
-        super().__init__("DocumentService")
+        super().__init__("DocumentService", clients)
         try:
-            try:
-                loop = asyncio.get_event_loop()
-            except RuntimeError:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-
             self.db = db
-            self.storage_service = S3Service()
+            self.storage_service = S3Service(self.clients)
             self.current_user = current_user
 
-            self.text_splitter = RecursiveCharacterTextSplitter(
+            self.text_splitter = TextChunker(
                 chunk_size=settings.CHUNK_SIZE,
                 chunk_overlap=settings.CHUNK_OVERLAP,
-                separators=["\n\n", "\n", " ", ""],
-                keep_separator=True,
-                is_separator_regex=False,
-                length_function=len,
+            )
+            self.parent_splitter = (
+                TextChunker(chunk_size=settings.PARENT_CHUNK_SIZE, chunk_overlap=0)
+                if settings.PARENT_CHUNK_SIZE > 0
+                else None
             )
 
-            self.graph_service = GraphService()
+            self.graph_service = GraphService(self.clients)
+            self.chunk_writer = ChunkWriter()
+            self.chunk_deduplicator = (
+                ChunkDeduplicator() if settings.CHUNK_DEDUP_MODE != "off" else None
+            )
             logger.info("DocumentService initialized successfully")
         except Exception as e:
             logger.error(
@@ -99,7 +102,8 @@ class DocumentService(BaseLLMClient):
 
             try:
                 file_data = await file.read()
-                self.storage_service.upload_file(
+                await asyncio.to_thread(
+                    self.storage_service.upload_file,
                     user_id=self.current_user.id,
                     file_path=file_path,
                     file_data=file_data,
@@ -107,7 +111,7 @@ class DocumentService(BaseLLMClient):
                 )
 
                 document.status = DocumentStatus.PROCESSING
-                self.db.commit()
+                await self.db.commit()
 
                 results.append(
                     {
@@ -119,10 +123,10 @@ class DocumentService(BaseLLMClient):
                 )
 
             except Exception as e:
-                self.db.rollback()
+                await self.db.rollback()
                 document.status = DocumentStatus.FAILED
                 document.error_message = str(e)
-                self.db.commit()
+                await self.db.commit()
 
                 results.append(
                     {
@@ -139,10 +143,12 @@ class DocumentService(BaseLLMClient):
 
         return results
 
+    @traced("documents.index_document")
     async def index_document(
         self, doc_id: str, force_reindex: bool = False
     ) -> Dict[str, Any]:
-        document = self._get_and_validate_document(doc_id)
+        document = await self._get_and_validate_document(doc_id)
+        get_current_span().set_attribute("doc_id", doc_id)
 
         if document.status == DocumentStatus.INDEXED and not force_reindex:
             return {
@@ -153,31 +159,51 @@ class DocumentService(BaseLLMClient):
 
         try:
             document.status = DocumentStatus.PROCESSING
-            self.db.commit()
+            await self.db.commit()
 
-            file_data = self._get_document_file(document)
-            temp_file_path = self._create_temp_file(document, file_data)
+            file_data = await asyncio.to_thread(self._get_document_file, document)
+            temp_file_path = await asyncio.to_thread(
+                self._create_temp_file, document, file_data
+            )
 
             try:
-                content = self._extract_document_content(temp_file_path, document)
-                self._store_graph_knowledge(document.doc_id, content)
-                chunks = self.text_splitter.split_text(content)
-                embeddings = await self._generate_embeddings(chunks)
-
-                chunk_objects, vector_texts, vector_metadata = (
-                    self._prepare_chunks_and_vectors(document, chunks, embeddings)
+                content = await asyncio.to_thread(
+                    self._extract_document_content, temp_file_path, document
+                )
+                await asyncio.to_thread(
+                    self._store_graph_knowledge, document.doc_id, content
+                )
+                parents, chunks, parent_indexes, spans = await asyncio.to_thread(
+                    self._split_content, content
+                )
+                get_current_span().set_attribute("chunks", len(chunks))
+                duplicates = await self._find_duplicates(document, chunks)
+                embeddings = await self._generate_embeddings(
+                    [
+                        chunk
+                        for i, chunk in enumerate(chunks)
+                        if duplicates is None or duplicates.duplicate_of[i] is None
+                    ]
                 )
 
-                self._save_chunks_and_vectors(
-                    chunk_objects, vector_texts, vector_metadata
+                await self._save_chunks(
+                    document,
+                    chunks,
+                    embeddings,
+                    parents,
+                    parent_indexes,
+                    duplicates,
+                    spans=spans,
                 )
-                self._update_document_status(document)
+                await self._update_document_status(document)
 
                 return {
                     "doc_id": doc_id,
                     "status": document.status.value,
                     "message": "Document indexed successfully",
-                    "chunks_count": len(chunks),
+                    "chunks_processed": len(chunks),
+                    "duplicate_chunks": duplicates.duplicates if duplicates else 0,
+                    "dedup_ratio": duplicates.ratio if duplicates else 0.0,
                 }
 
             finally:
@@ -185,21 +211,27 @@ class DocumentService(BaseLLMClient):
                     os.remove(temp_file_path)
 
         except Exception as e:
-            self._handle_indexing_error(document, e)
+            await self._handle_indexing_error(document, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Failed to index document: {str(e)}",
             )
 
+    async def index_in_background(self, doc_id: str) -> None:
+        """Index with a session of its own, the request's is closed by then"""
+        async with async_session() as db:
+            self.db = db
+            await self.index_document(doc_id)
+
     async def list_documents(
         self, document_status: Optional[str] = None, page: int = 1, page_size: int = 10
     ) -> List[Document]:
-        query = self.db.query(Document).filter(Document.user_id == self.current_user.id)
+        query = select(Document).where(Document.user_id == self.current_user.id)
 
         if document_status:
             try:
                 doc_status = DocumentStatus(document_status)
-                query = query.filter(Document.status == doc_status)
+                query = query.where(Document.status == doc_status)
             except ValueError:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -207,11 +239,13 @@ class DocumentService(BaseLLMClient):
                 )
 
         offset = (page - 1) * page_size
-        documents = query.offset(offset).limit(page_size).all()
-        return documents
+        documents = await self.db.scalars(query.offset(offset).limit(page_size))
+        return list(documents.all())
 
     async def get_document(self, doc_id: str) -> Document:
-        document = self.db.query(Document).filter(Document.doc_id == doc_id).first()
+        document = await self.db.scalar(
+            select(Document).where(Document.doc_id == doc_id)
+        )
         if not document:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -219,8 +253,10 @@ class DocumentService(BaseLLMClient):
             )
         return document
 
-    def _get_and_validate_document(self, doc_id: str) -> Document:
-        document = self.db.query(Document).filter(Document.doc_id == doc_id).first()
+    async def _get_and_validate_document(self, doc_id: str) -> Document:
+        document = await self.db.scalar(
+            select(Document).where(Document.doc_id == doc_id)
+        )
         if not document:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -249,8 +285,10 @@ class DocumentService(BaseLLMClient):
             return temp_file.name
 
     def _extract_document_content(self, temp_file_path: str, document: Document) -> str:
-        loader = self._get_document_loader(temp_file_path, document.content_type)
-        docs = loader.load()
+        with stage("parsing", content_type=document.content_type) as span:
+            loader = self._get_document_loader(temp_file_path, document.content_type)
+            docs = loader.load()
+            span.set_attribute("pages", len(docs))
         content = "\n\n".join(doc.page_content for doc in docs)
         return clean_whitespaes(content)
 
@@ -262,58 +300,168 @@ class DocumentService(BaseLLMClient):
             logger.error(f"Failed to store graph knowledge: {str(e)}", exc_info=True)
 
     async def _generate_embeddings(self, chunks: List[str]) -> List[List[float]]:
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.embeddings.embed_documents, chunks)
-
-    def _prepare_chunks_and_vectors(
-        self, document: Document, chunks: List[str], embeddings: List[List[float]]
-    ) -> tuple[List[DocumentChunk], List[str], List[Dict]]:
-        chunk_objects = []
-        vector_texts = []
-        vector_metadata = []
-
-        for i, (chunk_content, embedding) in enumerate(zip(chunks, embeddings)):
-            chunk = DocumentChunk(
-                document_id=document.id,
-                chunk_index=i,
-                content=chunk_content,
-                chunk_metadata={"index": i},
-                embedding_vector=embedding,
-            )
-            chunk_objects.append(chunk)
-            vector_texts.append(chunk_content)
-            vector_metadata.append(
-                {
-                    "document_id": document.id,
-                    "doc_id": document.doc_id,
-                    "user_id": document.user_id,
-                    "chunk_index": i,
-                }
-            )
+        with stage("document_embedding", chunks=len(chunks)):
+            return await asyncio.to_thread(self.embeddings.embed_documents, chunks)
+
+    def _split_content(
+        self, content: str
+    ) -> tuple[List[str], List[str], List[int], List[Tuple[int, int]]]:
+        """Split into parent windows, then each parent into search chunks.
+
+        Spans are each chunk's offsets within its parent, or within the
+        content when there are no parents.
+        """
+        if self.parent_splitter is None:
+            spans = self.text_splitter.split_spans(content)
+            return [], [content[start:end] for start, end in spans], [], spans
+
+        parents = self.parent_splitter.split_text(content)
+        chunks, parent_indexes, spans = [], [], []
+        for parent_index, parent in enumerate(parents):
+            for start, end in self.text_splitter.split_spans(parent):
+                chunks.append(parent[start:end])
+                parent_indexes.append(parent_index)
+                spans.append((start, end))
+        return parents, chunks, parent_indexes, spans
+
+    async def _find_duplicates(
+        self, document: Document, chunks: List[str]
+    ) -> Optional[DuplicateReport]:
+        if self.chunk_deduplicator is None:
+            return None
+
+        def find_duplicates() -> DuplicateReport:
+            with get_engine().connect() as connection:
+                return self.chunk_deduplicator.find_duplicates(
+                    connection, document.user_id, document.id, chunks
+                )
 
-        return chunk_objects, vector_texts, vector_metadata
+        duplicates = await asyncio.to_thread(find_duplicates)
+        document.doc_metadata = {
+            **(document.doc_metadata or {}),
+            "dedup": duplicates.stats(),
+        }
+        logger.info(
+            f"Document {document.doc_id}: {duplicates.duplicates} of {len(chunks)} "
+            f"chunks are near-duplicates ({duplicates.ratio:.1%})"
+        )
+        return duplicates
 
-    def _save_chunks_and_vectors(
+    async def _save_chunks(
         self,
-        chunk_objects: List[DocumentChunk],
-        vector_texts: List[str],
-        vector_metadata: List[Dict],
+        document: Document,
+        chunks: List[str],
+        embeddings: List[List[float]],
+        parents: List[str],
+        parent_indexes: List[int],
+        duplicates: Optional[DuplicateReport] = None,
+        spans: Optional[List[Tuple[int, int]]] = None,
     ) -> None:
-        self.db.bulk_save_objects(chunk_objects)
-        self.db.commit()
-        self.vector_store.add_texts(texts=vector_texts, metadatas=vector_metadata)
+        rows = {
+            "chunks": chunks,
+            "embeddings": embeddings,
+            "parent_indexes": parent_indexes or None,
+            # Spans let neighbor expansion drop the splitter's overlap exactly
+            "chunk_metadata": [
+                {"index": i, "span": list(spans[i])} if spans else {"index": i}
+                for i in range(len(chunks))
+            ],
+        }
+        if duplicates is not None:
+            rows = self._apply_duplicates(rows, duplicates)
+
+        def write_chunks() -> None:
+            # Binary COPY needs psycopg, so bulk writes stay on the sync engine
+            with get_engine().begin() as connection:
+                self.chunk_writer.write(
+                    connection,
+                    document_id=document.id,
+                    user_id=document.user_id,
+                    doc_id=document.doc_id,
+                    parents=parents,
+                    **rows,
+                )
+
+        with stage("chunk_write", rows=len(chunks)):
+            await asyncio.to_thread(write_chunks)
 
-    def _update_document_status(self, document: Document) -> None:
+        if settings.LOCAL_VECTOR_SEARCH_ENABLED:
+            get_local_vector_search().invalidate(document.user_id)
+
+    def _apply_duplicates(
+        self, rows: Dict[str, Any], duplicates: DuplicateReport
+    ) -> Dict[str, Any]:
+        """Drop or collapse near-duplicate chunks; embeddings only cover the
+        unique ones. Kept chunks keep their original chunk_index, so skipped
+        duplicates leave gaps rather than shifting their neighbors."""
+        collapse = self.chunk_deduplicator.mode == "collapse"
+        unique_embeddings = iter(rows["embeddings"])
+        parent_indexes = rows["parent_indexes"]
+        kept = {
+            key: []
+            for key in (
+                "chunks",
+                "chunk_indexes",
+                "embeddings",
+                "parent_indexes",
+                "chunk_metadata",
+                "minhashes",
+                "lsh_bands",
+            )
+        }
+        for i, (chunk, duplicate_of) in enumerate(
+            zip(rows["chunks"], duplicates.duplicate_of)
+        ):
+            if duplicate_of is not None and not collapse:
+                continue
+            metadata = dict(rows["chunk_metadata"][i])
+            if duplicate_of is None:
+                embedding = next(unique_embeddings)
+                band_keys = duplicates.band_keys[i]
+            elif "chunk_id" in duplicate_of:
+                # Another document's chunk: copy its embedding rather than
+                # point at a row that can be re-indexed away
+                metadata["duplicate_of"] = duplicate_of
+                embedding = duplicates.embeddings[duplicate_of["chunk_id"]]
+                band_keys = duplicates.band_keys[i]
+            else:
+                metadata["duplicate_of"] = duplicate_of
+                embedding = band_keys = None
+            kept["chunks"].append(chunk)
+            kept["chunk_indexes"].append(i)
+            kept["embeddings"].append(embedding)
+            kept["parent_indexes"].append(parent_indexes[i] if parent_indexes else None)
+            kept["chunk_metadata"].append(metadata)
+            kept["minhashes"].append(duplicates.signatures[i])
+            kept["lsh_bands"].append(band_keys)
+
+        if not parent_indexes:
+            kept["parent_indexes"] = None
+        return kept
+
+    async def _update_document_status(self, document: Document) -> None:
         document.status = DocumentStatus.INDEXED
-        document.indexed_at = datetime.now(timezone.utc)
-        self.db.commit()
+        document.indexed_at = utcnow()
+        await self.db.commit()
 
-    def _handle_indexing_error(self, document: Document, error: Exception) -> None:
+    async def _handle_indexing_error(
+        self, document: Document, error: Exception
+    ) -> None:
+        await self.db.rollback()
         document.status = DocumentStatus.FAILED
         document.error_message = str(error)
-        self.db.commit()
+        await self.db.commit()
 
     def _get_document_loader(self, file_path: str, content_type: str):
+        # The loaders pull in most of langchain_community, import on first use
+        from langchain_community.document_loaders import (
+            PyMuPDFLoader,
+            UnstructuredFileLoader,
+            CSVLoader,
+            TextLoader,
+            Docx2txtLoader,
+        )
+
         try:
             if content_type == "application/pdf":
                 return PyMuPDFLoader(file_path)
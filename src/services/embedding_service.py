@@ -0,0 +1,179 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from src.core.config import settings
+from src.core.logging import logger
+
+if TYPE_CHECKING:
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+
+class QueryEmbeddingCache:
+    """Thread-safe LRU of query text -> embedding vector"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text: str) -> Optional[List[float]]:
+        with self._lock:
+            embedding = self._entries.get(text)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(text)
+            self.hits += 1
+            return embedding
+
+    def put(self, text: str, embedding: List[float]) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[text] = embedding
+            self._entries.move_to_end(text)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class QueryEmbeddingBatcher:
+    """Groups concurrent embed_query calls into one batched embedding request.
+
+    The first caller to arrive on an empty queue becomes the leader: it waits
+    for the collection window, then flushes everything queued so far. A caller
+    that fills the batch to `max_batch_size` flushes immediately.
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[List[str]], List[List[float]]],
+        window_ms: int,
+        max_batch_size: int,
+    ):
+        self._embed_batch = embed_batch
+        self._window = window_ms / 1000
+        self._max_batch_size = max(1, max_batch_size)
+        self._pending: List[Tuple[str, Future]] = []
+        self._lock = threading.Lock()
+
+    def submit(self, text: str) -> List[float]:
+        future: Future = Future()
+        batch = None
+
+        with self._lock:
+            self._pending.append((text, future))
+            is_leader = len(self._pending) == 1
+            if len(self._pending) >= self._max_batch_size:
+                batch = self._take_pending()
+
+        if batch is not None:
+            self._flush(batch)
+        elif is_leader:
+            time.sleep(self._window)
+            with self._lock:
+                batch = self._take_pending()
+            if batch:
+                self._flush(batch)
+
+        return future.result()
+
+    def _take_pending(self) -> List[Tuple[str, Future]]:
+        batch, self._pending = self._pending, []
+        return batch
+
+    def _flush(self, batch: List[Tuple[str, Future]]) -> None:
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            embeddings = dict(zip(texts, self._embed_batch(texts)))
+            logger.debug(
+                f"Embedded {len(texts)} unique queries for {len(batch)} callers"
+            )
+            for text, future in batch:
+                future.set_result(embeddings[text])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+
+
+class QueryEmbeddings(Embeddings):
+    """Embeddings wrapper that memoizes and micro-batches query embeddings.
+
+    Document embeddings are passed straight through to the wrapped model.
+    """
+
+    QUERY_TASK_TYPE = "RETRIEVAL_QUERY"
+
+    def __init__(
+        self,
+        embeddings: "GoogleGenerativeAIEmbeddings",
+        cache_size: int = settings.QUERY_EMBEDDING_CACHE_SIZE,
+        batch_window_ms: int = settings.QUERY_EMBEDDING_BATCH_WINDOW_MS,
+        max_batch_size: int = settings.QUERY_EMBEDDING_MAX_BATCH_SIZE,
+    ):
+        self._embeddings = embeddings
+        self.cache = QueryEmbeddingCache(cache_size)
+        self._batcher = (
+            QueryEmbeddingBatcher(
+                self._embed_query_batch, batch_window_ms, max_batch_size
+            )
+            if batch_window_ms > 0
+            else None
+        )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        embedding = self.cache.get(text)
+        if embedding is not None:
+            return embedding
+
+        if self._batcher is not None:
+            embedding = self._batcher.submit(text)
+        else:
+            embedding = self._embeddings.embed_query(text)
+
+        self.cache.put(text, embedding)
+        return embedding
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries, sending all cache misses in one request"""
+        embeddings = {text: self.cache.get(text) for text in texts}
+        missing = [text for text, embedding in embeddings.items() if embedding is None]
+
+        if len(missing) == 1:
+            embeddings[missing[0]] = self.embed_query(missing[0])
+        elif missing:
+            for text, embedding in zip(missing, self._embed_query_batch(missing)):
+                self.cache.put(text, embedding)
+                embeddings[text] = embedding
+
+        return [embeddings[text] for text in texts]
+
+    def _embed_query_batch(self, texts: List[str]) -> List[List[float]]:
+        return self._embeddings.embed_documents(texts, task_type=self.QUERY_TASK_TYPE)
+
+
+@lru_cache
+def get_query_embeddings() -> QueryEmbeddings:
+    # Importing the Gemini client takes about a second, keep it off startup
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+    return QueryEmbeddings(
+        GoogleGenerativeAIEmbeddings(
+            model=settings.GEMINI_EMBEDDING_MODEL,
+            google_api_key=settings.GOOGLE_API_KEY,
+        )
+    )
@@ -2,25 +2,26 @@ import re
 import uuid
 import json
 from datetime import datetime
-from typing import List, Dict, Any
-from neo4j import GraphDatabase, Session
-from langchain.schema import HumanMessage, SystemMessage
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
+from langchain_core.messages import HumanMessage, SystemMessage
 
-from src.core.config import settings
+from src.core.clients import ClientRegistry
 from src.core.exceptions import ExternalServiceException
 from src.core.logging import logger
+from src.core.metrics import stage
 from src.models.graph import GraphKnowledge
 from src.services.base_client import BaseLLMClient
 from src.utils.utils import clean_llm_response
 
+if TYPE_CHECKING:
+    from neo4j import Session
+
 
 class GraphService(BaseLLMClient):
-    def __init__(self):
-        super().__init__("GraphService")
+    def __init__(self, clients: Optional[ClientRegistry] = None):
+        super().__init__("GraphService", clients)
         try:
-            self.driver = GraphDatabase.driver(
-                settings.NEO4J_URI, auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD)
-            )
+            self.driver = self.clients.neo4j_driver
             logger.info("GraphService connections initialized successfully")
         except Exception as e:
             logger.error(
@@ -37,7 +38,14 @@ class GraphService(BaseLLMClient):
         try:
             knowledge = self._extract_graph_knowledge(text)
 
-            with self.driver.session() as session:
+            with (
+                stage(
+                    "neo4j_write",
+                    nodes=len(knowledge["nodes"]),
+                    relationships=len(knowledge["relationships"]),
+                ),
+                self.driver.session() as session,
+            ):
                 self._create_document_node(session, doc_id)
 
                 for node in knowledge["nodes"]:
@@ -66,7 +74,7 @@ class GraphService(BaseLLMClient):
                 "text_pattern": f"(?i).*{search_text}.*",
             }
 
-            with self.driver.session() as session:
+            with stage("graph_query") as span, self.driver.session() as session:
                 result = session.run(cypher_query, params)
                 records = []
                 for record in result:
@@ -87,6 +95,7 @@ class GraphService(BaseLLMClient):
                             record_dict[key] = str(value) if value is not None else None
                     records.append(record_dict)
 
+                span.set_attribute("rows", len(records))
                 logger.info(f"Found {len(records)} relevant results in graph")
                 return records
         except Exception as e:
@@ -143,9 +152,6 @@ class GraphService(BaseLLMClient):
                 extra={"error": str(e)},
             )
 
-    def close(self) -> None:
-        self.driver.close()
-
     def _get_knowledge_extraction_prompt(self) -> str:
         return """Extract key concepts and structure from the text into a knowledge graph.
             Return ONLY a JSON object with nodes and relationships.
@@ -355,16 +361,20 @@ class GraphService(BaseLLMClient):
                 HumanMessage(content=text),
             ]
 
-            raw_response = self.llm.invoke(messages).content.strip()
+            with stage("graph_extraction"):
+                raw_response = self.llm.invoke(messages).content.strip()
             cleaned_response = clean_llm_response(raw_response)
-            print("Raw LLM Response:", cleaned_response)
+            logger.debug(
+                "Graph extraction response",
+                extra={"doc_chars": len(text), "response": cleaned_response},
+            )
 
             return self._parse_knowledge_json(cleaned_response)
         except Exception as e:
             logger.error(f"Error extracting graph knowledge: {str(e)}")
             return {"nodes": [], "relationships": []}
 
-    def _create_document_node(self, session: Session, doc_id: str) -> None:
+    def _create_document_node(self, session: "Session", doc_id: str) -> None:
         session.run(
             """
             CREATE (d:Document {
@@ -406,7 +416,7 @@ class GraphService(BaseLLMClient):
         return True
 
     def _create_knowledge_node(
-        self, session: Session, node: Dict[str, Any], doc_id: str
+        self, session: "Session", node: Dict[str, Any], doc_id: str
     ) -> None:
         if node["label"] == "Document" and node["id"] == doc_id:
             return
@@ -438,7 +448,7 @@ class GraphService(BaseLLMClient):
             importance=node["properties"].get("importance", 0.5),
         )
 
-    def _create_relationship(self, session: Session, rel: Dict[str, Any]) -> None:
+    def _create_relationship(self, session: "Session", rel: Dict[str, Any]) -> None:
         if not self._validate_relationship_type(rel["type"]):
             logger.error(
                 f"Skipping relationship creation due to invalid type: {rel['type']}"
@@ -481,7 +491,8 @@ class GraphService(BaseLLMClient):
             HumanMessage(content=query),
         ]
 
-        cypher_query = self.llm.invoke(messages).content.strip()
+        with stage("cypher_generation"):
+            cypher_query = self.llm.invoke(messages).content.strip()
         cypher_query = clean_llm_response(cypher_query)
 
         if not self._validate_cypher_query(cypher_query):
@@ -0,0 +1,174 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from src.core.config import settings
+from src.core.database import get_engine
+from src.core.exceptions import ExternalServiceException
+from src.core.logging import logger
+from src.services.vector_search import (
+    VectorSearchService,
+    reciprocal_rank_fusion,
+    row_to_hit,
+    split_by_query,
+    to_vector_literal,
+)
+
+_search_executor = ThreadPoolExecutor(
+    max_workers=settings.HYBRID_SEARCH_WORKERS, thread_name_prefix="hybrid-search"
+)
+
+
+class LexicalSearchService:
+    """Postgres full-text search over document chunks.
+
+    Lexical hits carry the chunk's cosine distance to the query so they can
+    be ranked alongside vector hits.
+    """
+
+    TEXT_SEARCH_CONFIG = settings.TEXT_SEARCH_CONFIG
+
+    MULTI_QUERY_SEARCH_SQL = f"""
+        WITH queries AS (
+            SELECT
+                CAST(q.ordinality - 1 AS integer) AS query_index,
+                CAST(
+                    replace(
+                        CAST(plainto_tsquery('{TEXT_SEARCH_CONFIG}', q.query_text) AS text),
+                        '&',
+                        '|'
+                    ) AS tsquery
+                ) AS tsquery,
+                CAST(q.vector AS vector) AS embedding
+            FROM unnest(CAST(:query_texts AS text[]), CAST(:query_vectors AS text[]))
+                WITH ORDINALITY AS q(query_text, vector, ordinality)
+        )
+        SELECT
+            hit.id,
+            hit.content,
+            hit.document_id,
+            hit.doc_id,
+            hit.chunk_index,
+            hit.embedding <=> queries.embedding AS distance,
+            queries.query_index
+        FROM queries
+        CROSS JOIN LATERAL (
+            SELECT
+                dc.id,
+                dc.content,
+                dc.document_id,
+                dc.doc_id,
+                dc.chunk_index,
+                dc.embedding,
+                ts_rank_cd(
+                    to_tsvector('{TEXT_SEARCH_CONFIG}', dc.content), queries.tsquery
+                ) AS rank
+            FROM document_chunks dc
+            WHERE dc.user_id = :user_id
+              AND dc.embedding IS NOT NULL
+              AND (
+                  CAST(:document_ids AS text[]) IS NULL
+                  OR dc.doc_id = ANY(CAST(:document_ids AS text[]))
+              )
+              AND to_tsvector('{TEXT_SEARCH_CONFIG}', dc.content) @@ queries.tsquery
+            ORDER BY rank DESC
+            LIMIT :k
+        ) AS hit
+        ORDER BY queries.query_index, hit.rank DESC
+    """
+
+    def __init__(self, engine: Optional[Engine] = None):
+        self.engine = engine or get_engine()
+
+    def search_ranked(
+        self,
+        queries: List[str],
+        query_embeddings: List[List[float]],
+        user_id: int,
+        document_ids: Optional[List[str]] = None,
+        k: int = settings.TOP_K_RESULTS,
+    ) -> List[Dict[str, Any]]:
+        if not queries:
+            return []
+
+        params = {
+            "query_texts": queries,
+            "query_vectors": [to_vector_literal(e) for e in query_embeddings],
+            "user_id": user_id,
+            "document_ids": document_ids or None,
+            "k": k,
+        }
+
+        try:
+            with self.engine.connect() as connection:
+                rows = connection.execute(
+                    text(self.MULTI_QUERY_SEARCH_SQL), params
+                ).fetchall()
+        except Exception as e:
+            logger.error(f"Error running full-text search: {str(e)}", exc_info=True)
+            raise ExternalServiceException(
+                message="Failed to run full-text search",
+                service_name="LexicalSearch",
+                extra={"error": str(e)},
+            )
+
+        return [row_to_hit(row) for row in rows]
+
+
+class HybridSearchService:
+    """Runs vector and full-text search in parallel and fuses them with RRF"""
+
+    def __init__(
+        self,
+        vector_search_service: Optional[VectorSearchService] = None,
+        lexical_search_service: Optional[LexicalSearchService] = None,
+    ):
+        self.vector_search_service = vector_search_service or VectorSearchService()
+        self.lexical_search_service = lexical_search_service or LexicalSearchService()
+
+    def search(
+        self,
+        queries: List[str],
+        query_embeddings: List[List[float]],
+        user_id: int,
+        document_ids: Optional[List[str]] = None,
+        vector_weight: float = settings.HYBRID_VECTOR_WEIGHT,
+        lexical_weight: float = settings.HYBRID_LEXICAL_WEIGHT,
+        k: int = settings.TOP_K_RESULTS,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        vector_future = lexical_future = None
+        if vector_weight > 0:
+            vector_future = _search_executor.submit(
+                self.vector_search_service.search_ranked,
+                query_embeddings,
+                user_id,
+                document_ids,
+                k,
+                ef_search,
+                probes,
+            )
+        if lexical_weight > 0:
+            lexical_future = _search_executor.submit(
+                self.lexical_search_service.search_ranked,
+                queries,
+                query_embeddings,
+                user_id,
+                document_ids,
+                k,
+            )
+
+        ranked_lists = []
+        if vector_future is not None:
+            ranked_lists.extend(
+                (hits, vector_weight) for hits in split_by_query(vector_future.result())
+            )
+        if lexical_future is not None:
+            ranked_lists.extend(
+                (hits, lexical_weight)
+                for hits in split_by_query(lexical_future.result())
+            )
+
+        return reciprocal_rank_fusion(ranked_lists)[: k * len(queries)]
@@ -0,0 +1,323 @@
+import os
+import shutil
+import threading
+import time
+import weakref
+import numpy as np
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import Integer, String, column, text
+from sqlalchemy.engine import Engine
+
+from src.core.config import settings
+from src.core.database import get_engine
+from src.core.logging import logger
+
+
+class UserVectorMatrix:
+    """A user's normalized chunk embeddings and texts, memory-mapped from the
+    cache dir"""
+
+    def __init__(self, version: Tuple[int, int], directory: str):
+        self.version = version
+        self.checked_at = time.monotonic()
+        self.matrix = np.load(os.path.join(directory, "matrix.npy"), mmap_mode="r")
+        with np.load(os.path.join(directory, "metadata.npz")) as metadata:
+            self.ids = metadata["ids"]
+            self.document_ids = metadata["document_ids"]
+            self.doc_ids = metadata["doc_ids"]
+            self.chunk_indexes = metadata["chunk_indexes"]
+            self.content_offsets = metadata["content_offsets"]
+        # Chunk texts, UTF-8 encoded back to back
+        self.contents = (
+            np.memmap(os.path.join(directory, "contents.bin"), dtype=np.uint8, mode="r")
+            if self.content_offsets[-1]
+            else np.empty(0, dtype=np.uint8)
+        )
+        self.rows = {int(chunk_id): row for row, chunk_id in enumerate(self.ids)}
+
+    def content(self, row: int) -> str:
+        start, end = self.content_offsets[row], self.content_offsets[row + 1]
+        return bytes(self.contents[start:end]).decode("utf-8")
+
+    def top_k(
+        self,
+        queries: np.ndarray,
+        k: int,
+        document_ids: Optional[List[str]] = None,
+    ) -> List[List[Tuple[int, float]]]:
+        """(row, cosine distance) of the k nearest rows for each query"""
+        scores = queries @ self.matrix.T
+        if document_ids:
+            scores[:, ~np.isin(self.doc_ids, document_ids)] = -np.inf
+
+        k = min(k, scores.shape[1])
+        if k == 0:
+            return [[] for _ in range(len(queries))]
+
+        results = []
+        for query_scores in scores:
+            top = np.argpartition(-query_scores, k - 1)[:k]
+            top = top[np.argsort(-query_scores[top])]
+            results.append(
+                [
+                    (int(row), 1.0 - float(query_scores[row]))
+                    for row in top
+                    if np.isfinite(query_scores[row])
+                ]
+            )
+        return results
+
+
+class LocalVectorSearch:
+    """Brute-force top-k over small tenants' embeddings, in process.
+
+    Each user's embeddings and chunk texts are exported once to local disk
+    and memory-mapped, so workers on the same host share the page cache and
+    searches don't go back to Postgres. Matrices are keyed by (chunk count,
+    max chunk id), which changes whenever a document is indexed or
+    re-indexed. A loaded matrix keeps serving while a background thread
+    re-checks the version, at most every LOCAL_VECTOR_VERSION_TTL_SECONDS;
+    after `invalidate` the next search waits for the check.
+    """
+
+    # Bumped when the files written by _export change
+    CACHE_FORMAT = 2
+    # Superseded versions are kept this long in case a worker is mapping them
+    STALE_VERSION_GRACE_SECONDS = 300
+
+    VERSION_SQL = """
+        SELECT count(*) AS chunks, coalesce(max(id), 0) AS max_id
+        FROM document_chunks
+        WHERE user_id = :user_id AND embedding IS NOT NULL
+    """
+
+    EXPORT_SQL = """
+        SELECT id, document_id, doc_id, chunk_index, content, embedding
+        FROM document_chunks
+        WHERE user_id = :user_id AND embedding IS NOT NULL
+        ORDER BY id
+    """
+
+    def __init__(
+        self,
+        engine: Optional[Engine] = None,
+        cache_dir: str = settings.LOCAL_VECTOR_CACHE_DIR,
+        max_chunks: int = settings.LOCAL_VECTOR_MAX_CHUNKS,
+        max_users: int = settings.LOCAL_VECTOR_MAX_USERS,
+        version_ttl: float = settings.LOCAL_VECTOR_VERSION_TTL_SECONDS,
+    ):
+        self.engine = engine or get_engine()
+        self.cache_dir = cache_dir
+        self.max_chunks = max_chunks
+        self.max_users = max_users
+        self.version_ttl = version_ttl
+        self._matrices: "OrderedDict[int, UserVectorMatrix]" = OrderedDict()
+        self._too_large: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        # Held only by threads building a user's matrix, then dropped
+        self._build_locks: "weakref.WeakValueDictionary[int, threading.Lock]" = (
+            weakref.WeakValueDictionary()
+        )
+
+    def search_ranked(
+        self,
+        query_embeddings: List[List[float]],
+        user_id: int,
+        document_ids: Optional[List[str]] = None,
+        k: int = settings.TOP_K_RESULTS,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Top-k hits per query, or None if the user is too large to serve"""
+        matrix = self._get_matrix(user_id)
+        if matrix is None:
+            return None
+
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        ranked = matrix.top_k(queries, k, document_ids)
+
+        return [
+            {
+                "id": str(matrix.ids[row]),
+                "content": matrix.content(row),
+                "metadata": {
+                    "document_id": int(matrix.document_ids[row]),
+                    "doc_id": str(matrix.doc_ids[row]),
+                    "chunk_index": int(matrix.chunk_indexes[row]),
+                },
+                "distance": distance,
+                "query_index": query_index,
+            }
+            for query_index, hits in enumerate(ranked)
+            for row, distance in hits
+        ]
+
+    def cached_embeddings(self, user_id: int, ids: List[str]) -> Dict[str, np.ndarray]:
+        """Normalized embeddings of those chunks found in the user's loaded
+        matrix, without going to the database"""
+        with self._lock:
+            matrix = self._matrices.get(user_id)
+        if matrix is None:
+            return {}
+        rows = {chunk_id: matrix.rows.get(int(chunk_id)) for chunk_id in ids}
+        return {
+            chunk_id: np.asarray(matrix.matrix[row])
+            for chunk_id, row in rows.items()
+            if row is not None
+        }
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._matrices.pop(user_id, None)
+            self._too_large.pop(user_id, None)
+
+    def _get_matrix(self, user_id: int) -> Optional[UserVectorMatrix]:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._too_large.get(user_id, -self.version_ttl) < self.version_ttl:
+                return None
+            matrix = self._matrices.get(user_id)
+            if matrix is not None:
+                self._matrices.move_to_end(user_id)
+                if now - matrix.checked_at < self.version_ttl:
+                    return matrix
+            build_lock = self._build_locks.setdefault(user_id, threading.Lock())
+
+        if matrix is not None:
+            if build_lock.acquire(blocking=False):
+                threading.Thread(
+                    target=self._refresh,
+                    args=(user_id, matrix, build_lock),
+                    daemon=True,
+                ).start()
+            return matrix
+
+        with build_lock:
+            return self._load(user_id, None)
+
+    def _refresh(
+        self, user_id: int, matrix: UserVectorMatrix, build_lock: threading.Lock
+    ) -> None:
+        try:
+            self._load(user_id, matrix)
+        except Exception as e:
+            logger.warning(f"Failed to refresh local vectors for user {user_id}: {e}")
+        finally:
+            build_lock.release()
+
+    def _load(
+        self, user_id: int, matrix: Optional[UserVectorMatrix]
+    ) -> Optional[UserVectorMatrix]:
+        """The user's current matrix, exported if needed, or None when too
+        large. Runs under the user's build lock."""
+        now = time.monotonic()
+        version = self._version(user_id)
+        if version[0] > self.max_chunks:
+            with self._lock:
+                self._matrices.pop(user_id, None)
+                self._too_large[user_id] = now
+            return None
+
+        if matrix is not None and matrix.version == version:
+            matrix.checked_at = now
+            return matrix
+
+        directory = self._directory(user_id, version)
+        if not os.path.exists(os.path.join(directory, "metadata.npz")):
+            self._export(user_id, directory)
+        matrix = UserVectorMatrix(version, directory)
+
+        with self._lock:
+            self._matrices[user_id] = matrix
+            self._matrices.move_to_end(user_id)
+            while len(self._matrices) > self.max_users:
+                self._matrices.popitem(last=False)
+        return matrix
+
+    def _version(self, user_id: int) -> Tuple[int, int]:
+        with self.engine.connect() as connection:
+            row = connection.execute(text(self.VERSION_SQL), {"user_id": user_id}).one()
+        return (row.chunks, row.max_id)
+
+    def _directory(self, user_id: int, version: Tuple[int, int]) -> str:
+        return os.path.join(
+            self.cache_dir,
+            f"user_{user_id}",
+            f"v{self.CACHE_FORMAT}_{version[0]}_{version[1]}",
+        )
+
+    def _export(self, user_id: int, directory: str) -> None:
+        statement = text(self.EXPORT_SQL).columns(
+            column("id", Integer),
+            column("document_id", Integer),
+            column("doc_id", String),
+            column("chunk_index", Integer),
+            column("content", String),
+            column("embedding", Vector()),
+        )
+        with self.engine.connect() as connection:
+            rows = connection.execute(statement, {"user_id": user_id}).fetchall()
+
+        dimension = rows[0].embedding.shape[0] if rows else settings.EMBEDDING_DIMENSION
+        matrix = np.empty((len(rows), dimension), dtype=np.float32)
+        for i, row in enumerate(rows):
+            matrix[i] = row.embedding
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        contents = [row.content.encode("utf-8") for row in rows]
+        content_offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        content_offsets[1:] = np.cumsum([len(content) for content in contents])
+
+        # Write to a temporary sibling, then rename, so concurrent workers
+        # never map a half-written matrix
+        staging = f"{directory}.{os.getpid()}.{threading.get_ident()}.tmp"
+        os.makedirs(staging, exist_ok=True)
+        np.save(os.path.join(staging, "matrix.npy"), matrix)
+        with open(os.path.join(staging, "contents.bin"), "wb") as contents_file:
+            contents_file.write(b"".join(contents))
+        np.savez(
+            os.path.join(staging, "metadata.npz"),
+            ids=np.array([row.id for row in rows], dtype=np.int64),
+            document_ids=np.array([row.document_id for row in rows], dtype=np.int64),
+            doc_ids=np.array([row.doc_id for row in rows], dtype=str),
+            chunk_indexes=np.array([row.chunk_index for row in rows], dtype=np.int32),
+            content_offsets=content_offsets,
+        )
+        try:
+            os.rename(staging, directory)
+        except OSError:
+            # Another worker published this version first
+            shutil.rmtree(staging, ignore_errors=True)
+
+        self._remove_stale_versions(user_id, keep=directory)
+        logger.debug(f"Exported {len(rows)} embeddings for user {user_id}")
+
+    def _remove_stale_versions(self, user_id: int, keep: str) -> None:
+        """Remove versions published before `keep` and past the grace period.
+
+        Newer versions may have just been published by another worker, and
+        recent ones may be about to be mapped, so both are left alone.
+        """
+        user_directory = os.path.dirname(keep)
+        keep_mtime = os.path.getmtime(keep)
+        cutoff = time.time() - self.STALE_VERSION_GRACE_SECONDS
+        for name in os.listdir(user_directory):
+            path = os.path.join(user_directory, name)
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            if path == keep or mtime > cutoff:
+                continue
+            # Staging directories left behind by a crashed export are removed
+            # once past the grace period too
+            if not name.endswith(".tmp") and mtime >= keep_mtime:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+
+
+@lru_cache
+def get_local_vector_search() -> LocalVectorSearch:
+    """Process-wide local search backend, shared so writes can invalidate it"""
+    return LocalVectorSearch()
@@ -1,20 +1,16 @@
-import boto3
 from botocore.exceptions import ClientError
 from fastapi import HTTPException, status
 from typing import Optional, Dict, Any, List
 from concurrent.futures import ThreadPoolExecutor
 
+from src.core.clients import ClientRegistry, get_clients
 from src.core.config import settings
+from src.core.metrics import stage
 
 
 class S3Service:
-    def __init__(self):
-        self.s3_client = boto3.client(
-            "s3",
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_REGION,
-        )
+    def __init__(self, clients: Optional[ClientRegistry] = None):
+        self.s3_client = (clients or get_clients()).s3_client
         self.bucket_name = settings.S3_BUCKET_NAME
         self.max_workers = 5
 
@@ -32,9 +28,10 @@ class S3Service:
             full_path = f"{self._get_user_path(user_id)}/{file_path.lstrip('/')}"
             extra_args = {"ContentType": content_type} if content_type else {}
 
-            self.s3_client.put_object(
-                Bucket=self.bucket_name, Key=full_path, Body=file_data, **extra_args
-            )
+            with stage("s3_put", bytes=len(file_data)):
+                self.s3_client.put_object(
+                    Bucket=self.bucket_name, Key=full_path, Body=file_data, **extra_args
+                )
             return full_path
         except ClientError as e:
             raise HTTPException(
@@ -99,8 +96,13 @@ class S3Service:
                         )
 
             full_path = f"{self._get_user_path(user_id)}/{file_path.lstrip('/')}"
-            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=full_path)
-            return response["Body"].read()
+            with stage("s3_get") as span:
+                response = self.s3_client.get_object(
+                    Bucket=self.bucket_name, Key=full_path
+                )
+                body = response["Body"].read()
+                span.set_attribute("bytes", len(body))
+                return body
         except ClientError as e:
             if e.response["Error"]["Code"] == "NoSuchKey":
                 raise HTTPException(
@@ -1,13 +1,15 @@
 from datetime import datetime, timezone
 from typing import List, Optional
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 import uuid
 
 from src.models.database import ChatSession, Message
 
 
 class SessionService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
     async def create_session(
@@ -20,19 +22,22 @@ class SessionService:
             or f"Chat {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M')}",
         )
         self.db.add(session)
-        self.db.commit()
-        self.db.refresh(session)
-        return session
+        await self.db.commit()
+        # Reload with server defaults and the (empty) message list
+        return await self.get_session(session.id, user_id)
 
     async def get_user_sessions(self, user_id: int) -> List[ChatSession]:
-        return self.db.query(ChatSession).filter(ChatSession.user_id == user_id).all()
+        result = await self.db.scalars(
+            select(ChatSession).where(ChatSession.user_id == user_id)
+        )
+        return list(result.all())
 
     async def get_session(self, session_id: str, user_id: int) -> Optional[ChatSession]:
-        return (
-            self.db.query(ChatSession)
-            .filter(ChatSession.id == session_id, ChatSession.user_id == user_id)
-            .options(joinedload(ChatSession.messages))
-            .first()
+        return await self.db.scalar(
+            select(ChatSession)
+            .where(ChatSession.id == session_id, ChatSession.user_id == user_id)
+            .options(selectinload(ChatSession.messages))
+            .execution_options(populate_existing=True)
         )
 
     async def add_message(
@@ -49,20 +54,20 @@ class SessionService:
             context_used=context_used or {},
         )
         self.db.add(message)
-        self.db.commit()
-        self.db.refresh(message)
+        await self.db.commit()
+        await self.db.refresh(message)
         return message
 
     async def delete_session(self, session_id: str, user_id: int) -> None:
         session = await self.get_session(session_id, user_id)
         if session:
-            self.db.delete(session)
-            self.db.commit()
+            await self.db.delete(session)
+            await self.db.commit()
 
     async def get_session_messages(self, session_id: str) -> List[Message]:
-        return (
-            self.db.query(Message)
-            .filter(Message.chat_session_id == session_id)
+        result = await self.db.scalars(
+            select(Message)
+            .where(Message.chat_session_id == session_id)
             .order_by(Message.created_at)
-            .all()
         )
+        return list(result.all())
@@ -0,0 +1,154 @@
+import numpy as np
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Sequence, Tuple
+
+from src.core.config import settings
+
+CHARS_PER_TOKEN = 4
+
+
+class TextChunker:
+    """Splits text into chunks of at most chunk_size characters or tokens.
+
+    Separator positions are located once with vectorized scans over the
+    text's code points. Each chunk then ends at the last, highest-priority
+    separator that fits the budget, found by bisecting those offsets, so the text is
+    walked a single time instead of recursively split and re-measured.
+    Chunks end on a lower-priority separator rather than shrinking below
+    half the budget.
+
+    In "tokens" mode, lengths come from a `tokenizers` tokenizer when one is
+    configured, otherwise from the same ~4 characters per token estimate the
+    context builder budgets with.
+    """
+
+    SEPARATORS: Sequence[str] = ("\n\n", "\n", " ")
+
+    def __init__(
+        self,
+        chunk_size: int = settings.CHUNK_SIZE,
+        chunk_overlap: int = settings.CHUNK_OVERLAP,
+        length_unit: str = settings.CHUNK_LENGTH_UNIT,
+        tokenizer: Optional[str] = settings.CHUNK_TOKENIZER or None,
+    ):
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        if not 0 <= chunk_overlap < chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        if length_unit not in ("chars", "tokens"):
+            raise ValueError(f"Unsupported chunk length unit: {length_unit}")
+
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.length_unit = length_unit
+        self._tokenizer = None
+        if length_unit == "tokens" and tokenizer:
+            self._tokenizer = self._load_tokenizer(tokenizer)
+
+    def split_text(self, text: str) -> List[str]:
+        return [text[start:end] for start, end in self.split_spans(text)]
+
+    def split_spans(self, text: str) -> List[Tuple[int, int]]:
+        """(start, end) character offsets of each chunk, whitespace trimmed.
+
+        Consecutive spans overlap by the repeated text, so callers can
+        stitch chunks back together exactly.
+        """
+        if not text:
+            return []
+
+        boundaries = self._boundaries(text)
+        token_starts = self._token_starts(text)
+        size, overlap = self.chunk_size, self.chunk_overlap
+        if self.length_unit == "tokens" and token_starts is None:
+            size, overlap = size * CHARS_PER_TOKEN, overlap * CHARS_PER_TOKEN
+
+        spans = []
+        length = len(text)
+        start = 0
+        while start < length:
+            limit = self._advance(start, size, length, token_starts)
+            end = (
+                limit if limit >= length else self._chunk_end(boundaries, start, limit)
+            )
+
+            chunk = text[start:end]
+            stripped = chunk.strip()
+            if stripped:
+                chunk_start = start + len(chunk) - len(chunk.lstrip())
+                spans.append((chunk_start, chunk_start + len(stripped)))
+            if end >= length:
+                break
+
+            # Begin the next chunk on the first word boundary inside the overlap
+            words = boundaries[-1]
+            index = bisect_left(words, self._retreat(end, overlap, token_starts))
+            if index < len(words) and start < words[index] < end:
+                start = words[index]
+            else:
+                start = end
+        return spans
+
+    def _boundaries(self, text: str) -> List[List[int]]:
+        """Sorted offsets just past each occurrence of every separator"""
+        code_points = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        boundaries = []
+        for separator in self.SEPARATORS[:-1]:
+            count = len(code_points) - len(separator) + 1
+            matches = np.ones(max(count, 0), dtype=bool)
+            for i, char in enumerate(separator):
+                matches &= code_points[i : i + count] == ord(char)
+            boundaries.append((np.flatnonzero(matches) + len(separator)).tolist())
+        # The finest level admits every boundary, so it also places overlaps
+        matches = np.zeros(len(code_points), dtype=bool)
+        for separator in self.SEPARATORS:
+            matches |= code_points == ord(separator[-1])
+        boundaries.append((np.flatnonzero(matches) + 1).tolist())
+        return boundaries
+
+    def _token_starts(self, text: str) -> Optional[List[int]]:
+        if self._tokenizer is None:
+            return None
+        encoding = self._tokenizer.encode(text, add_special_tokens=False)
+        return [start for start, _ in encoding.offsets]
+
+    @staticmethod
+    def _advance(
+        start: int, size: int, length: int, token_starts: Optional[List[int]]
+    ) -> int:
+        """Furthest offset a chunk beginning at start may extend to"""
+        if token_starts is None:
+            return min(start + size, length)
+        index = bisect_left(token_starts, start) + size
+        return token_starts[index] if index < len(token_starts) else length
+
+    @staticmethod
+    def _retreat(end: int, overlap: int, token_starts: Optional[List[int]]) -> int:
+        """Earliest offset the next chunk may start at to repeat overlap units"""
+        if token_starts is None:
+            return max(end - overlap, 0)
+        index = max(bisect_left(token_starts, end) - overlap, 0)
+        return token_starts[index] if len(token_starts) else end
+
+    @staticmethod
+    def _chunk_end(boundaries: List[List[int]], start: int, limit: int) -> int:
+        minimum = start + (limit - start) // 2
+        for offsets in boundaries:
+            index = bisect_right(offsets, limit) - 1
+            if index >= 0 and offsets[index] > minimum:
+                return offsets[index]
+        # No separator in the second half of the window, cut mid-word
+        return limit
+
+    @staticmethod
+    def _load_tokenizer(name: str):
+        try:
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError(
+                "Token-sized chunking with CHUNK_TOKENIZER requires the tokenizers package"
+            ) from e
+
+        if name.endswith(".json"):
+            return Tokenizer.from_file(name)
+        return Tokenizer.from_pretrained(name)
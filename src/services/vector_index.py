@@ -0,0 +1,418 @@
+import math
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Set
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from src.core.config import settings
+from src.core.database import get_engine
+from src.core.logging import logger
+
+
+def apply_search_params(
+    connection: Connection,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+) -> None:
+    """Set ANN recall knobs for the current transaction only"""
+    if ef_search:
+        connection.execute(
+            text("SELECT set_config('hnsw.ef_search', :value, true)"),
+            {"value": str(int(ef_search))},
+        )
+    if probes:
+        connection.execute(
+            text("SELECT set_config('ivfflat.probes', :value, true)"),
+            {"value": str(int(probes))},
+        )
+
+
+# Operator class and distance operator per quantization level. Full-precision
+# vectors stay in the table for re-scoring; only the index is quantized.
+QUANTIZATION_OPERATORS = {
+    "none": ("vector_cosine_ops", "<=>"),
+    "half": ("halfvec_cosine_ops", "<=>"),
+    "binary": ("bit_hamming_ops", "<~>"),
+}
+
+
+def quantize_sql(expression: str, quantization: str, dimension: int) -> str:
+    """SQL for a vector expression at the given quantization level"""
+    if quantization == "half":
+        return f"CAST({expression} AS halfvec({dimension}))"
+    if quantization == "binary":
+        return f"CAST(binary_quantize({expression}) AS bit({dimension}))"
+    return expression
+
+
+def ann_distance_sql(column: str, query: str, quantization: str, dimension: int) -> str:
+    """Distance expression matching the ANN index for a quantization level"""
+    _, operator = QUANTIZATION_OPERATORS[quantization]
+    query_expression = (
+        f"binary_quantize({query})"
+        if quantization == "binary"
+        else quantize_sql(query, quantization, dimension)
+    )
+    return (
+        f"{quantize_sql(column, quantization, dimension)} {operator} {query_expression}"
+    )
+
+
+class VectorIndexManager:
+    """Creates and maintains the approximate nearest neighbour index on the
+    document chunk embeddings."""
+
+    SUPPORTED_INDEX_TYPES = {"hnsw", "ivfflat"}
+    # Advisory lock key serialising index builds across processes
+    BUILD_LOCK_KEY = 7_204_311
+
+    def __init__(
+        self,
+        engine: Optional[Engine] = None,
+        table: str = "document_chunks",
+        column: str = "embedding",
+        index_type: str = settings.VECTOR_INDEX_TYPE,
+        dimension: int = settings.EMBEDDING_DIMENSION,
+        quantization: str = settings.VECTOR_QUANTIZATION,
+    ):
+        self.engine = engine or get_engine()
+        self.table = table
+        self.column = column
+        self.index_type = index_type.lower()
+        self.dimension = dimension
+        self.quantization = quantization.lower()
+
+    def index_name(self) -> str:
+        name = f"ix_{self.table}_{self.column}_{self.index_type}"
+        if self.quantization != "none":
+            name += f"_{self.quantization}"
+        return name
+
+    def maintain(self) -> None:
+        """Build, drop or rebuild indexes to match the settings.
+
+        Safe to run from every worker at startup: builds use CREATE INDEX
+        CONCURRENTLY, so writes carry on, and only the process holding the
+        build lock does any work while the others return straight away.
+        """
+        with self._build_connection() as connection:
+            if connection is None:
+                return
+            self._ensure_index(connection)
+            self._ensure_tenant_indexes(
+                connection, settings.TENANT_VECTOR_INDEX_MIN_ROWS
+            )
+
+    def ensure_index(self) -> None:
+        with self._build_connection() as connection:
+            if connection is not None:
+                self._ensure_index(connection)
+
+    def ensure_tenant_indexes(
+        self, min_rows: int = settings.TENANT_VECTOR_INDEX_MIN_ROWS
+    ) -> List[int]:
+        with self._build_connection() as connection:
+            if connection is None:
+                return []
+            return self._ensure_tenant_indexes(connection, min_rows)
+
+    def _ensure_index(self, connection: Connection) -> None:
+        if self.index_type not in self.SUPPORTED_INDEX_TYPES | {"none"}:
+            raise ValueError(f"Unsupported vector index type: {self.index_type}")
+        if self.quantization not in QUANTIZATION_OPERATORS:
+            raise ValueError(f"Unsupported vector quantization: {self.quantization}")
+
+        if not self._table_exists(connection):
+            logger.info(f"Skipping vector index, {self.table} does not exist yet")
+            return
+
+        if self.index_type == "none":
+            return
+
+        self._ensure_typed_column(connection)
+        # With per-tenant routing, unscoped searches either use a tenant's
+        # partial index or run exactly, so the shared index would only cost
+        # writes and memory
+        shared = settings.TENANT_VECTOR_INDEX_MIN_ROWS <= 0
+        stale = connection.execute(
+            text(
+                """
+                SELECT indexname FROM pg_indexes
+                WHERE tablename = :table
+                  AND starts_with(indexname, :prefix)
+                  AND indexname NOT LIKE '%\\_user\\_%'
+                  AND indexname <> :name
+                """
+            ),
+            {
+                "table": self.table,
+                "prefix": f"ix_{self.table}_{self.column}_",
+                "name": self.index_name() if shared else "",
+            },
+        ).scalars()
+        for name in list(stale):
+            connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+        if not shared:
+            return
+
+        if self._valid_index_exists(connection, self.index_name()):
+            if self.needs_reindex():
+                self._reindex(connection)
+            return
+
+        logger.info(f"Building {self.index_type} index on {self.table}")
+        connection.execute(text(self._create_index_sql(connection)))
+
+    def _ensure_tenant_indexes(
+        self, connection: Connection, min_rows: int
+    ) -> List[int]:
+        """Build a partial ANN index per large tenant.
+
+        A shared ANN index filters by user after the graph walk, so large
+        tenants lose recall. A partial index only holds that tenant's vectors.
+        Small tenants are served exactly through the user_id btree index.
+        """
+        if self.index_type == "none" or min_rows <= 0:
+            return []
+
+        if not self._table_exists(connection):
+            return []
+
+        tenants = connection.execute(
+            text(
+                f"""
+                SELECT user_id, count(*) AS rows
+                FROM {self.table}
+                WHERE user_id IS NOT NULL
+                GROUP BY user_id
+                HAVING count(*) >= :min_rows
+                """
+            ),
+            {"min_rows": min_rows},
+        ).fetchall()
+
+        stale = connection.execute(
+            text(
+                """
+                SELECT indexname FROM pg_indexes
+                WHERE tablename = :table AND indexname LIKE :pattern
+                """
+            ),
+            {
+                "table": self.table,
+                "pattern": f"ix_{self.table}_{self.column}_%_user_%",
+            },
+        ).scalars()
+        wanted = {self.tenant_index_name(tenant.user_id) for tenant in tenants}
+        for name in set(stale) - wanted:
+            connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+        built = []
+        for tenant in tenants:
+            name = self.tenant_index_name(tenant.user_id)
+            if self._valid_index_exists(connection, name):
+                continue
+            logger.info(f"Building tenant vector index {name}")
+            connection.execute(
+                text(
+                    self._create_index_sql(
+                        connection,
+                        name=name,
+                        where=f"user_id = {int(tenant.user_id)}",
+                        rows=tenant.rows,
+                    )
+                )
+            )
+            built.append(tenant.user_id)
+        return built
+
+    def indexed_tenants(self) -> Set[int]:
+        prefix = f"{self.index_name()}_user_"
+        with self.engine.connect() as connection:
+            # Indexes still being built concurrently are not valid yet
+            names = connection.execute(
+                text(
+                    """
+                    SELECT c.relname
+                    FROM pg_index i
+                    JOIN pg_class c ON c.oid = i.indexrelid
+                    WHERE i.indrelid = to_regclass(:table)
+                      AND i.indisvalid
+                      AND starts_with(c.relname, :prefix)
+                    """
+                ),
+                {"table": self.table, "prefix": prefix},
+            ).scalars()
+            return {int(name[len(prefix) :]) for name in names}
+
+    def tenant_index_name(self, user_id: int) -> str:
+        return f"{self.index_name()}_user_{int(user_id)}"
+
+    def reindex(self) -> None:
+        """Rebuild the index, e.g. after IVFFlat lists drift from the row count"""
+        with self._build_connection() as connection:
+            if connection is not None:
+                self._reindex(connection)
+
+    def _reindex(self, connection: Connection) -> None:
+        logger.info(f"Rebuilding vector index {self.index_name()}")
+        if self.index_type == "ivfflat":
+            connection.execute(
+                text(f"DROP INDEX CONCURRENTLY IF EXISTS {self.index_name()}")
+            )
+            connection.execute(text(self._create_index_sql(connection)))
+        else:
+            connection.execute(text(f"REINDEX INDEX CONCURRENTLY {self.index_name()}"))
+        connection.execute(text(f"ANALYZE {self.table}"))
+
+    def needs_reindex(self) -> bool:
+        """IVFFlat centroids are fixed at build time and degrade as the table grows"""
+        if self.index_type != "ivfflat":
+            return False
+        status = self.index_status()
+        built_lists = status.get("lists")
+        if not status.get("exists") or not built_lists:
+            return False
+        return self._ivfflat_lists(status["rows"]) > 2 * built_lists
+
+    def index_status(self) -> Dict[str, Any]:
+        with self.engine.connect() as connection:
+            if not self._table_exists(connection):
+                return {"exists": False, "rows": 0}
+
+            rows = connection.execute(
+                text(f"SELECT count(*) FROM {self.table}")
+            ).scalar_one()
+            index = connection.execute(
+                text(
+                    """
+                    SELECT
+                        pg_relation_size(c.oid) AS size_bytes,
+                        array_to_string(c.reloptions, ',') AS options
+                    FROM pg_class c
+                    WHERE c.relname = :name
+                    """
+                ),
+                {"name": self.index_name()},
+            ).first()
+
+        status: Dict[str, Any] = {
+            "exists": index is not None,
+            "type": self.index_type,
+            "rows": rows,
+        }
+        if index is not None:
+            status["size_bytes"] = index.size_bytes
+            options = dict(
+                option.split("=", 1)
+                for option in (index.options or "").split(",")
+                if option
+            )
+            if "lists" in options:
+                status["lists"] = int(options["lists"])
+        return status
+
+    def _create_index_sql(
+        self,
+        connection: Connection,
+        name: Optional[str] = None,
+        where: Optional[str] = None,
+        rows: Optional[int] = None,
+    ) -> str:
+        if self.index_type == "hnsw":
+            with_clause = f"m = {settings.HNSW_M}, ef_construction = {settings.HNSW_EF_CONSTRUCTION}"
+        else:
+            if rows is None:
+                rows = connection.execute(
+                    text(f"SELECT count(*) FROM {self.table}")
+                ).scalar_one()
+            with_clause = f"lists = {self._ivfflat_lists(rows)}"
+
+        operator_class, _ = QUANTIZATION_OPERATORS[self.quantization]
+        expression = quantize_sql(self.column, self.quantization, self.dimension)
+        sql = (
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name or self.index_name()} "
+            f"ON {self.table} "
+            f"USING {self.index_type} (({expression}) {operator_class}) "
+            f"WITH ({with_clause})"
+        )
+        if where:
+            sql += f" WHERE {where}"
+        return sql
+
+    def _ivfflat_lists(self, rows: int) -> int:
+        if settings.IVFFLAT_LISTS:
+            return settings.IVFFLAT_LISTS
+        # pgvector guidance: rows / 1000 up to 1M rows, sqrt(rows) beyond
+        lists = rows // 1000 if rows <= 1_000_000 else int(math.sqrt(rows))
+        return max(10, lists)
+
+    def _ensure_typed_column(self, connection: Connection) -> None:
+        # ANN indexes need a fixed dimension, older tables may have been
+        # created with an untyped column
+        typmod = connection.execute(
+            text(
+                """
+                SELECT a.atttypmod
+                FROM pg_attribute a
+                WHERE a.attrelid = CAST(:table AS regclass) AND a.attname = :column
+                """
+            ),
+            {"table": self.table, "column": self.column},
+        ).scalar_one()
+        if typmod == self.dimension:
+            return
+
+        logger.info(f"Fixing {self.table}.{self.column} to vector({self.dimension})")
+        connection.execute(
+            text(
+                f"ALTER TABLE {self.table} ALTER COLUMN {self.column} "
+                f"TYPE vector({self.dimension})"
+            )
+        )
+
+    def _table_exists(self, connection: Connection) -> bool:
+        return (
+            connection.execute(
+                text("SELECT to_regclass(:table)"), {"table": self.table}
+            ).scalar()
+            is not None
+        )
+
+    def _valid_index_exists(self, connection: Connection, name: str) -> bool:
+        """Drops what an interrupted concurrent build left behind, an index
+        Postgres keeps but marks invalid"""
+        valid = connection.execute(
+            text(
+                "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"
+            ),
+            {"name": name},
+        ).scalar()
+        if valid is False:
+            logger.info(f"Dropping invalid vector index {name}")
+            connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        return bool(valid)
+
+    @contextmanager
+    def _build_connection(self) -> Iterator[Optional[Connection]]:
+        """An autocommit connection holding the build lock, or None while
+        another process holds it"""
+        with self.engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as connection:
+            locked = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"),
+                {"key": self.BUILD_LOCK_KEY},
+            ).scalar()
+            if not locked:
+                logger.info("Vector indexes are being built by another process")
+                yield None
+                return
+            try:
+                yield connection
+            finally:
+                connection.execute(
+                    text("SELECT pg_advisory_unlock(:key)"),
+                    {"key": self.BUILD_LOCK_KEY},
+                )
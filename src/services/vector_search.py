@@ -0,0 +1,372 @@
+import threading
+import time
+import numpy as np
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import Integer, column, text
+from sqlalchemy.engine import Engine
+
+from src.core.config import settings
+from src.core.database import get_engine
+from src.core.exceptions import ExternalServiceException
+from src.core.logging import logger
+from src.services.local_vector_search import (
+    LocalVectorSearch,
+    get_local_vector_search,
+)
+from src.services.vector_index import (
+    VectorIndexManager,
+    ann_distance_sql,
+    apply_search_params,
+)
+
+
+class TenantIndexCache:
+    """Tenants with a valid partial index, per index name.
+
+    Shared by every search service in the process, since services are
+    created per request, and reloaded at most every `ttl` seconds.
+    """
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._tenants: Dict[str, Set[int]] = {}
+        self._loaded_at: Dict[str, float] = {}
+
+    def get(self, index_manager: VectorIndexManager) -> Set[int]:
+        name = index_manager.index_name()
+        now = time.monotonic()
+        with self._lock:
+            if now - self._loaded_at.get(name, -self.ttl) < self.ttl:
+                return self._tenants[name]
+            # Other threads keep the previous set while this one reloads
+            self._loaded_at[name] = now
+            self._tenants.setdefault(name, set())
+
+        try:
+            tenants = index_manager.indexed_tenants()
+        except Exception as e:
+            logger.warning(f"Failed to load tenant vector indexes: {str(e)}")
+            return self._tenants[name]
+        with self._lock:
+            self._tenants[name] = tenants
+        return tenants
+
+
+tenant_index_cache = TenantIndexCache()
+
+
+def to_vector_literal(embedding: List[float]) -> str:
+    return "[" + ",".join(str(float(value)) for value in embedding) + "]"
+
+
+def row_to_hit(row: Any) -> Dict[str, Any]:
+    return {
+        "id": str(row.id),
+        "content": row.content,
+        "metadata": {
+            "document_id": row.document_id,
+            "doc_id": row.doc_id,
+            "chunk_index": row.chunk_index,
+        },
+        "distance": float(row.distance),
+        "query_index": row.query_index,
+    }
+
+
+def chunk_key(hit: Dict[str, Any]) -> Any:
+    """Identity of the underlying document chunk, independent of the search path"""
+    metadata = hit.get("metadata") or {}
+    if "document_id" in metadata and "chunk_index" in metadata:
+        return (metadata["document_id"], metadata["chunk_index"])
+    return hit["id"]
+
+
+def split_by_query(hits: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """One ranked list per query from hits tagged with `query_index`"""
+    by_query: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    for hit in hits:
+        by_query[hit["query_index"]].append(hit)
+    return list(by_query.values())
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: List[Tuple[List[Dict[str, Any]], float]],
+    k: int = settings.RRF_K,
+) -> List[Dict[str, Any]]:
+    """Fuse weighted ranked lists by summing weight / (k + rank) per chunk.
+
+    The result is ordered by that `rrf_score`, best first, and downstream
+    steps keep the order rather than re-sorting by distance.
+    """
+    scores: Dict[Any, float] = defaultdict(float)
+    best_hits: Dict[Any, Dict[str, Any]] = {}
+
+    for hits, weight in ranked_lists:
+        if weight <= 0:
+            continue
+        for rank, hit in enumerate(hits, start=1):
+            key = chunk_key(hit)
+            scores[key] += weight / (k + rank)
+            current = best_hits.get(key)
+            if current is None or hit["distance"] < current["distance"]:
+                best_hits[key] = hit
+
+    return [
+        {**best_hits[key], "rrf_score": score}
+        for key, score in sorted(scores.items(), key=lambda item: -item[1])
+    ]
+
+
+def merge_hits(*hit_lists: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merge ranked hit lists into one by reciprocal rank fusion, so each
+    list's order counts and a chunk found in several lists moves up"""
+    return reciprocal_rank_fusion([(hits, 1.0) for hits in hit_lists])
+
+
+class VectorSearchService:
+    """Top-k cosine search over document chunk embeddings for many query
+    vectors in a single round-trip."""
+
+    # The candidate stage orders by the distance the ANN index was built on,
+    # which may be quantized; candidates are then re-scored at full precision
+    ANN_SEARCH_SQL = """
+        WITH query_vectors AS (
+            SELECT
+                CAST(q.ordinality - 1 AS integer) AS query_index,
+                CAST(q.vector AS vector) AS embedding
+            FROM unnest(CAST(:query_vectors AS text[]))
+                WITH ORDINALITY AS q(vector, ordinality)
+        )
+        SELECT
+            hit.id,
+            hit.content,
+            hit.document_id,
+            hit.doc_id,
+            hit.chunk_index,
+            hit.distance,
+            query_vectors.query_index
+        FROM query_vectors
+        CROSS JOIN LATERAL (
+            SELECT
+                candidate.id,
+                candidate.content,
+                candidate.document_id,
+                candidate.doc_id,
+                candidate.chunk_index,
+                candidate.embedding <=> query_vectors.embedding AS distance
+            FROM (
+                SELECT
+                    dc.id,
+                    dc.content,
+                    dc.document_id,
+                    dc.doc_id,
+                    dc.chunk_index,
+                    dc.embedding
+                FROM document_chunks dc
+                WHERE dc.user_id = :user_id
+                  AND dc.embedding IS NOT NULL
+                ORDER BY {ann_distance}
+                LIMIT :candidates
+            ) AS candidate
+            ORDER BY distance
+            LIMIT :k
+        ) AS hit
+        ORDER BY query_vectors.query_index, hit.distance
+    """
+
+    # Tenants without their own partial ANN index, and document-scoped
+    # searches, are answered exactly. The shared index filters after the graph
+    # walk and can come back short, while the btree fetches only that
+    # tenant's rows.
+    EXACT_MULTI_QUERY_SEARCH_SQL = """
+        WITH query_vectors AS (
+            SELECT
+                CAST(q.ordinality - 1 AS integer) AS query_index,
+                CAST(q.vector AS vector) AS embedding
+            FROM unnest(CAST(:query_vectors AS text[]))
+                WITH ORDINALITY AS q(vector, ordinality)
+        ),
+        tenant AS MATERIALIZED (
+            SELECT
+                dc.id,
+                dc.content,
+                dc.document_id,
+                dc.doc_id,
+                dc.chunk_index,
+                dc.embedding
+            FROM document_chunks dc
+            WHERE dc.user_id = :user_id
+              AND dc.embedding IS NOT NULL
+              AND (
+                  CAST(:document_ids AS text[]) IS NULL
+                  OR dc.doc_id = ANY(CAST(:document_ids AS text[]))
+              )
+        )
+        SELECT
+            hit.id,
+            hit.content,
+            hit.document_id,
+            hit.doc_id,
+            hit.chunk_index,
+            hit.distance,
+            query_vectors.query_index
+        FROM query_vectors
+        CROSS JOIN LATERAL (
+            SELECT
+                tenant.id,
+                tenant.content,
+                tenant.document_id,
+                tenant.doc_id,
+                tenant.chunk_index,
+                tenant.embedding <=> query_vectors.embedding AS distance
+            FROM tenant
+            ORDER BY distance
+            LIMIT :k
+        ) AS hit
+        ORDER BY query_vectors.query_index, hit.distance
+    """
+
+    FETCH_EMBEDDINGS_SQL = """
+        SELECT id, embedding FROM document_chunks WHERE id = ANY(:ids)
+    """
+
+    def __init__(
+        self,
+        engine: Optional[Engine] = None,
+        index_manager: Optional[VectorIndexManager] = None,
+        local_search: Optional[LocalVectorSearch] = None,
+    ):
+        self.engine = engine or get_engine()
+        if local_search is None and settings.LOCAL_VECTOR_SEARCH_ENABLED:
+            local_search = get_local_vector_search()
+        self.local_search = local_search
+        self.index_manager = index_manager or VectorIndexManager(engine=self.engine)
+        self.ann_search_sql = self.ANN_SEARCH_SQL.format(
+            ann_distance=ann_distance_sql(
+                "dc.embedding",
+                "query_vectors.embedding",
+                self.index_manager.quantization,
+                self.index_manager.dimension,
+            )
+        )
+
+    def search(
+        self,
+        query_embeddings: List[List[float]],
+        user_id: int,
+        document_ids: Optional[List[str]] = None,
+        k: int = settings.TOP_K_RESULTS,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        return merge_hits(
+            *split_by_query(
+                self.search_ranked(
+                    query_embeddings, user_id, document_ids, k, ef_search, probes
+                )
+            )
+        )
+
+    def search_ranked(
+        self,
+        query_embeddings: List[List[float]],
+        user_id: int,
+        document_ids: Optional[List[str]] = None,
+        k: int = settings.TOP_K_RESULTS,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Top-k hits per query vector, tagged with the query they answer"""
+        if not query_embeddings:
+            return []
+
+        if self.local_search is not None:
+            try:
+                hits = self.local_search.search_ranked(
+                    query_embeddings, user_id, document_ids, k
+                )
+            except Exception as e:
+                logger.warning(
+                    f"Local vector search failed, falling back to pgvector: {str(e)}"
+                )
+                hits = None
+            if hits is not None:
+                return hits
+
+        candidates = k
+        if self.index_manager.quantization != "none":
+            candidates = k * settings.VECTOR_RESCORE_FACTOR
+            # HNSW never returns more rows than its candidate list
+            ef_search = max(ef_search or settings.HNSW_EF_SEARCH, candidates)
+
+        params = {
+            "query_vectors": [to_vector_literal(e) for e in query_embeddings],
+            "user_id": int(user_id),
+            "document_ids": document_ids or None,
+            "k": k,
+            "candidates": candidates,
+        }
+
+        try:
+            with self.engine.begin() as connection:
+                apply_search_params(connection, ef_search, probes)
+                rows = connection.execute(
+                    text(self._search_sql(int(user_id), document_ids)), params
+                ).fetchall()
+        except Exception as e:
+            logger.error(f"Error searching vector store: {str(e)}", exc_info=True)
+            raise ExternalServiceException(
+                message="Failed to search vector store",
+                service_name="VectorStore",
+                extra={"error": str(e)},
+            )
+
+        hits = [row_to_hit(row) for row in rows]
+        logger.debug(
+            f"Vector search for {len(query_embeddings)} queries returned {len(hits)} rows"
+        )
+        return hits
+
+    def _search_sql(self, user_id: int, document_ids: Optional[List[str]]) -> str:
+        # Document-scoped searches only touch a few documents' rows, which the
+        # (user_id, doc_id) btree serves exactly
+        if document_ids:
+            return self.EXACT_MULTI_QUERY_SEARCH_SQL
+        if (
+            self.index_manager.index_type == "none"
+            or settings.TENANT_VECTOR_INDEX_MIN_ROWS <= 0
+        ):
+            return self.ann_search_sql
+
+        if user_id in tenant_index_cache.get(self.index_manager):
+            # The partial index predicate is a literal user id. psycopg
+            # prepares statements after a few runs and a generic plan with
+            # a bound user id can't prove it, so the id is inlined instead
+            return self.ann_search_sql.replace(
+                "dc.user_id = :user_id", f"dc.user_id = {int(user_id)}"
+            )
+        return self.EXACT_MULTI_QUERY_SEARCH_SQL
+
+    def fetch_embeddings(
+        self, ids: List[str], user_id: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        """Chunk embeddings by id, from the user's local matrix where loaded"""
+        embeddings = {}
+        if self.local_search is not None and user_id is not None:
+            embeddings = self.local_search.cached_embeddings(user_id, ids)
+        ids = [id for id in ids if id not in embeddings]
+        if not ids:
+            return embeddings
+
+        statement = text(self.FETCH_EMBEDDINGS_SQL).columns(
+            column("id", Integer), column("embedding", Vector())
+        )
+        with self.engine.connect() as connection:
+            rows = connection.execute(
+                statement, {"ids": [int(id) for id in ids]}
+            ).fetchall()
+        embeddings.update({str(row.id): row.embedding for row in rows})
+        return embeddings
@@ -27,3 +27,7 @@ def clean_llm_response(response: str) -> str:
 
 def clean_whitespaes(text: str) -> str:
     return re.sub(r"\s+", " ", text).strip()
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
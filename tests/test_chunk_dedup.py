@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from src.services.chunk_dedup import ChunkDeduplicator, DuplicateReport, MinHasher
+
+TEXT = (
+    "Retrieval augmented generation grounds a language model in documents "
+    "that are split into chunks, embedded and searched by similarity."
+)
+
+
+@pytest.fixture
+def hasher():
+    return MinHasher(num_perm=64, bands=16, shingle_size=3)
+
+
+def test_signatures_are_deterministic(hasher):
+    signature = hasher.signature(TEXT)
+
+    assert signature.dtype == np.int32
+    assert len(signature) == 64
+    # Another worker with the same seed computes the same signature
+    assert np.array_equal(signature, MinHasher(64, 16, 3).signature(TEXT))
+    assert hasher.band_keys(signature) == hasher.band_keys(signature.copy())
+
+
+def test_similarity_tracks_shared_shingles(hasher):
+    signature = hasher.signature(TEXT)
+    edited = hasher.signature(TEXT.replace("searched", "ranked"))
+    unrelated = hasher.signature(
+        "An entirely different sentence about cooking pasta at home."
+    )
+
+    assert hasher.similarity(signature, hasher.signature(TEXT.upper())) == 1.0
+    assert 0.5 < hasher.similarity(signature, edited) < 1.0
+    assert hasher.similarity(signature, unrelated) < 0.2
+
+
+def test_band_keys_are_tagged_by_position(hasher):
+    # Identical rows in different bands must not collide
+    keys = hasher.band_keys(np.zeros(64, dtype=np.int32))
+
+    assert len(keys) == 16
+    assert len(set(keys)) == 16
+
+
+def test_rejects_uneven_bands():
+    with pytest.raises(ValueError):
+        MinHasher(num_perm=64, bands=10)
+
+
+def test_flags_repeats_within_a_document(hasher):
+    deduplicator = ChunkDeduplicator(hasher, threshold=0.8, scope="document")
+    chunks = [TEXT, "Something else entirely, about the weather.", TEXT.lower()]
+
+    report = deduplicator.find_duplicates(None, user_id=1, document_id=1, chunks=chunks)
+
+    assert report.duplicate_of == [None, None, {"chunk_index": 0}]
+    assert report.stats() == {"chunks": 3, "duplicate_chunks": 1, "dedup_ratio": 0.3333}
+
+
+def test_empty_report():
+    assert DuplicateReport([], [], []).ratio == 0.0
+
+
+@pytest.mark.parametrize("kwargs", [{"scope": "tenant"}, {"mode": "drop"}])
+def test_rejects_unknown_scope_and_mode(hasher, kwargs):
+    with pytest.raises(ValueError):
+        ChunkDeduplicator(hasher, **kwargs)
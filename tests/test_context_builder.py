@@ -0,0 +1,58 @@
+from src.services.chat.context_builder import ContextBuilder
+
+
+def hit(id, content, rrf_score=None):
+    result = {"id": id, "content": content, "metadata": {}, "distance": 0.1}
+    if rrf_score is not None:
+        result["rrf_score"] = rrf_score
+    return result
+
+
+def test_packs_chunks_and_graph_facts_into_the_budget():
+    # 40 characters is about 10 tokens
+    builder = ContextBuilder(token_budget=30, mmr_lambda=0.5, graph_token_share=0.4)
+    hits = [hit(str(i), f"{i}" * 40) for i in range(4)]
+    facts = ["g" * 40, "h" * 40]
+
+    context = builder.build(hits, facts)
+
+    # Graph facts take 10 of their 12 tokens, chunks fill the remaining 20
+    assert context.split("\n\n") == ["0" * 40, "1" * 40, "g" * 40]
+
+
+def test_skips_texts_that_do_not_fit_and_keeps_packing():
+    builder = ContextBuilder(token_budget=15, graph_token_share=0.0)
+    hits = [hit("1", "a" * 40), hit("2", "b" * 80), hit("3", "c" * 20)]
+
+    assert builder.build(hits, []) == "a" * 40 + "\n\n" + "c" * 20
+
+
+def test_deduplicates_by_chunk_and_text():
+    builder = ContextBuilder()
+    hits = [
+        hit("1", "Some  text"),
+        hit("1", "Other text"),
+        hit("2", "some text"),
+        hit("3", "Third text"),
+    ]
+
+    assert [h["id"] for h in builder.deduplicate(hits)] == ["1", "3"]
+
+
+def test_mmr_moves_redundant_chunks_down():
+    builder = ContextBuilder(mmr_lambda=0.5)
+    hits = [hit("a", "a", 1.0), hit("b", "b", 0.9), hit("c", "c", 0.8)]
+    # b is nearly a copy of a, c points elsewhere
+    embeddings = {"a": [1.0, 0.0], "b": [0.99, 0.1], "c": [0.0, 1.0]}
+
+    ordered = builder.order_by_mmr(hits, [1.0, 0.0], embeddings)
+
+    assert [h["id"] for h in ordered] == ["a", "c", "b"]
+
+
+def test_mmr_keeps_rank_order_without_embeddings():
+    builder = ContextBuilder()
+    hits = [hit("a", "a"), hit("b", "b")]
+
+    assert builder.order_by_mmr(hits, [1.0, 0.0], {"a": [1.0, 0.0]}) == hits
+    assert builder.order_by_mmr(hits, None, {}) == hits
@@ -0,0 +1,73 @@
+import pytest
+
+from src.core.config import settings
+from src.services.context_expansion import ContextExpansionService
+
+
+def chunk(chunk_index, content, parent_index=None, span=None):
+    return {
+        "chunk_index": chunk_index,
+        "parent_index": parent_index,
+        "content": content,
+        "span": span,
+    }
+
+
+@pytest.fixture
+def chars_overlap(monkeypatch):
+    monkeypatch.setattr(settings, "CHUNK_OVERLAP", 20)
+    monkeypatch.setattr(settings, "CHUNK_LENGTH_UNIT", "chars")
+
+
+def test_merge_ranges_joins_overlapping_and_adjacent_windows():
+    merge = ContextExpansionService._merge_ranges
+
+    assert merge([(5, 7), (0, 2), (3, 4), (10, 12), (11, 11)]) == [(0, 7), (10, 12)]
+    assert merge([]) == []
+
+
+def test_join_cuts_overlap_at_recorded_spans():
+    text = "The quick brown fox jumps over the lazy dog"
+    chunks = [
+        chunk(0, text[0:19], span=(0, 19)),
+        chunk(1, text[10:34], span=(10, 34)),
+        chunk(2, text[30:], span=(30, len(text))),
+    ]
+
+    assert ContextExpansionService._join_chunks(chunks) == text
+
+
+def test_join_without_spans_only_removes_whole_words(chars_overlap):
+    join = ContextExpansionService._join_chunks
+
+    assert join([chunk(0, "hello world the"), chunk(1, "the cat sat")]) == (
+        "hello world the cat sat"
+    )
+    # "e" ends the previous chunk but is not a word of its own there
+    assert join([chunk(0, "hello world the"), chunk(1, "e cat sat")]) == (
+        "hello world the\ne cat sat"
+    )
+
+
+def test_join_keeps_text_of_chunks_that_are_not_contiguous(chars_overlap):
+    join = ContextExpansionService._join_chunks
+
+    # A gap between chunk indexes
+    assert join([chunk(0, "one two"), chunk(2, "two three")]) == "one two\ntwo three"
+    # Neighbours from different parent windows
+    assert join([chunk(0, "one two", 0), chunk(1, "two three", 1)]) == (
+        "one two\ntwo three"
+    )
+
+
+def test_word_overlap_is_limited_by_the_chunk_overlap(monkeypatch):
+    monkeypatch.setattr(settings, "CHUNK_OVERLAP", 2)
+    overlap = ContextExpansionService._word_overlap
+
+    monkeypatch.setattr(settings, "CHUNK_LENGTH_UNIT", "chars")
+    assert overlap("a b cd", "cd e") == 2
+    assert overlap("a b cd ef", "cd ef g") == 0
+
+    # Measured in tokens of about four characters each
+    monkeypatch.setattr(settings, "CHUNK_LENGTH_UNIT", "tokens")
+    assert overlap("a b cd ef", "cd ef g") == 5
@@ -0,0 +1,16 @@
+from scripts.check_import_time import failures, measure
+
+
+def test_app_imports_within_budget():
+    total_ms, baseline_ms, _, loaded = measure()
+
+    assert failures(total_ms, baseline_ms, loaded) == []
+
+
+def test_failures_report_ratio_budget_and_eager_imports():
+    assert failures(250, 100, []) == []
+    assert failures(350, 100, []) == ["import took 3.50x the baseline, over 3.00x"]
+    assert failures(250, 100, [], budget_ms=200) == ["import took 250 ms, over 200 ms"]
+    assert failures(250, 100, ["boto3"]) == [
+        "imported at startup instead of first use: ['boto3']"
+    ]
@@ -0,0 +1,56 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.services.embedding_service import QueryEmbeddingBatcher
+
+
+class FakeEmbedder:
+    def __init__(self, error=None):
+        self.batches = []
+        self.error = error
+        self.lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self.lock:
+            self.batches.append(list(texts))
+        if self.error:
+            raise self.error
+        return [[float(len(text))] for text in texts]
+
+
+def embed_concurrently(batcher, texts):
+    with ThreadPoolExecutor(len(texts)) as pool:
+        return list(pool.map(batcher.submit, texts))
+
+
+def test_concurrent_queries_share_one_request():
+    embedder = FakeEmbedder()
+    batcher = QueryEmbeddingBatcher(embedder, window_ms=200, max_batch_size=16)
+
+    results = embed_concurrently(batcher, ["a", "bb", "ccc", "bb"])
+
+    assert results == [[1.0], [2.0], [3.0], [2.0]]
+    # Repeated queries are embedded once
+    assert len(embedder.batches) == 1
+    assert sorted(embedder.batches[0]) == ["a", "bb", "ccc"]
+
+
+def test_full_batch_flushes_without_waiting():
+    embedder = FakeEmbedder()
+    batcher = QueryEmbeddingBatcher(embedder, window_ms=60_000, max_batch_size=1)
+
+    assert batcher.submit("abc") == [3.0]
+    assert embedder.batches == [["abc"]]
+
+
+def test_errors_reach_every_caller():
+    embedder = FakeEmbedder(error=RuntimeError("quota"))
+    batcher = QueryEmbeddingBatcher(embedder, window_ms=200, max_batch_size=16)
+
+    with ThreadPoolExecutor(3) as pool:
+        futures = [pool.submit(batcher.submit, text) for text in ["a", "b", "c"]]
+        for future in futures:
+            with pytest.raises(RuntimeError, match="quota"):
+                future.result()
@@ -0,0 +1,89 @@
+import asyncio
+
+import fakeredis
+import pytest
+
+from src.core import rate_limit
+from src.core.rate_limit import (
+    MemoryRateLimitStore,
+    RedisRateLimitStore,
+    sliding_window_result,
+)
+
+PERIOD = 60
+
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request):
+    if request.param == "memory":
+        return MemoryRateLimitStore(max_clients=10)
+    return RedisRateLimitStore(fakeredis.FakeAsyncRedis())
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Freezes time.time() for the stores, 10s into a window"""
+    now = [PERIOD * 1000 + 10.0]
+    monkeypatch.setattr(rate_limit.time, "time", lambda: now[0])
+    return now
+
+
+def hit(store, key="client", limit=3):
+    return asyncio.run(store.hit(key, limit, PERIOD))
+
+
+def test_allows_up_to_the_limit(store, clock):
+    results = [hit(store) for _ in range(4)]
+
+    assert [r.allowed for r in results] == [True, True, True, False]
+    assert [r.remaining for r in results] == [2, 1, 0, 0]
+    # 50s until the next window, then 20s for a third of it to slide out
+    assert results[-1].headers()["Retry-After"] == "70"
+
+
+def test_counts_clients_separately(store, clock):
+    for _ in range(3):
+        hit(store, "a")
+
+    assert not hit(store, "a").allowed
+    assert hit(store, "b").allowed
+
+
+def test_previous_window_decays(store, clock):
+    for _ in range(3):
+        hit(store)
+
+    # Halfway through the next window half of the previous one still counts
+    clock[0] += PERIOD + 20
+    assert hit(store).allowed
+    assert not hit(store).allowed
+
+    # Two windows later nothing of the old traffic is left
+    clock[0] += PERIOD * 2
+    assert [hit(store).allowed for _ in range(4)] == [True, True, True, False]
+
+
+def test_zero_limit_denies_for_a_period(store, clock):
+    result = hit(store, limit=0)
+
+    assert not result.allowed
+    assert result.retry_after == PERIOD
+
+
+def test_redis_store_fails_open():
+    class Unreachable:
+        async def eval(self, *args):
+            raise ConnectionError("connection refused")
+
+    result = hit(RedisRateLimitStore(Unreachable()))
+
+    assert result.allowed
+    assert result.remaining == 3
+
+
+def test_retry_after_waits_for_the_previous_window():
+    # 3 of 3 in the previous window, 10s into this one: 2 more slots free up
+    # once 1/3 of the previous window has slid out, at 20s
+    result = sliding_window_result(False, 3, 0, 3, PERIOD, 10.0)
+
+    assert result.retry_after == pytest.approx(10.0)
@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.services.chat.retrieval_evaluation import RetrievalEvaluationService
+
+
+@pytest.fixture
+def evaluator():
+    clients = SimpleNamespace(llm=None, embeddings=None)
+    return RetrievalEvaluationService(mode="local", clients=clients)
+
+
+def chunk(content, distance):
+    return {"content": content, "distance": distance}
+
+
+def test_close_focused_chunks_covering_the_query_score_high(evaluator):
+    chunks = [
+        chunk("Postgres vacuum reclaims dead tuples", 0.05),
+        chunk("Autovacuum runs in the background", 0.05),
+        chunk("Dead tuples come from updates", 0.05),
+        chunk("Unrelated text", 0.3),
+        chunk("More unrelated text", 0.3),
+        chunk("Cooking pasta", 0.3),
+        chunk("Baking bread", 0.3),
+    ]
+
+    evaluation = evaluator._evaluate_locally("How does Postgres vacuum work?", chunks)
+
+    # Full relevance and separation, two of the three terms covered
+    assert evaluation["overall_quality_score"] == pytest.approx(9.0)
+    assert evaluation["missing_aspects"] == ["work"]
+    assert not evaluation["needs_improvement"]
+    assert evaluation["evaluator"] == "local"
+
+
+def test_distant_chunks_missing_the_terms_need_improvement(evaluator):
+    chunks = [chunk("Cooking pasta", 0.6), chunk("Baking bread", 0.6)]
+
+    evaluation = evaluator._evaluate_locally("postgres vacuum", chunks)
+
+    assert evaluation["overall_quality_score"] == 0.0
+    assert evaluation["missing_aspects"] == ["postgres", "vacuum"]
+    assert evaluation["needs_improvement"]
+
+
+def test_no_chunks(evaluator):
+    evaluation = evaluator._evaluate_locally("what is pgvector?", [])
+
+    assert evaluation["overall_quality_score"] == 0.0
+    assert evaluation["missing_aspects"] == ["pgvector"]
+
+
+def test_extracts_terms_without_stopwords_or_duplicates(evaluator):
+    assert evaluator._extract_terms(
+        "What is the HNSW ef_search in pgvector 0.8.0? hnsw"
+    ) == [
+        "hnsw",
+        "ef_search",
+        "pgvector",
+        "0.8.0",
+    ]
@@ -0,0 +1,80 @@
+import pytest
+
+from src.services.text_chunker import TextChunker
+
+TEXT = (
+    "The quick brown fox jumps over the lazy dog.\n\n"
+    "A second paragraph follows with a few more words in it.\n"
+    "And a last line that closes the document."
+)
+
+
+def test_chunks_fit_the_size_and_end_on_separators():
+    chunker = TextChunker(chunk_size=60, chunk_overlap=10, length_unit="chars")
+
+    chunks = chunker.split_text(TEXT)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 60 for chunk in chunks)
+    # The first paragraph fits whole, so the first chunk stops at its end
+    assert chunks[0] == "The quick brown fox jumps over the lazy dog."
+
+
+def test_spans_overlap_and_rebuild_the_text():
+    chunker = TextChunker(chunk_size=40, chunk_overlap=15, length_unit="chars")
+
+    spans = chunker.split_spans(TEXT)
+
+    assert [TEXT[start:end] for start, end in spans] == chunker.split_text(TEXT)
+    pairs = list(zip(spans, spans[1:]))
+    assert any(start < previous_end for (_, previous_end), (start, _) in pairs)
+    # Consecutive spans either overlap or are only separated by whitespace,
+    # so dropping the repeated text gives back the document
+    for (previous_start, previous_end), (start, end) in pairs:
+        assert previous_start < start and previous_end < end
+        assert start <= previous_end or not TEXT[previous_end:start].strip()
+
+
+def test_overlap_starts_on_a_word_boundary():
+    chunker = TextChunker(chunk_size=30, chunk_overlap=12, length_unit="chars")
+
+    for start, _ in chunker.split_spans(TEXT)[1:]:
+        assert TEXT[start - 1].isspace()
+
+
+def test_cuts_mid_word_without_separators():
+    chunker = TextChunker(chunk_size=10, chunk_overlap=0, length_unit="chars")
+
+    assert chunker.split_text("a" * 25) == ["a" * 10, "a" * 10, "a" * 5]
+
+
+def test_tokens_mode_estimates_four_chars_per_token():
+    words = " ".join(["word"] * 50)
+    chunker = TextChunker(
+        chunk_size=10, chunk_overlap=0, length_unit="tokens", tokenizer=None
+    )
+
+    chunks = chunker.split_text(words)
+
+    assert all(len(chunk) <= 40 for chunk in chunks)
+    assert " ".join(chunks) == words
+
+
+def test_empty_and_blank_text():
+    chunker = TextChunker(chunk_size=10, chunk_overlap=2, length_unit="chars")
+
+    assert chunker.split_text("") == []
+    assert chunker.split_text("   \n\n  ") == []
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"chunk_size": 0},
+        {"chunk_size": 10, "chunk_overlap": 10},
+        {"chunk_size": 10, "chunk_overlap": 2, "length_unit": "words"},
+    ],
+)
+def test_rejects_invalid_settings(kwargs):
+    with pytest.raises(ValueError):
+        TextChunker(**kwargs)
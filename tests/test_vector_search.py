@@ -0,0 +1,51 @@
+import pytest
+
+from src.services.vector_search import merge_hits, reciprocal_rank_fusion
+
+
+def hit(chunk_index, distance, document_id=1, id=None):
+    return {
+        "id": id or f"{document_id}-{chunk_index}",
+        "content": f"chunk {chunk_index}",
+        "metadata": {"document_id": document_id, "chunk_index": chunk_index},
+        "distance": distance,
+    }
+
+
+def test_chunks_found_by_several_lists_move_up():
+    vector = [hit(1, 0.1), hit(2, 0.2), hit(3, 0.3)]
+    lexical = [hit(3, 0.9), hit(4, 0.9)]
+
+    fused = merge_hits(vector, lexical)
+
+    assert [h["metadata"]["chunk_index"] for h in fused] == [3, 1, 2, 4]
+    assert fused[0]["rrf_score"] == pytest.approx(1 / 63 + 1 / 61)
+
+
+def test_keeps_the_closest_copy_of_a_chunk():
+    # The same chunk found through different search paths has different ids
+    fused = merge_hits([hit(1, 0.4, id="a")], [hit(1, 0.2, id="b")])
+
+    assert len(fused) == 1
+    assert fused[0]["id"] == "b"
+    assert fused[0]["distance"] == 0.2
+
+
+def test_weights_scale_each_list():
+    first, second = [hit(1, 0.1)], [hit(2, 0.1)]
+
+    fused = reciprocal_rank_fusion([(first, 1.0), (second, 2.0)], k=0)
+
+    assert [(h["metadata"]["chunk_index"], h["rrf_score"]) for h in fused] == [
+        (2, 2.0),
+        (1, 1.0),
+    ]
+    # A list without weight is left out
+    assert reciprocal_rank_fusion([(first, 1.0), (second, 0.0)]) == [
+        {**first[0], "rrf_score": 1 / 61}
+    ]
+
+
+def test_empty_lists():
+    assert merge_hits() == []
+    assert merge_hits([], []) == []